@@ -0,0 +1,22 @@
+import importlib
+import os
+import sys
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'whiskydatabase')
+ANALYSIS_DIR = os.path.join(PACKAGE_DIR, 'analysis')
+
+
+def import_from(directory, name):
+    """
+    Imports `name` with `directory` first on the path. The scrapers' `utils` package
+    and the analysis' `utils` module share a name, so the other one is unloaded first.
+    """
+    loaded = sys.modules.get('utils')
+    if loaded is not None and not os.path.abspath(loaded.__file__).startswith(directory + os.sep + 'utils'):
+        for module in [module for module in sys.modules if module == 'utils' or module.startswith('utils.')]:
+            del sys.modules[module]
+    sys.path.insert(0, directory)
+    try:
+        return importlib.import_module(name)
+    finally:
+        sys.path.remove(directory)
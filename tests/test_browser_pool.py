@@ -0,0 +1,145 @@
+import asyncio
+import unittest
+
+from tests.support import PACKAGE_DIR, import_from
+
+browser_pool = import_from(PACKAGE_DIR, 'utils.browser_pool')
+
+
+class FakePage:
+
+    def __init__(self, healthy=True):
+        self.closed = False
+        self.healthy = healthy
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+    async def goto(self, url, **options):
+        await asyncio.sleep(0)
+        if not self.healthy:
+            raise RuntimeError('Target crashed')
+
+
+class FakeContext:
+
+    def __init__(self):
+        self.pages = []
+        self.closed = False
+
+    async def new_page(self):
+        await asyncio.sleep(0)
+        self.pages.append(FakePage())
+        return self.pages[-1]
+
+    async def route(self, pattern, handler):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class BrowserPoolTest(unittest.IsolatedAsyncioTestCase):
+
+    def pool(self, **options):
+        pool = browser_pool.BrowserPool(**options)
+        self.contexts = []
+
+        async def new_context(slot, context_options):
+            self.contexts.append(FakeContext())
+            return self.contexts[-1]
+        pool._new_context = new_context
+        return pool
+
+    def assertNoPagesOpen(self, pool):
+        self.assertEqual(pool.open_pages, 0)
+        self.assertEqual(pool._page_slots._value, pool.max_open_pages)
+
+    async def test_returned_pages_are_checked_out_again(self):
+        pool = self.pool()
+        async with pool.context() as context:
+            for _ in range(3):
+                async with context.page() as page:
+                    pass
+            self.assertEqual(len(self.contexts[0].pages), 1)
+            self.assertEqual(context.pages_reused, 2)
+            self.assertFalse(page.closed)
+        self.assertTrue(page.closed)
+        self.assertNoPagesOpen(pool)
+
+    async def test_unhealthy_pages_are_closed_instead_of_reused(self):
+        pool = self.pool()
+        async with pool.context() as context:
+            with self.assertRaises(ValueError):
+                async with context.page() as raised:
+                    raise ValueError()
+            async with context.page() as crashed:
+                crashed.closed = True
+            async with context.page() as failing_reset:
+                failing_reset.healthy = False
+            self.assertTrue(raised.closed and failing_reset.closed)
+            self.assertEqual(len(self.contexts[0].pages), 3)
+            self.assertEqual(context.pages_reused, 0)
+            self.assertEqual(pool.open_pages, 0)
+        self.assertNoPagesOpen(pool)
+
+    async def test_context_is_recycled_after_pages_per_context(self):
+        pool = self.pool(pages_per_context=2)
+        async with pool.context() as context:
+            for _ in range(5):
+                async with context.page():
+                    pass
+            self.assertEqual(len(self.contexts), 3)
+            self.assertEqual([fake.closed for fake in self.contexts], [True, True, False])
+        self.assertNoPagesOpen(pool)
+
+    async def test_idle_pages_of_another_context_give_up_their_slots(self):
+        pool = self.pool(max_open_pages=2)
+        async with pool.context() as first, pool.context() as second:
+            async with first.page(), first.page():
+                pass
+            # Both global slots are held by first's idle pages
+            self.assertEqual(pool.open_pages, 2)
+            async def checkout_two():
+                async with second.page(), second.page():
+                    self.assertEqual(pool.open_pages, 2)
+            await asyncio.wait_for(checkout_two(), 5)
+            self.assertEqual(first._idle, [])
+        self.assertNoPagesOpen(pool)
+        self.assertEqual(pool.peak_open_pages, 2)
+
+    async def test_concurrent_checkouts_stay_within_the_global_limit(self):
+        pool = self.pool(max_open_pages=3, pages_per_context=40)
+
+        async def scraper(fetches):
+            async with pool.context(max_pages=5) as context:
+                async def fetch(i):
+                    async with context.page() as page:
+                        await asyncio.sleep(0.001 * (i % 3))
+                        if i % 7 == 0:
+                            page.closed = True
+                await asyncio.gather(*(fetch(i) for i in range(fetches)))
+
+        await asyncio.wait_for(asyncio.gather(*(scraper(60) for _ in range(3))), 10)
+        self.assertLessEqual(pool.peak_open_pages, 3)
+        self.assertNoPagesOpen(pool)
+
+    async def test_cancelled_checkouts_release_their_slots(self):
+        pool = self.pool(max_open_pages=2)
+        async with pool.context() as context:
+            async def hold():
+                async with context.page():
+                    await asyncio.sleep(0.05)
+            tasks = [asyncio.create_task(hold()) for _ in range(5)]
+            await asyncio.sleep(0.01)
+            for task in tasks[2:]:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.assertNoPagesOpen(pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
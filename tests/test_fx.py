@@ -0,0 +1,44 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from tests.support import PACKAGE_DIR, import_from
+
+fx = import_from(PACKAGE_DIR, 'utils.fx')
+
+
+class UnresponsiveClient:
+    """Times out on every request and records the timeout it was given."""
+
+    def __init__(self):
+        self.timeouts = []
+
+    async def get(self, url, headers=None, timeout=None):
+        self.timeouts.append(timeout)
+        raise asyncio.TimeoutError()
+
+
+class FxServiceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_unresponsive_api_falls_back_to_cached_rates_after_one_attempt(self):
+        with open(os.path.join(self.tmp.name, 'rates-2024-05-01.json'), 'w', encoding='utf-8') as f:
+            json.dump({'date': '2024-05-01', 'fetched_at': '2024-05-01T08:00:00', 'rates': {'EUR': 1, 'GBP': 0.85}}, f)
+        client = UnresponsiveClient()
+        service = fx.FxService(self.tmp.name, retries=1, timeout=2)
+
+        rates = asyncio.run(service.get_rates(client))
+        self.assertEqual(client.timeouts, [2])
+        self.assertEqual(rates.date, '2024-05-01')
+        self.assertEqual(rates.rates['GBP'], 0.85)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import yaml
+
+from tests.support import PACKAGE_DIR, import_from
+
+http_cache = import_from(PACKAGE_DIR, 'utils.http_cache')
+http_client = import_from(PACKAGE_DIR, 'utils.http_client')
+main = import_from(PACKAGE_DIR, 'main')
+
+SITES_DIR = os.path.join(PACKAGE_DIR, 'configs', 'sites', 'beverages')
+URL = 'https://shop.example/whisky/gf12'
+
+
+def response(body, **headers):
+    return http_client.HttpResponse(URL, 200, headers, body)
+
+
+class HttpCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_validators_are_sent_back_and_a_304_returns_the_stored_body(self):
+        cache = http_cache.HttpCache(self.tmp.name)
+        cache.store(URL, response(b'<html>gf12</html>', etag='"v1"', **{'last-modified': 'Wed, 01 May 2024 08:00:00 GMT',
+                                                                         'content-type': 'text/html'}))
+        cache.store_parsed(URL, [{'volume': '70cl'}])
+        cache.save()
+
+        # A later run reads the index back
+        cache = http_cache.HttpCache(self.tmp.name)
+        self.assertEqual(cache.conditional_headers(URL), {'If-None-Match': '"v1"',
+                                                          'If-Modified-Since': 'Wed, 01 May 2024 08:00:00 GMT'})
+        cached = cache.not_modified(URL)
+        self.assertTrue(cached.from_cache)
+        self.assertEqual(cached.body, b'<html>gf12</html>')
+        self.assertEqual(cached.headers, {'content-type': 'text/html'})
+        self.assertEqual(cache.get_parsed(URL), [{'volume': '70cl'}])
+
+    def test_a_new_body_replaces_the_parsed_rows(self):
+        cache = http_cache.HttpCache(self.tmp.name)
+        cache.store(URL, response(b'old', etag='"v1"'))
+        cache.store_parsed(URL, [{'volume': '70cl'}])
+        cache.store(URL, response(b'new', etag='"v2"'))
+        self.assertIsNone(cache.get_parsed(URL))
+        self.assertEqual(cache.conditional_headers(URL), {'If-None-Match': '"v2"'})
+
+    def test_responses_without_validators_are_not_cached(self):
+        cache = http_cache.HttpCache(self.tmp.name)
+        cache.store(URL, response(b'<html></html>'))
+        self.assertFalse(cache.has_validators(URL))
+        self.assertEqual(cache.conditional_headers(URL), {})
+        self.assertIsNone(cache.not_modified(URL))
+
+    def test_least_recently_used_entries_are_evicted_on_save(self):
+        bodies = {f'https://shop.example/p{i}': os.urandom(1000) for i in range(3)}
+        cache = http_cache.HttpCache(self.tmp.name, max_bytes=2500)
+        for used_at, (url, body) in enumerate(bodies.items()):
+            with mock.patch.object(http_cache.time, 'time', return_value=used_at):
+                cache.store(url, http_client.HttpResponse(url, 200, {'etag': '"v1"'}, body))
+        # p0 is used again, so p1 is now the least recently used
+        with mock.patch.object(http_cache.time, 'time', return_value=len(bodies)):
+            cache.not_modified('https://shop.example/p0')
+        cache.save()
+
+        cache = http_cache.HttpCache(self.tmp.name, max_bytes=2500)
+        self.assertEqual(sorted(entry['url'] for entry in cache.index.values()),
+                         ['https://shop.example/p0', 'https://shop.example/p2'])
+        self.assertEqual(cache.not_modified('https://shop.example/p0').body, bodies['https://shop.example/p0'])
+        self.assertEqual(len([name for name in os.listdir(self.tmp.name) if name.endswith('.body.gz')]), 2)
+
+
+class RevalidatingServer:
+    """Answers conditional requests for one page with a 304 while its validators match."""
+
+    def __init__(self, body, etag=None, last_modified=None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.requests = []
+
+    async def get(self, url, headers=None, timeout=None):
+        headers = headers or {}
+        self.requests.append(headers)
+        if (self.etag and headers.get('If-None-Match') == self.etag) or \
+                (self.last_modified and headers.get('If-Modified-Since') == self.last_modified):
+            return http_client.HttpResponse(url, 304, {}, b'')
+        validators = {'etag': self.etag, 'last-modified': self.last_modified}
+        return http_client.HttpResponse(url, 200, {k: v for k, v in validators.items() if v}, self.body)
+
+    async def close(self):
+        pass
+
+
+class ScraperRevalidationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        # The cache is kept under ./data
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def get_twice(self, server, between=lambda scraper: None):
+        config = main.load_and_merge_config('beverages', os.path.join(SITES_DIR, 'NL_WEB_club_whisky.yaml'))
+        with open(os.path.join(SITES_DIR, 'fields.yaml'), encoding='utf-8') as f:
+            config['fieldnames'] = yaml.safe_load(f)['fieldnames']
+        config['http_cache'] = {'enabled': True}
+        scraper = main.create_scraper(config, http_client=server)
+
+        async def get():
+            first = await scraper._http_get(URL, {})
+            between(scraper)
+            return first, await scraper._http_get(URL, {})
+        return scraper, asyncio.run(get())
+
+    def test_etag(self):
+        server = RevalidatingServer(b'<html>gf12</html>', etag='"v1"')
+        scraper, (first, second) = self.get_twice(server)
+        self.assertEqual(server.requests[1], {'If-None-Match': '"v1"'})
+        self.assertFalse(first.from_cache)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.body, b'<html>gf12</html>')
+        self.assertEqual((scraper.http_cache.hits, scraper.http_cache.requests), (1, 2))
+
+    def test_last_modified(self):
+        server = RevalidatingServer(b'<html>gf12</html>', last_modified='Wed, 01 May 2024 08:00:00 GMT')
+        _, (_, second) = self.get_twice(server)
+        self.assertEqual(server.requests[1], {'If-Modified-Since': 'Wed, 01 May 2024 08:00:00 GMT'})
+        self.assertTrue(second.from_cache)
+
+    def test_missing_body_is_requested_again_without_validators(self):
+        server = RevalidatingServer(b'<html>gf12</html>', etag='"v1"')
+
+        def lose_body(scraper):
+            cache = scraper.http_cache
+            os.remove(cache._path(cache._key(URL), '.body.gz'))
+        _, (_, second) = self.get_twice(server, lose_body)
+        self.assertEqual(server.requests[1:], [{'If-None-Match': '"v1"'}, {}])
+        self.assertFalse(second.from_cache)
+        self.assertEqual(second.body, b'<html>gf12</html>')
+
+
+if __name__ == '__main__':
+    unittest.main()
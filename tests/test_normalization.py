@@ -0,0 +1,54 @@
+import unittest
+
+import pandas as pd
+
+from tests.support import ANALYSIS_DIR, import_from
+
+utils = import_from(ANALYSIS_DIR, 'utils')
+
+
+class PriceTest(unittest.TestCase):
+
+    def assert_prices(self, cases):
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(utils.parse_price(text), expected)
+        normalized = utils.normalize_price(pd.Series(list(cases), dtype=object))
+        self.assertEqual(normalized.tolist(), list(cases.values()))
+
+    def test_dot_and_three_digits_is_a_thousands_separator_with_or_without_symbol(self):
+        self.assert_prices({'1.234': 1234.0, '€ 1.234': 1234.0, '1.234,50': 1234.5, '€ 1.234,50': 1234.5})
+
+    def test_decimals(self):
+        self.assert_prices({'12.5': 12.5, '12.50': 12.5, '12,50': 12.5, '€ 12,50': 12.5,
+                            '1,234.50': 1234.5, '42': 42.0})
+
+    def test_range_yields_lower_bound(self):
+        self.assert_prices({'€ 30 - € 45': 30.0})
+
+    def test_unreadable(self):
+        self.assertIsNone(utils.parse_price('sold out'))
+        self.assertTrue(utils.normalize_price(pd.Series(['sold out', None], dtype=object)).isna().all())
+
+
+class VolumeTest(unittest.TestCase):
+
+    def assert_liters(self, cases):
+        normalized = utils.normalize_volume(pd.Series(list(cases), dtype=object))
+        for (value, expected), liters in zip(cases.items(), normalized):
+            with self.subTest(value=value):
+                self.assertAlmostEqual(liters, expected)
+                self.assertAlmostEqual(utils.parse_volume(value), expected * 100)
+
+    def test_units(self):
+        self.assert_liters({'70cl': 0.7, '0,7 l': 0.7, '700 ml': 0.7, '1 liter': 1.0, '6 x 5cl': 0.3})
+
+    def test_bare_volume_thresholds(self):
+        self.assertEqual((utils.MAX_BARE_LITERS, utils.MAX_BARE_CENTILITERS), (5, 200))
+        # Up to 5 liters, up to 200 centiliters, milliliters above
+        self.assert_liters({'0.7': 0.7, '5': 5.0, '6': 0.06, '70': 0.7, '200': 2.0, '201': 0.201,
+                            '700': 0.7, 5: 5.0, 70.0: 0.7})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from tests.support import ANALYSIS_DIR, import_from
+
+data_processing = import_from(ANALYSIS_DIR, 'data_processing')
+
+
+class ParquetLoadingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_folder = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, day, retailer_slug, table):
+        folder = os.path.join(self.data_folder, 'parquet', f'date={day}', f'retailer_slug={retailer_slug}')
+        os.makedirs(folder, exist_ok=True)
+        pq.write_table(table, os.path.join(folder, 'part.parquet'))
+        return folder
+
+    def test_only_the_selected_partitions_are_opened(self):
+        self.write('2024-10-01', 'drinkz', pa.table({'name': ['A'], 'price': [10.5], 'abv': [40.0]}))
+        self.write('2024-10-01', 'drankdozijn', pa.table({'name': ['B'], 'price': [12.0], 'abv': ['46%']}))
+        # A file outside the date range whose footer would fail to read
+        folder = self.write('2024-09-01', 'drinkz', pa.table({'name': ['C'], 'price': [1.0]}))
+        with open(os.path.join(folder, 'part.parquet'), 'wb') as f:
+            f.write(b'not parquet')
+
+        data = data_processing.load_parquet_data(self.data_folder, start_date='2024-10-01',
+                                                 end_date='2024-10-01')
+        self.assertEqual(sorted(data['name']), ['A', 'B'])
+        # Typed differently by the two sites, so read as text
+        self.assertEqual(sorted(data['abv']), ['40', '46%'])
+
+        data = data_processing.load_parquet_data(self.data_folder, retailers=['Drinkz'], start_date='2024-10-01')
+        self.assertEqual(data['name'].tolist(), ['A'])
+        self.assertEqual(data['abv'].tolist(), [40.0])
+
+    def test_no_matching_partitions(self):
+        self.write('2024-10-01', 'drinkz', pa.table({'name': ['A'], 'price': [10.5]}))
+        data = data_processing.load_parquet_data(self.data_folder, columns=['name'], start_date='2025-01-01')
+        self.assertTrue(data.empty)
+        self.assertEqual(list(data.columns), ['name'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+
+from tests.support import PACKAGE_DIR, import_from
+
+main = import_from(PACKAGE_DIR, 'main')
+
+SITES_DIR = os.path.join(PACKAGE_DIR, 'configs', 'sites', 'beverages')
+
+
+class ParsePoolTest(unittest.TestCase):
+
+    def test_worker_log_records_reach_the_scraper_logger(self):
+        # Imported here: the pool pickles its functions by name, so they have to be the
+        # ones currently in sys.modules even when other tests reloaded `utils`
+        parse_pool = import_from(PACKAGE_DIR, 'utils.parse_pool')
+        config = main.load_and_merge_config('beverages', os.path.join(SITES_DIR, 'NL_WEB_club_whisky.yaml'))
+        page = '<html><body><div class="products-holder"></div></body></html>'
+
+        async def parse():
+            async with parse_pool.ParsePool({config['name']: config}, max_workers=1) as pool:
+                return await pool.run(config['name'], 'parse_listing', page)
+
+        # Spawned workers import the pool's module from the parent's path
+        with mock.patch.object(sys, 'path', [PACKAGE_DIR, *sys.path]), \
+                self.assertLogs(config['name'], 'INFO') as logs:
+            products, has_next_page = asyncio.run(parse())
+        self.assertEqual(products, [])
+        self.assertIn('Parsed 0 products.', logs.output[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from tests.support import ANALYSIS_DIR, PACKAGE_DIR, import_from
+
+price_store = import_from(PACKAGE_DIR, 'utils.price_store')
+catalogue = import_from(ANALYSIS_DIR, 'catalogue')
+data_processing = import_from(ANALYSIS_DIR, 'data_processing')
+
+
+def listing(retailer, product_id, price, scraped_at):
+    return {'retailer': retailer, 'name': 'Glenfiddich 12 Year Old Single Malt', 'brand': 'Glenfiddich',
+            'volume': '70cl', 'abv': '40%', 'product_id': product_id, 'price': price,
+            'link': f'https://{retailer.lower()}.example/glenfiddich-12', 'scraped_at': scraped_at}
+
+
+class PriceHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'prices.db')
+        self.catalogue_path = os.path.join(self.tmp.name, 'catalogue.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def record(self, rows):
+        async def run():
+            async with price_store.PriceStore(self.db_path) as store:
+                for row in rows:
+                    await store.record(row['retailer'], [row])
+        asyncio.run(run())
+
+    def test_offers_of_two_retailers_share_a_product_group(self):
+        rows = [listing('Drankdozijn', '5010327000176', 39.95, '2024-10-01 08:00:00'),
+                listing('Drinkz', 'GF12-70', 41.50, '2024-10-01 09:00:00'),
+                listing('Drinkz', 'GF12-70', 37.50, '2024-10-02 09:00:00')]
+        self.record(rows)
+
+        with catalogue.ProductCatalogue(self.catalogue_path) as products:
+            groups = products.assign(pd.DataFrame(rows))['product_group']
+            self.assertEqual(groups.nunique(), 1)
+            self.assertEqual(products.link_price_store(self.db_path), 2)
+            # Already linked products are left alone
+            self.assertEqual(products.link_price_store(self.db_path), 0)
+
+        history = data_processing.load_price_history(self.db_path, product_group=int(groups[0]))
+        self.assertEqual(sorted(history['retailer'].unique()), ['Drankdozijn', 'Drinkz'])
+        self.assertEqual(history['price'].tolist(), [39.95, 41.50, 37.50])
+
+    def test_unmatched_offers_have_no_group(self):
+        self.record([listing('Drinkz', 'GF12-70', 41.50, '2024-10-01 09:00:00')])
+        history = data_processing.load_price_history(self.db_path)
+        self.assertTrue(history['product_group'].isna().all())
+
+
+if __name__ == '__main__':
+    unittest.main()
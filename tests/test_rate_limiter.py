@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import unittest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from tests.support import PACKAGE_DIR, import_from
+
+rate_limiter = import_from(PACKAGE_DIR, 'utils.rate_limiter')
+
+
+class RateLimiterTest(unittest.IsolatedAsyncioTestCase):
+
+    async def elapsed(self, limiter, acquires):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(acquires):
+            await limiter.acquire()
+        return loop.time() - start
+
+    async def test_burst_is_free_and_the_bucket_refills_at_the_rate(self):
+        limiter = rate_limiter.RateLimiter('refill.example', rate=20, burst=3)
+        self.assertLess(await self.elapsed(limiter, 3), 0.03)
+        # The bucket is empty: each further request waits 1/rate
+        self.assertGreaterEqual(await self.elapsed(limiter, 2), 0.09)
+        await asyncio.sleep(0.2)
+        self.assertLess(await self.elapsed(limiter, 3), 0.03)
+
+    async def test_throttling_halves_the_rate_and_pauses_the_host(self):
+        limiter = rate_limiter.RateLimiter('backoff.example', rate=8, burst=5, min_rate=1)
+        limiter.on_throttled(0.15)
+        self.assertEqual(limiter.rate, 4)
+        self.assertGreaterEqual(await self.elapsed(limiter, 1), 0.14)
+
+        for _ in range(4):
+            limiter.on_throttled(0)
+        self.assertEqual(limiter.rate, limiter.min_rate)
+
+    async def test_rate_recovers_after_consecutive_successes(self):
+        limiter = rate_limiter.RateLimiter('recover.example', rate=8, recovery_after=3)
+        limiter.on_throttled(0)
+        limiter.on_throttled(0)
+        self.assertEqual(limiter.rate, 2)
+        for _ in range(3):
+            limiter.on_success()
+        self.assertEqual(limiter.rate, 3)
+        for _ in range(9):
+            limiter.on_success()
+        self.assertEqual(limiter.rate, 8)
+
+
+class ParseRetryAfterTest(unittest.TestCase):
+
+    def test_seconds_and_http_dates(self):
+        self.assertEqual(rate_limiter.parse_retry_after('30'), 30)
+        retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+        self.assertAlmostEqual(rate_limiter.parse_retry_after(retry_at), 60, delta=2)
+        self.assertIsNone(rate_limiter.parse_retry_after('soon'))
+        self.assertIsNone(rate_limiter.parse_retry_after(None))
+
+
+class SharedLimiterTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_throttling_is_logged_for_the_scraper_that_saw_it(self):
+        first = rate_limiter.get_rate_limiter('https://shared.example/a', rate=4)
+        second = rate_limiter.get_rate_limiter('https://SHARED.example/b', rate=2)
+        self.assertIs(first, second)
+        # The tighter budget wins
+        self.assertEqual(first.max_rate, 2)
+
+        with self.assertLogs('Second Shop', 'WARNING') as logs:
+            second.on_throttled(0, logging.getLogger('Second Shop'))
+        self.assertIn('Throttled by shared.example', logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import unittest
+
+import jmespath
+import yaml
+
+from tests.support import PACKAGE_DIR, import_from
+
+response_mapper = import_from(PACKAGE_DIR, 'utils.response_mapper')
+
+CONFIG = os.path.join(PACKAGE_DIR, 'configs', 'sites', 'beverages', 'NL_NET_drankdozijn.yaml')
+
+
+def feature(alias, description):
+    return {'alias': alias, 'value': {'description': description}}
+
+
+ITEMS = [
+    {'description': 'Glenfiddich 12', 'price': 39.95, 'alias': 'glenfiddich-12', 'ean': '5010327000176',
+     'structuredData': {'image': ['https://cdn.example/gf12.jpg']},
+     'features': [feature('inhoud', '70cl'), feature('alcoholpercentage', '40%'), feature('land', 'Schotland')]},
+    # The first matching feature has no value: the lookup falls through to the next one
+    {'description': 'Duplicate features',
+     'features': [{'alias': 'inhoud', 'value': None}, feature('inhoud', '50cl'), feature('inhoud', '70cl')]},
+    # Falsy values are kept, only nulls are skipped
+    {'description': 'Falsy', 'features': [feature('serie', ''), feature('categorie', 0), feature('land', False)]},
+    {'description': 'Odd shapes',
+     'features': [{'alias': 'inhoud', 'value': [{'description': '70cl'}]}, 'inhoud', None,
+                  {'alias': 7, 'value': {'description': 'x'}}, {'value': {'description': 'no alias'}},
+                  {'alias': 'land', 'value': {'description': {'nl': 'Schotland'}}}]},
+    {'description': 'Features not a list', 'features': {'alias': 'inhoud', 'value': {'description': '70cl'}}},
+    {'description': 'No features'},
+    'not an object',
+    None,
+]
+
+
+def map_per_row(response_mapping, response):
+    """The original mapping: every field expression evaluated with `jmespath.search` per item."""
+    items = jmespath.search(response_mapping['root'], response) or []
+    return [{field: jmespath.search(mapping, item) for field, mapping in response_mapping['fields'].items()}
+            for item in items]
+
+
+class ResponseMapperTest(unittest.TestCase):
+
+    def setUp(self):
+        with open(CONFIG, encoding='utf-8') as f:
+            self.response_mapping = yaml.safe_load(f)['response_mapping']
+
+    def test_keyed_lookups_match_per_row_jmespath(self):
+        keyed = [field for field, mapping in self.response_mapping['fields'].items()
+                 if response_mapper.KEYED_LOOKUP.match(mapping)]
+        self.assertIn('volume', keyed)
+
+        response = {'data': ITEMS}
+        mapped = response_mapper.ResponseMapper(self.response_mapping).map(response)
+        expected = map_per_row(self.response_mapping, response)
+        for index, (row, expected_row) in enumerate(zip(mapped, expected)):
+            with self.subTest(item=index):
+                self.assertEqual(row, expected_row)
+        self.assertEqual(len(mapped), len(ITEMS))
+        self.assertEqual(mapped[1]['volume'], '50cl')
+
+    def test_default_after_double_pipe(self):
+        mapper = response_mapper.ResponseMapper({'root': 'data', 'fields': {'rating': "reviewScore || `null`",
+                                                                            'in_stock': "availability || 'unknown'"}})
+        self.assertEqual(mapper.map({'data': [{'reviewScore': 4.5}, {}]}),
+                         [{'rating': 4.5, 'in_stock': 'unknown'}, {'rating': None, 'in_stock': 'unknown'}])
+
+    def test_unexpected_root(self):
+        mapper = response_mapper.ResponseMapper(self.response_mapping)
+        self.assertEqual(mapper.map({'data': {'description': 'not a list'}}), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
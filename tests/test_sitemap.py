@@ -0,0 +1,244 @@
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from contextlib import asynccontextmanager
+
+import yaml
+
+from tests.support import PACKAGE_DIR, import_from
+
+sitemap = import_from(PACKAGE_DIR, 'utils.sitemap')
+http_client = import_from(PACKAGE_DIR, 'utils.http_client')
+main = import_from(PACKAGE_DIR, 'main')
+
+SITES_DIR = os.path.join(PACKAGE_DIR, 'configs', 'sites', 'beverages')
+BASE_URL = 'https://shop.example'
+
+
+def urlset(entries, extra=''):
+    urls = ''.join(f'<url><loc>{url}</loc>{f"<lastmod>{lastmod}</lastmod>" if lastmod else ""}{extra}</url>'
+                   for url, lastmod in entries)
+    return (f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+            f'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">{urls}</urlset>').encode()
+
+
+def sitemap_index(entries):
+    sitemaps = ''.join(f'<sitemap><loc>{url}</loc>{f"<lastmod>{lastmod}</lastmod>" if lastmod else ""}</sitemap>'
+                       for url, lastmod in entries)
+    return (f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{sitemaps}</sitemapindex>').encode()
+
+
+def parse(document, chunk_size=7):
+    parser = sitemap.SitemapParser()
+    entries = []
+    for start in range(0, len(document), chunk_size):
+        entries += parser.feed(document[start:start + chunk_size])
+    entries += parser.close()
+    return parser, entries
+
+
+class FakeContent:
+
+    def __init__(self, body):
+        self.body = body
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self.body), size):
+            yield self.body[start:start + size]
+
+
+class FakeStreamResponse:
+
+    def __init__(self, status, body):
+        self.status = status
+        self.content = FakeContent(body)
+
+
+class FakeHttpClient:
+    """Serves `documents` by URL and records every request."""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.requested = []
+
+    async def get(self, url, headers=None, timeout=None):
+        self.requested.append(url)
+        body = self.documents.get(url)
+        return http_client.HttpResponse(url, 404 if body is None else 200, {}, body or b'')
+
+    @asynccontextmanager
+    async def stream(self, url, headers=None, timeout=None):
+        self.requested.append(url)
+        body = self.documents.get(url)
+        yield FakeStreamResponse(404 if body is None else 200, body or b'')
+
+    async def close(self):
+        pass
+
+
+class NoLimit:
+
+    async def acquire(self):
+        pass
+
+
+class SitemapParserTest(unittest.TestCase):
+
+    def test_extension_children_do_not_replace_the_page_url(self):
+        image = ('<image:image><image:loc>https://cdn.shop.example/files/gf12.jpg</image:loc>'
+                 '<image:title>GF12</image:title></image:image>')
+        _, entries = parse(urlset([(f'{BASE_URL}/whisky/gf12', '2024-05-01T10:00:00+02:00')], image))
+        self.assertEqual([entry.url for entry in entries], [f'{BASE_URL}/whisky/gf12'])
+        self.assertEqual(entries[0].lastmod.isoformat(), '2024-05-01T08:00:00+00:00')
+
+    def test_sitemap_index(self):
+        parser, entries = parse(sitemap_index([(f'{BASE_URL}/products-1.xml.gz', '2024-05-01'),
+                                               (f'{BASE_URL}/pages.xml', None)]))
+        self.assertEqual(parser.kind, 'sitemapindex')
+        self.assertEqual([entry.url for entry in entries], [f'{BASE_URL}/products-1.xml.gz', f'{BASE_URL}/pages.xml'])
+        self.assertIsNone(entries[1].lastmod)
+
+    def test_gzip_is_inflated_while_streaming(self):
+        entries = [(f'{BASE_URL}/whisky/p{i}', '2024-05-01') for i in range(3000)]
+        parser, parsed = parse(gzip.compress(urlset(entries)), chunk_size=4096)
+        self.assertEqual(parser.kind, 'urlset')
+        self.assertEqual(len(parsed), 3000)
+        self.assertEqual(parsed[-1].url, f'{BASE_URL}/whisky/p2999')
+
+    def test_parse_lastmod(self):
+        self.assertEqual(sitemap.parse_lastmod('2024-05-01Z').isoformat(), '2024-05-01T00:00:00+00:00')
+        self.assertIsNone(sitemap.parse_lastmod('yesterday'))
+        self.assertIsNone(sitemap.parse_lastmod(None))
+
+
+class SitemapReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_path = os.path.join(self.tmp.name, 'shop.sitemaps.json')
+        self.documents = {
+            f'{BASE_URL}/robots.txt': f'User-agent: *\nSitemap: {BASE_URL}/sitemap_index.xml\n'.encode(),
+            f'{BASE_URL}/sitemap_index.xml': sitemap_index([
+                (f'{BASE_URL}/products-1.xml.gz', '2024-05-01'),
+                (f'{BASE_URL}/nested_index.xml', None),
+                (f'{BASE_URL}/blog.xml', '2024-05-01')]),
+            f'{BASE_URL}/nested_index.xml': sitemap_index([(f'{BASE_URL}/products-2.xml', '2024-05-02')]),
+            f'{BASE_URL}/products-1.xml.gz': gzip.compress(urlset(
+                [(f'{BASE_URL}/whisky/p{i}', '2024-04-01') for i in range(3)] + [(f'{BASE_URL}/whisky/gift-card', None)])),
+            f'{BASE_URL}/products-2.xml': urlset([(f'{BASE_URL}/whisky/p3', '2024-04-02')]),
+            f'{BASE_URL}/blog.xml': urlset([(f'{BASE_URL}/blog/tasting', '2024-04-03')]),
+        }
+        self.client = FakeHttpClient(self.documents)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, **options):
+        reader = sitemap.SitemapReader(self.client, BASE_URL, {}, lambda url: NoLimit(), self.state_path,
+                                       **options)
+
+        async def collect():
+            return [entry async for entry in reader.entries()]
+        return reader, asyncio.run(collect())
+
+    def test_walks_nested_indexes_from_robots_txt(self):
+        _, entries = self.read(include='/whisky/', exclude='gift-card')
+        self.assertEqual(sorted(entry.url for entry in entries), [f'{BASE_URL}/whisky/p{i}' for i in range(4)])
+
+    def test_sitemap_include_narrows_the_index(self):
+        _, entries = self.read(sitemap_include='products|nested')
+        self.assertNotIn(f'{BASE_URL}/blog.xml', self.client.requested)
+        self.assertEqual(len(entries), 5)
+
+    def test_unchanged_sitemaps_are_skipped_once_saved(self):
+        reader, _ = self.read()
+        reader.save()
+        self.client.requested.clear()
+        reader, entries = self.read()
+        # The nested index has no lastmod and is read again; its unchanged child is not
+        self.assertEqual(reader.sitemaps_unchanged, 3)
+        self.assertIn(f'{BASE_URL}/nested_index.xml', self.client.requested)
+        self.assertNotIn(f'{BASE_URL}/products-1.xml.gz', self.client.requested)
+        self.assertNotIn(f'{BASE_URL}/products-2.xml', self.client.requested)
+        self.assertEqual(entries, [])
+
+    def test_unreadable_sitemap_is_read_again_next_time(self):
+        self.documents[f'{BASE_URL}/products-1.xml.gz'] = b'\x1f\x8b broken'
+        reader, _ = self.read()
+        reader.save()
+        with open(self.state_path, encoding='utf-8') as f:
+            self.assertNotIn(f'{BASE_URL}/products-1.xml.gz', json.load(f))
+
+
+def product_page(url):
+    product = {'@type': 'Product', 'name': url.rsplit('/', 1)[-1], 'brand': 'Brand',
+               'offers': {'price': '42.00', 'availability': 'https://schema.org/InStock'}}
+    return f'<html><body><script type="application/ld+json">{json.dumps(product)}</script></body></html>'
+
+
+class WebScraperSitemapTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        # Scrapers keep their state and output under ./data
+        os.chdir(self.tmp.name)
+        self.documents = {
+            f'{BASE_URL}/robots.txt': f'Sitemap: {BASE_URL}/sitemap_index.xml\n'.encode(),
+            f'{BASE_URL}/sitemap_index.xml': sitemap_index([(f'{BASE_URL}/products-1.xml', '2024-05-01')]),
+            f'{BASE_URL}/products-1.xml': urlset([(f'{BASE_URL}/whisky/p{i}', '2024-04-01') for i in range(3)]),
+        }
+        self.client = FakeHttpClient(self.documents)
+        self.failing = set()
+        self.navigated = []
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def scrape(self):
+        config = main.load_and_merge_config('beverages', os.path.join(SITES_DIR, 'NL_WEB_club_whisky.yaml'))
+        with open(os.path.join(SITES_DIR, 'fields.yaml'), encoding='utf-8') as f:
+            config['fieldnames'] = yaml.safe_load(f)['fieldnames']
+        config.update(base_url=BASE_URL, delay=0, rate_limit={'requests_per_second': 1000, 'burst': 100},
+                      sitemap={'enabled': True, 'include': '/whisky/'}, http_cache={'enabled': False})
+        scraper = main.create_scraper(config, http_client=self.client)
+
+        async def navigate(url, context, is_detail_page=False):
+            self.navigated.append(url)
+            return (None, {}) if url in self.failing else (product_page(url), {})
+
+        @asynccontextmanager
+        async def browser_context():
+            yield None
+        scraper._navigate = navigate
+        scraper._browser_context = browser_context
+        asyncio.run(scraper.scrape())
+        return scraper
+
+    def test_sitemap_lastmods_are_only_saved_when_every_page_was_fetched(self):
+        self.failing = {f'{BASE_URL}/whisky/p1'}
+        self.scrape()
+        self.assertFalse(os.path.exists(os.path.join('data', 'state', 'club_whisky.sitemaps.json')))
+
+        # The child sitemap is read again, but only the failed page is fetched
+        self.failing = set()
+        self.navigated.clear()
+        self.scrape()
+        self.assertEqual(self.navigated, [f'{BASE_URL}/whisky/p1'])
+        self.assertTrue(os.path.exists(os.path.join('data', 'state', 'club_whisky.sitemaps.json')))
+
+        self.client.requested.clear()
+        self.navigated.clear()
+        self.scrape()
+        self.assertNotIn(f'{BASE_URL}/products-1.xml', self.client.requested)
+        self.assertEqual(self.navigated, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
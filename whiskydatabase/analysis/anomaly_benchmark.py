@@ -0,0 +1,83 @@
+# analysis/anomaly_benchmark.py
+"""
+Compares the robust z-score and IsolationForest anomaly detectors on synthetic prices.
+
+Run from the analysis directory:
+
+    python anomaly_benchmark.py --groups 5000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from anomaly_detection import detect_anomalies
+
+
+def make_data(groups: int, outlier_rate: float = 0.02, seed: int = 42) -> pd.DataFrame:
+    """
+    Prices per liter for `groups` products: mostly a handful of retailers each, with a
+    long tail of products sold (and scraped over many days) hundreds of times.
+    Outliers are priced 3-10x above or below their product's typical price.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = np.minimum(rng.pareto(1.2, groups) * 8 + 3, 2000).astype(int)
+    group = np.repeat(np.arange(groups), sizes)
+    typical = rng.lognormal(4, 0.8, groups)[group]
+    price = typical * rng.normal(1, 0.08, len(group))
+    outlier = rng.random(len(group)) < outlier_rate
+    factor = rng.uniform(3, 10, outlier.sum())
+    price[outlier] *= np.where(rng.random(outlier.sum()) < 0.5, factor, 1 / factor)
+    return pd.DataFrame({
+        'product_group': group,
+        'price_per_liter': price,
+        'retailer': rng.integers(0, 12, len(group)).astype(str),
+        'outlier': outlier,
+    })
+
+
+def evaluate(data, **kwargs):
+    start = time.perf_counter()
+    anomalies = detect_anomalies(data, **kwargs)
+    seconds = time.perf_counter() - start
+    found = data['outlier'].reindex(anomalies.index)
+    precision = found.mean() if len(found) else 0.0
+    recall = found.sum() / data['outlier'].sum()
+    return seconds, precision, recall
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--groups', type=int, default=5000)
+    arg_parser.add_argument('--contamination', type=float, default=0.02)
+    arg_parser.add_argument('--workers', type=int, default=None)
+    arg_parser.add_argument('--forest-all', action='store_true',
+                            help='Also fit an IsolationForest on every group (one fit per group, slow)')
+    args = arg_parser.parse_args()
+
+    data = make_data(args.groups)
+    sizes = data.groupby('product_group').size()
+    print(f"{len(data):,} prices in {args.groups:,} groups, largest {sizes.max()}, "
+          f"{(sizes >= 200).sum()} with 200+ prices")
+
+    large = data[data['product_group'].map(sizes) >= 200]
+    runs = [
+        ('all groups', 'robust_z (mad)', data, dict(min_forest_size=np.inf)),
+        ('all groups', 'robust_z (iqr)', data, dict(min_forest_size=np.inf, statistic='iqr')),
+        ('all groups', 'combined', data, dict()),
+        ('200+ prices', 'robust_z (mad)', large, dict(min_forest_size=np.inf)),
+        ('200+ prices', 'isolation_forest', large, dict(min_forest_size=0)),
+    ]
+    if args.forest_all:
+        runs.append(('all groups', 'isolation_forest', data, dict(min_forest_size=0)))
+    print(f"{'groups':<12} {'detector':<18} {'seconds':>8} {'precision':>10} {'recall':>7}")
+    for groups, name, subset, kwargs in runs:
+        seconds, precision, recall = evaluate(
+            subset, contamination=args.contamination, max_workers=args.workers, **kwargs)
+        print(f"{groups:<12} {name:<18} {seconds:>8.2f} {precision:>10.3f} {recall:>7.3f}")
+
+
+if __name__ == '__main__':
+    main()
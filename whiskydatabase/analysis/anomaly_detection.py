@@ -1,29 +1,105 @@
 # analysis/anomaly_detection.py
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import IsolationForest
 from data_processing import preprocess_data
 
+# Groups with at least this many prices get an IsolationForest, smaller ones robust z-scores
+MIN_FOREST_SIZE = 200
+# Modified z-score above which a price is an outlier (Iglewicz and Hoaglin)
+Z_THRESHOLD = 3.5
+# MAD and IQR of a normal distribution in standard deviations
+MAD_SCALE = 1.4826
+IQR_SCALE = 1.349
+# Mean absolute deviation in standard deviations, used when the MAD is 0
+MEAN_AD_SCALE = 1.2533
+
+
+def robust_zscores(values, groups, statistic='mad'):
+    """
+    Per-group robust z-scores of `values`: the distance to the group median in units
+    of the scaled MAD (`statistic='mad'`) or IQR (`statistic='iqr'`). Where more than
+    half of a group has the same price the MAD is 0 and the mean absolute deviation
+    is used instead; a group without any spread scores 0.
+    """
+    grouped = values.groupby(groups, sort=False)
+    median = grouped.transform('median')
+    deviation = (values - median).abs()
+    if statistic == 'mad':
+        scale = deviation.groupby(groups, sort=False).transform('median') * MAD_SCALE
+    elif statistic == 'iqr':
+        scale = (grouped.transform('quantile', 0.75) - grouped.transform('quantile', 0.25)) / IQR_SCALE
+    else:
+        raise ValueError(f"Unknown statistic: {statistic}")
+    mean_deviation = deviation.groupby(groups, sort=False).transform('mean') * MEAN_AD_SCALE
+    scale = scale.where(scale > 0, mean_deviation)
+    return ((values - median) / scale.where(scale > 0)).fillna(0.0)
+
+
+def isolation_forest_scores(values, contamination=0.1):
+    """Fits an IsolationForest on one group's prices; returns (is outlier, anomaly score)."""
+    model = IsolationForest(contamination=contamination, random_state=42)
+    values = values.reshape(-1, 1)
+    model.fit(values)
+    return model.predict(values) == -1, -model.score_samples(values)
+
 
-def detect_anomalies(data, contamination=0.1):
-    anomalies = pd.DataFrame()
+def _fit_forests(group_prices, contamination, max_workers=None):
+    """`isolation_forest_scores` for each group, on a process pool when there is more than one CPU."""
+    workers = min(max_workers or os.cpu_count() or 1, len(group_prices))
+    contaminations = [contamination] * len(group_prices)
+    if workers <= 1:
+        return list(map(isolation_forest_scores, group_prices, contaminations))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(isolation_forest_scores, group_prices, contaminations,
+                                 chunksize=max(1, len(group_prices) // (workers * 4))))
+
+
+def detect_anomalies(data, contamination=0.1, min_forest_size=MIN_FOREST_SIZE,
+                     z_threshold=Z_THRESHOLD, statistic='mad', max_workers=None):
+    """
+    Finds unusual `price_per_liter` values within each `product_group` sold by more
+    than one retailer. Groups with fewer than `min_forest_size` prices are scored in
+    one vectorized pass with `robust_zscores`; larger groups each get an
+    IsolationForest, fitted in parallel on a process pool.
+
+    Returns the anomalous rows of `data` with `anomaly`, `anomaly_score` and `detector`
+    columns.
+    """
     data_ml = data[['product_group', 'price_per_liter', 'retailer']].dropna()
+    groups = data_ml.groupby('product_group', sort=False, observed=True)
+    sizes = groups['price_per_liter'].transform('size')
+    data_ml = data_ml[groups['retailer'].transform('nunique') > 1]  # Ensure multiple retailers
+    sizes = sizes[data_ml.index]
+
+    anomaly = pd.Series(False, index=data_ml.index)
+    score = pd.Series(np.nan, index=data_ml.index)
+    detector = pd.Series('robust_z', index=data_ml.index, dtype=object)
+
+    small = data_ml[sizes < min_forest_size]
+    if not small.empty:
+        z = robust_zscores(small['price_per_liter'].astype('float64'), small['product_group'], statistic)
+        anomaly[small.index] = z.abs() > z_threshold
+        score[small.index] = z.abs()
+
+    large = data_ml[sizes >= min_forest_size]
+    if not large.empty:
+        indices = list(large.groupby('product_group', sort=False, observed=True).indices.values())
+        prices = large['price_per_liter'].to_numpy(dtype='float64')
+        for idx, (outliers, scores) in zip(indices, _fit_forests(
+                [prices[idx] for idx in indices], contamination, max_workers)):
+            rows = large.index[idx]
+            anomaly[rows] = outliers
+            score[rows] = scores
+        detector[large.index] = 'isolation_forest'
 
-    for group_id in data_ml['product_group'].unique():
-        group_data = data_ml[data_ml['product_group'] == group_id].copy()
-        if len(group_data['retailer'].unique()) > 1:  # Ensure multiple retailers
-            model = IsolationForest(
-                contamination=contamination, random_state=42)
-            model.fit(group_data[['price_per_liter']])
-            group_data.loc[:, 'anomaly'] = model.predict(
-                group_data[['price_per_liter']]) == -1
-            anomalies = pd.concat(
-                [anomalies, group_data[group_data['anomaly']]], ignore_index=True)
-
-    # Merge anomalies with original data
-    anomalies = anomalies.merge(
-        data, on=['product_group', 'price_per_liter', 'retailer'], how='left')
-    return anomalies
+    flagged = anomaly[anomaly].index
+    return data.loc[flagged].assign(anomaly=True, anomaly_score=score[flagged],
+                                    detector=detector[flagged])
 
 
 def main():
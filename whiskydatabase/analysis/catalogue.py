@@ -0,0 +1,280 @@
+# analysis/catalogue.py
+"""
+Persistent catalogue of canonical products, so product matching is incremental.
+
+Every listing, a (retailer, product_id or link) pair, is mapped to a canonical product
+whose id stays the same across runs. Only listings the catalogue has not seen before
+are matched, first by EAN, then against an inverted index of canonical name tokens,
+so the cost of a run depends on the number of new listings, not on the history.
+"""
+
+import math
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+from matching import DEFAULT_BLOCK_ON, UnionFind, blocking_keys, build_matching_keys, match_products
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS canonical_products (
+    id INTEGER PRIMARY KEY,
+    name_clean TEXT NOT NULL,
+    matching_key TEXT NOT NULL,
+    brand TEXT,
+    volume TEXT,
+    abv TEXT,
+    attributes TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS listings (
+    retailer TEXT NOT NULL,
+    listing_key TEXT NOT NULL,
+    product_id INTEGER NOT NULL REFERENCES canonical_products(id),
+    PRIMARY KEY (retailer, listing_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS eans (
+    ean TEXT PRIMARY KEY,
+    product_id INTEGER NOT NULL REFERENCES canonical_products(id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tokens (
+    token TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS name_tokens (
+    attributes TEXT NOT NULL,
+    token TEXT NOT NULL,
+    product_id INTEGER NOT NULL REFERENCES canonical_products(id),
+    PRIMARY KEY (attributes, token, product_id)
+) WITHOUT ROWID;
+"""
+
+# EAN-8, UPC-A, EAN-13 and GTIN-14, stored zero-padded to 14 digits
+GTIN = r'^(?:\d{8}|\d{12,14})$'
+PRODUCT_COLUMNS = ['name_clean', 'matching_key', 'brand', 'volume', 'abv', 'attributes']
+# SQLite's default limit on bound parameters is 999 on older builds
+LOOKUP_CHUNK = 500
+
+
+class ProductCatalogue:
+    """
+    SQLite-backed canonical products (`data/catalogue.db` by default).
+
+    New listings are resolved in this order:
+
+    1. a known EAN: `product_id` values that look like a GTIN (DrankDozijn's are EANs)
+    2. the new listings are clustered among themselves with `matching.match_products`,
+       and each cluster is probed against the token index of the canonical names
+    3. otherwise the cluster becomes a new canonical product
+    """
+
+    def __init__(self, path=os.path.join('data', 'catalogue.db'), threshold=90,
+                 block_on=DEFAULT_BLOCK_ON):
+        self.path = path
+        self.threshold = threshold
+        self.block_on = block_on
+        # The token index stands in for the brand, the other block keys must be equal
+        self.attributes_on = tuple(key for key in block_on if key != 'brand')
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def assign(self, data):
+        """
+        Adds `name_clean`, `matching_key` and a stable `product_group` (the canonical
+        product id) to `data`, registering the listings the catalogue has not seen yet.
+        """
+        data = build_matching_keys(data)
+        data['listing_key'] = listing_keys(data)
+        listings = data.drop_duplicates(['retailer', 'listing_key']).reset_index(drop=True)
+        listings['retailer'] = listings['retailer'].astype(str)
+
+        known = self._known_listings(listings)
+        new = listings[~listings.set_index(['retailer', 'listing_key']).index.isin(known.index)]
+        if not new.empty:
+            with self.conn:
+                known = pd.concat([known, self._add_listings(new.reset_index(drop=True))])
+
+        index = pd.MultiIndex.from_arrays([data['retailer'].astype(str), data['listing_key']])
+        data['product_group'] = known.reindex(index).to_numpy()
+        return data
+
+    def products(self):
+        """The canonical products with their number of listings."""
+        return pd.read_sql_query(
+            'SELECT p.id AS product_group, p.name_clean, p.brand, p.volume, p.abv, '
+            'COUNT(l.listing_key) AS listings FROM canonical_products p '
+            'LEFT JOIN listings l ON l.product_id = p.id GROUP BY p.id', self.conn)
+
+    def link_price_store(self, db_path=os.path.join('data', 'prices.db')):
+        """
+        Sets `products.product_group` in the scrapers' price store (see
+        `utils.price_store.PriceStore`) to the canonical product id of each offer's
+        listing, so price histories can be compared across retailers. An offer's key,
+        its `product_id` else its `link`, is the listing key. Returns the number of
+        products whose group changed.
+        """
+        self.conn.execute('ATTACH DATABASE ? AS prices', (db_path,))
+        try:
+            with self.conn:
+                return self.conn.execute(
+                    'UPDATE prices.products AS p SET product_group = g.product_group FROM ('
+                    'SELECT o.product_id AS id, l.product_id AS product_group FROM prices.offers o '
+                    'JOIN listings l ON l.retailer = o.retailer AND l.listing_key = o.offer_key) AS g '
+                    'WHERE p.id = g.id AND p.product_group IS NOT g.product_group').rowcount
+        finally:
+            self.conn.execute('DETACH DATABASE prices')
+
+    def _known_listings(self, listings):
+        found = []
+        for retailer, keys in listings.groupby('retailer', sort=False)['listing_key']:
+            keys = keys.tolist()
+            for start in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[start:start + LOOKUP_CHUNK]
+                found += self.conn.execute(
+                    f'SELECT retailer, listing_key, product_id FROM listings '
+                    f'WHERE retailer = ? AND listing_key IN ({",".join("?" * len(chunk))})',
+                    (retailer, *chunk)).fetchall()
+        known = pd.DataFrame(found, columns=['retailer', 'listing_key', 'product_id'])
+        return known.set_index(['retailer', 'listing_key'])['product_id']
+
+    def _add_listings(self, new):
+        """Resolves `new` listings to canonical products and stores them."""
+        eans = gtins(new)
+        product_ids = pd.Series(self._known_eans(eans.dropna().unique()), dtype='float64')
+        ean_products = eans.map(product_ids)
+
+        # Fuzzy clusters of the new listings, joined by shared EANs
+        clusters = match_products(new, self.threshold, self.block_on)
+        union_find = UnionFind(clusters.max() + 1)
+        for members in pd.Series(clusters).groupby(eans.to_numpy()).unique():
+            for cluster in members[1:]:
+                union_find.union(members[0], cluster)
+        clusters = np.array([union_find.find(cluster) for cluster in clusters])
+
+        # Clusters of this batch were already kept apart by match_products, so only
+        # products from earlier runs are probed
+        previous_id = self.conn.execute('SELECT MAX(id) FROM canonical_products').fetchone()[0]
+        new = new.assign(attributes=blocking_keys(new, self.attributes_on))
+        records = new.reindex(columns=PRODUCT_COLUMNS).astype(object).to_dict('records')
+        ean_products = ean_products.to_numpy(dtype='float64')
+        resolved = np.empty(len(new), dtype=np.int64)
+        for members in pd.Series(clusters).groupby(clusters, sort=False).indices.values():
+            matched = ean_products[members][~np.isnan(ean_products[members])]
+            if len(matched):
+                product_id = int(matched[0])
+            else:
+                product_id = self._probe([records[i] for i in members], previous_id) if previous_id else None
+                if product_id is None:
+                    product_id = self._add_product(records[members[0]])
+            resolved[members] = product_id
+        # Listings with a known EAN keep its product even if their name clusters elsewhere
+        known_ean = ~np.isnan(ean_products)
+        resolved[known_ean] = ean_products[known_ean]
+
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO listings (retailer, listing_key, product_id) VALUES (?, ?, ?)',
+            zip(new['retailer'], new['listing_key'], resolved.tolist()))
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO eans (ean, product_id) VALUES (?, ?)',
+            [(ean, product_id) for ean, product_id in zip(eans, resolved.tolist()) if isinstance(ean, str)])
+        return pd.Series(resolved, index=pd.MultiIndex.from_frame(new[['retailer', 'listing_key']]),
+                         name='product_id')
+
+    def _known_eans(self, eans):
+        found = {}
+        eans = list(eans)
+        for start in range(0, len(eans), LOOKUP_CHUNK):
+            chunk = eans[start:start + LOOKUP_CHUNK]
+            found.update(self.conn.execute(
+                f'SELECT ean, product_id FROM eans WHERE ean IN ({",".join("?" * len(chunk))})', chunk))
+        return found
+
+    def _probe(self, listings, previous_id):
+        """Returns the canonical product up to `previous_id` one of `listings` matches, if any."""
+        for listing in listings:
+            tokens = set(listing['name_clean'].split())
+            if not tokens:
+                continue
+            probe = self._probe_tokens(tokens)
+            candidates = dict(self.conn.execute(
+                f'SELECT DISTINCT p.id, p.matching_key FROM name_tokens t '
+                f'JOIN canonical_products p ON p.id = t.product_id '
+                f'WHERE t.attributes = ? AND t.token IN ({",".join("?" * len(probe))}) AND t.product_id <= ?',
+                (listing['attributes'], *probe, previous_id)))
+            match = process.extractOne(listing['matching_key'], candidates, scorer=fuzz.token_sort_ratio,
+                                       score_cutoff=self.threshold)
+            if match:
+                return match[2]
+        return None
+
+    def _probe_tokens(self, tokens):
+        """
+        The rarest tokens of a name. A similar canonical name shares most tokens with it,
+        roughly `2 * threshold - 100` percent, so it has at least one of the
+        `len(tokens) - shared + 1` rarest ones and only their posting lists are read.
+        """
+        tokens = list(tokens)
+        shared = max(1, math.floor(len(tokens) * (2 * self.threshold - 100) / 100))
+        frequencies = {}
+        for start in range(0, len(tokens), LOOKUP_CHUNK):
+            chunk = tokens[start:start + LOOKUP_CHUNK]
+            frequencies.update(self.conn.execute(
+                f'SELECT token, df FROM tokens WHERE token IN ({",".join("?" * len(chunk))})', chunk))
+        tokens.sort(key=lambda token: frequencies.get(token, 0))
+        return tokens[:len(tokens) - shared + 1]
+
+    def _add_product(self, listing):
+        product_id = self.conn.execute(
+            'INSERT INTO canonical_products (name_clean, matching_key, brand, volume, abv, attributes) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (listing['name_clean'], listing['matching_key'], _text(listing['brand']),
+             _text(listing['volume']), _text(listing['abv']), listing['attributes'])).lastrowid
+        tokens = set(listing['name_clean'].split())
+        self.conn.executemany('INSERT INTO name_tokens (attributes, token, product_id) VALUES (?, ?, ?)',
+                              [(listing['attributes'], token, product_id) for token in tokens])
+        self.conn.executemany('INSERT INTO tokens (token, df) VALUES (?, 1) '
+                              'ON CONFLICT (token) DO UPDATE SET df = df + 1', [(token,) for token in tokens])
+        return product_id
+
+
+def listing_keys(data):
+    """A listing is identified by its `product_id`, else its `link`, else its matching key."""
+    key = data['matching_key'].astype(object)
+    for column in ('link', 'product_id'):
+        if column in data:
+            values = _identifiers(data[column])
+            key = values.where(values.notna(), key)
+    return key
+
+
+def gtins(listings):
+    """The `product_id` of each listing as a 14-digit GTIN where it looks like an EAN/UPC, else NaN."""
+    if 'product_id' not in listings:
+        return pd.Series(np.nan, index=listings.index, dtype=object)
+    ids = _identifiers(listings['product_id'])
+    return ids.where(ids.str.fullmatch(GTIN).fillna(False)).str.zfill(14)
+
+
+def _identifiers(values):
+    """Values as stripped strings, NaN where empty. Integer ids read as floats lose their '.0'."""
+    values = values.astype(object)
+    strings = values.astype(str).str.strip().str.replace(r'^(\d+)\.0$', r'\1', regex=True)
+    return strings.where(values.notna() & (strings != '')).astype(object)
+
+
+def _text(value):
+    return None if value is None or pd.isna(value) or value == '' else str(value)
@@ -0,0 +1,76 @@
+# analysis/currency.py
+"""
+Converts prices to EUR with the daily exchange rates cached by the scrapers
+(`data/fx/rates-YYYY-MM-DD.json`, units of each currency per 1 EUR).
+"""
+
+import glob
+import json
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+def load_rates(data_folder='data', rates_file=None):
+    """
+    Returns the cached rates as a DataFrame of `date`, `currency` and `per_eur`, one row
+    per day and currency. `rates_file` (same JSON layout) is used instead when given.
+    """
+    paths = [rates_file] if rates_file else sorted(glob.glob(os.path.join(data_folder, 'fx', 'rates-*.json')))
+    frames = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        rates = payload['rates']
+        frames.append(pd.DataFrame({
+            'date': pd.Timestamp(payload.get('date', '1970-01-01')),
+            'currency': [currency.upper() for currency in rates],
+            'per_eur': np.array(list(rates.values()), dtype='float64'),
+        }))
+    if not frames:
+        return pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), 'currency': pd.Series(dtype=object),
+                             'per_eur': pd.Series(dtype='float64')})
+    return pd.concat(frames, ignore_index=True).sort_values('date', kind='stable', ignore_index=True)
+
+
+def to_eur(amounts, currencies, rates, dates=None):
+    """
+    Converts `amounts` in `currencies` to EUR as one column operation. Without `dates`
+    the most recent rate of each currency is used; with `dates` (e.g. `scraped_at`)
+    each row uses the rate of the nearest cached day, or the most recent one when it has
+    no date. EUR amounts are returned as is, amounts in a currency without a rate become NaN.
+    """
+    amounts = pd.Series(amounts)
+    currencies = pd.Series(currencies, index=amounts.index).astype('category')
+    codes = currencies.cat.categories.astype(str).str.strip().str.upper()
+
+    latest = rates.drop_duplicates('currency', keep='last').set_index('currency')['per_eur']
+    per_eur = pd.Series(codes.map(latest.to_dict()), index=currencies.cat.categories)
+    per_eur[codes == 'EUR'] = 1.0
+    factor = currencies.map(per_eur).astype('float64')
+
+    if dates is not None and not rates.empty:
+        # Rates are looked up once per distinct date and currency; scrape times repeat a lot
+        date_codes, date_values = pd.factorize(pd.Series(dates, index=amounts.index), use_na_sentinel=False)
+        currency_codes = currencies.cat.codes.to_numpy()
+        pair_codes, pairs = pd.factorize(date_codes.astype('int64') * (len(codes) + 1) + currency_codes + 1)
+        pair_dates = pd.to_datetime(pd.Series(date_values), errors='coerce').dt.normalize()
+        lookup = pd.DataFrame({
+            'date': pair_dates.to_numpy()[pairs // (len(codes) + 1)].astype('datetime64[ns]'),
+            'currency': np.append(codes.to_numpy(dtype=object), None)[pairs % (len(codes) + 1) - 1],
+            'pair': np.arange(len(pairs)),
+        })
+        lookup = lookup[lookup['date'].notna() & lookup['currency'].notna() & (lookup['currency'] != 'EUR')]
+        merged = pd.merge_asof(lookup.sort_values('date'), rates.astype({'date': 'datetime64[ns]'}),
+                               on='date', by='currency', direction='nearest').dropna(subset=['per_eur'])
+        pair_rates = np.full(len(pairs), np.nan)
+        pair_rates[merged['pair'].to_numpy()] = merged['per_eur'].to_numpy()
+        dated = pair_rates[pair_codes]
+        factor = factor.where(np.isnan(dated), dated)
+
+    missing = currencies[factor.isna() & amounts.notna()].dropna().unique()
+    if len(missing):
+        warnings.warn(f"No exchange rate for {', '.join(map(str, missing))}; those prices are left as NaN")
+    return amounts / factor
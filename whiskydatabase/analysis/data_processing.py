@@ -1,75 +1,259 @@
 # analysis/data_processing.py
 
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
 import pandas as pd
-import glob
-from rapidfuzz import process, fuzz
-from utils import clean_text, parse_volume, parse_price
+from pandas.api.types import union_categoricals
+from catalogue import ProductCatalogue
+from currency import load_rates, to_eur
+from matching import assign_product_groups
+from utils import normalize_price, normalize_volume
+
+
+# Low-cardinality text columns are loaded as categories and prices as float32
+CATEGORY_COLUMNS = ['retailer', 'retailer_country', 'currency', 'country', 'category', 'brand']
+FLOAT_COLUMNS = ['price', 'original_price', 'rating']
+
+# data/raw/YYYY/MM/DD/<retailer>-<uuid>.csv.gz
+RAW_FILE = re.compile(r'^(?P<retailer>.+)-[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12}\.csv\.gz$')
+
+
+def load_data(data_folder='data', storage='csv', columns=None, retailers=None,
+              start_date=None, end_date=None, chunksize=None, max_workers=None):
+    """
+    Loads the scraped data, either from the CSV files under `data_folder/raw/YYYY/MM/DD`
+    or from the partitioned Parquet dataset (`storage='parquet'`).
+
+    Only the partitions within `start_date`..`end_date` (inclusive) and for the given
+    `retailers` (names or slugs) are read, and only the given columns. CSV files are read
+    in parallel. With `chunksize`, returns an iterator of DataFrames of at most that
+    many rows instead of one combined DataFrame.
+    """
+    if storage == 'parquet':
+        return load_parquet_data(data_folder, columns, retailers, start_date, end_date, chunksize)
+
+    files = find_data_files(data_folder, retailers, start_date, end_date)
+    if chunksize:
+        return _iter_csv(files, columns, chunksize)
+
+    with ThreadPoolExecutor(max_workers=max_workers or min(8, os.cpu_count() or 1)) as executor:
+        frames = list(executor.map(lambda file: _read_csv(file, columns), files))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return _concat(frames)
+
+
+def find_data_files(data_folder='data', retailers=None, start_date=None, end_date=None):
+    """Lists the raw CSV files for a date range and retailers, skipping other day folders entirely."""
+    start = pd.Timestamp(start_date).date() if start_date else date.min
+    end = pd.Timestamp(end_date).date() if end_date else date.max
+    slugs = {retailer.lower().replace(' ', '_') for retailer in retailers} if retailers else None
+
+    files = []
+    raw_folder = os.path.join(data_folder, 'raw')
+    for year in _numbered_dirs(raw_folder):
+        if not start.year <= year <= end.year:
+            continue
+        for month in _numbered_dirs(os.path.join(raw_folder, f'{year}')):
+            if not (start.year, start.month) <= (year, month) <= (end.year, end.month):
+                continue
+            for day in _numbered_dirs(os.path.join(raw_folder, f'{year}', f'{month:02d}')):
+                try:
+                    if not start <= date(year, month, day) <= end:
+                        continue
+                except ValueError:
+                    continue
+                day_folder = os.path.join(raw_folder, f'{year}', f'{month:02d}', f'{day:02d}')
+                for filename in sorted(os.listdir(day_folder)):
+                    match = RAW_FILE.match(filename)
+                    if match and (slugs is None or match['retailer'] in slugs):
+                        files.append(os.path.join(day_folder, filename))
+    return files
+
+
+def _numbered_dirs(folder):
+    if not os.path.isdir(folder):
+        return []
+    return sorted(int(name) for name in os.listdir(folder)
+                  if name.isdigit() and os.path.isdir(os.path.join(folder, name)))
+
+
+def _read_csv(file, columns, chunksize=None):
+    wanted = set(columns) if columns else None
+    return pd.read_csv(
+        file, compression='gzip', chunksize=chunksize,
+        usecols=(lambda column: column in wanted) if wanted else None,
+        dtype={column: 'category' for column in CATEGORY_COLUMNS})
+
+
+def _iter_csv(files, columns, chunksize):
+    for file in files:
+        with _read_csv(file, columns, chunksize) as reader:
+            for chunk in reader:
+                yield _apply_dtypes(chunk)
 
 
-def load_data(data_folder='data'):
+def _apply_dtypes(data):
+    for column in CATEGORY_COLUMNS:
+        if column in data and not isinstance(data[column].dtype, pd.CategoricalDtype):
+            data[column] = data[column].astype('category')
+    for column in FLOAT_COLUMNS:
+        if column in data and data[column].dtype != 'float32':
+            data[column] = normalize_price(data[column]).astype('float32')
+    return data
+
+
+def _concat(frames):
+    """Concatenates frames, keeping category columns as categories."""
+    frames = [_apply_dtypes(frame) for frame in frames]
+    for column in CATEGORY_COLUMNS:
+        present = [frame[column] for frame in frames if column in frame]
+        if len(present) > 1:
+            categories = union_categoricals(present).categories
+            for frame in frames:
+                if column in frame:
+                    frame[column] = frame[column].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_parquet_data(data_folder='data', columns=None, retailers=None,
+                      start_date=None, end_date=None, chunksize=None):
+    """
+    Reads `data_folder/parquet/date=YYYY-MM-DD/retailer_slug=<retailer>/*.parquet`.
+    `retailers` are names or slugs; `start_date`/`end_date` are inclusive ISO dates.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    partition_schema = pa.schema([('date', pa.string()), ('retailer_slug', pa.string())])
+    # With a schema given no file is opened yet; the real one is built after pruning
+    dataset = ds.dataset(f'{data_folder}/parquet', format='parquet', schema=partition_schema,
+                         partitioning=ds.partitioning(partition_schema, flavor='hive'))
+
+    filters = []
+    if retailers:
+        slugs = [retailer.lower().replace(' ', '_') for retailer in retailers]
+        filters.append(ds.field('retailer_slug').isin(slugs))
+    if start_date:
+        filters.append(ds.field('date') >= str(pd.Timestamp(start_date).date()))
+    if end_date:
+        filters.append(ds.field('date') <= str(pd.Timestamp(end_date).date()))
+    expression = None
+    for condition in filters:
+        expression = condition if expression is None else expression & condition
+
+    # Only the footers of the files in the selected partitions are read
+    schema = _unified_schema(dataset, expression)
+    if schema is None:
+        return iter(()) if chunksize else pd.DataFrame(columns=columns)
+    dataset = dataset.replace_schema(schema)
+
+    if chunksize:
+        return (_apply_dtypes(batch.to_pandas())
+                for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=chunksize))
+    return _apply_dtypes(dataset.to_table(columns=columns, filter=expression).to_pandas())
+
+
+def _unified_schema(dataset, expression=None):
+    """
+    The schema of the files matching the partition `expression`, None if there are
+    none. Sites may type the same column differently (e.g. `abv` parsed as a float on
+    one site and kept as text on another); such columns are read as strings.
+    """
+    import pyarrow as pa
+
+    types = {}
+    for fragment in dataset.get_fragments(filter=expression):
+        for field in fragment.physical_schema:
+            types.setdefault(field.name, set()).add(field.type)
+    if not types:
+        return None
+    fields = [pa.field(name, kinds.pop() if len(kinds) == 1 else pa.string())
+              for name, kinds in types.items()]
+    fields += [dataset.schema.field(name) for name in ('date', 'retailer_slug')]
+    return pa.schema(fields)
+
+
+def load_price_history(db_path='data/prices.db', product_group=None, retailers=None, since=None):
     """
-    Loads all CSV files from the data folder and combines them into a single DataFrame.
+    Reads price/stock changes from the scrapers' SQLite price store, one row per
+    observation joined with its offer and product. `product_group` is the catalogue's
+    canonical product id, set by `preprocess_data` (see `ProductCatalogue.link_price_store`).
     """
-    files = glob.glob(f'{data_folder}/*.csv.gz')
-    df_list = [pd.read_csv(file, compression='gzip') for file in files]
-    combined_df = pd.concat(df_list, ignore_index=True)
-    return combined_df
+    query = (
+        'SELECT p.id AS product_id, p.product_group, p.name, p.volume, o.retailer, o.link, '
+        'o.currency, h.observed_at, h.price, h.original_price, h.in_stock '
+        'FROM price_observations h JOIN offers o ON o.id = h.offer_id '
+        'JOIN products p ON p.id = o.product_id WHERE 1 = 1')
+    params = []
+    if product_group is not None:
+        query += ' AND p.product_group = ?'
+        params.append(product_group)
+    if retailers:
+        query += f' AND o.retailer IN ({",".join("?" * len(retailers))})'
+        params.extend(retailers)
+    if since:
+        query += ' AND h.observed_at >= ?'
+        params.append(str(since))
+    query += ' ORDER BY h.observed_at'
 
+    with sqlite3.connect(db_path) as conn:
+        return pd.read_sql_query(query, conn, params=params, parse_dates=['observed_at'])
 
-def normalize_prices(data):
+
+def normalize_prices(data, rates=None):
     """
     Normalizes prices based on volume to get price per liter.
-    Assumes volume is in centiliters (cl).
+    Adds `volume_l`, `price_eur` and `price_per_liter` (in EUR) and turns `price` into a
+    float column. Prices are converted with `rates` (see `currency.load_rates`, by
+    default the rates cached under `data/fx`) of the day they were scraped.
     """
-    # Clean and parse volume and price
-    data['volume_cl'] = data['volume'].apply(parse_volume)
-    data['volume_l'] = data['volume_cl'] / 100  # Convert to liters
-    data['price'] = data['price'].apply(parse_price)
+    data['volume_l'] = normalize_volume(data['volume']).astype('float32')
+    data['price'] = normalize_price(data['price']).astype('float32')
+    if 'currency' in data:
+        rates = load_rates() if rates is None else rates
+        dates = data['scraped_at'] if 'scraped_at' in data else None
+        data['price_eur'] = to_eur(data['price'], data['currency'], rates, dates).astype('float32')
+    else:
+        data['price_eur'] = data['price']
     # Calculate price per liter
-    data['price_per_liter'] = data['price'] / data['volume_l']
+    data['price_per_liter'] = data['price_eur'] / data['volume_l'].where(data['volume_l'] > 0)
     return data
 
 
-def standardize_product_names(data, threshold=90):
+def standardize_product_names(data, threshold=90, catalogue_path=None, price_db_path=None):
     """
-    Uses rapidfuzz to group similar product names and assigns a standardized name or group ID.
+    Groups similar product names across retailers and assigns a group ID per product.
+    With `catalogue_path`, group IDs are the stable ids of the persistent product
+    catalogue and only listings it has not seen yet are matched (see
+    `catalogue.ProductCatalogue`); otherwise all names are clustered from scratch
+    (see `matching.assign_product_groups`). The catalogue's ids are also written to
+    the price store at `price_db_path`, if it exists, for `load_price_history`.
     """
-    # Clean product names
-    data['name_clean'] = data['name'].apply(clean_text)
-
-    # Combine attributes to create a matching key
-    data['matching_key'] = data.apply(
-        lambda row: f"{row['name_clean']} {row['volume']}cl {row['abv']}%", axis=1
-    )
-
-    unique_products = data['matching_key'].unique()
-    product_to_group = {}
-    group_id = 0
-
-    for product in unique_products:
-        if product not in product_to_group:
-            # Find similar products
-            matches = process.extract(
-                product, unique_products, scorer=fuzz.token_sort_ratio, limit=None)
-            # Keep matches above the threshold
-            similars = [match for match, score,
-                        _ in matches if score >= threshold]
-            # Assign group ID to similar products
-            for similar_product in similars:
-                product_to_group[similar_product] = group_id
-            group_id += 1
-
-    data['product_group'] = data['matching_key'].map(product_to_group)
-    return data
+    if catalogue_path is None:
+        return assign_product_groups(data, threshold)
+    with ProductCatalogue(catalogue_path, threshold) as catalogue:
+        data = catalogue.assign(data)
+        if price_db_path and os.path.exists(price_db_path):
+            catalogue.link_price_store(price_db_path)
+        return data
 
 
-def preprocess_data(data_folder='data', threshold=90):
+def preprocess_data(data_folder='data', threshold=90, storage='csv', catalogue_path=''):
     """
     Loads data, normalizes prices, and standardizes product names.
+    `catalogue_path` defaults to `data_folder/catalogue.db`; pass None to re-cluster.
     """
-    data = load_data(data_folder)
-    data = normalize_prices(data)
-    data = standardize_product_names(data, threshold)
+    if catalogue_path == '':
+        catalogue_path = os.path.join(data_folder, 'catalogue.db')
+    data = load_data(data_folder, storage)
+    data = normalize_prices(data, load_rates(data_folder))
+    data = standardize_product_names(data, threshold, catalogue_path,
+                                     os.path.join(data_folder, 'prices.db'))
     return data
 
 
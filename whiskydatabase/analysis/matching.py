@@ -0,0 +1,155 @@
+# analysis/matching.py
+"""
+Groups listings of the same product across retailers.
+
+Listings are first split into blocks by cheap keys (brand, volume, ABV and age
+statement), so fuzzy scores are only computed between listings that could be the same
+product. Within a block all pairs are scored at once with `rapidfuzz.process.cdist`,
+and pairs above the threshold are merged transitively with a union-find.
+"""
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+from utils import normalize_price, normalize_volume
+
+DEFAULT_BLOCK_ON = ('brand', 'volume', 'abv', 'age')
+# '12 years', '12yo', '12 y.o.', '12 jaar', '12 Jahre', '12 ans'
+AGE_STATEMENT = r'\b(?P<age>\d{1,2})\s*(?:years?|yrs?|yo|y\s?o|jaar|jahre|ans)\b'
+# Rows of a block scored per cdist call, bounding the score matrix to CHUNK x block size
+CHUNK = 2048
+
+
+class UnionFind:
+    """Disjoint sets over 0..n-1 with path halving and union by size."""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+    def add(self):
+        self.parent.append(len(self.parent))
+        self.size.append(1)
+        return len(self.parent) - 1
+
+
+def clean_names(names):
+    """Vectorized `utils.clean_text`."""
+    names = pd.Series(names)
+    cleaned = (names.where(names.map(type).eq(str) if names.dtype == object else names.notna())
+               .astype(object).fillna('').astype(str)
+               .str.strip()
+               .str.replace(r'\s+', ' ', regex=True)
+               .str.replace(r'[^\w\s]', '', regex=True)
+               .str.lower())
+    return cleaned
+
+
+def build_matching_keys(data):
+    """
+    Adds `name_clean` and `matching_key` ('<name> <volume>cl <abv>%') to `data`.
+    Each distinct name/volume/abv combination is formatted once.
+    """
+    data['name_clean'] = clean_names(data['name'])
+    columns = ['name_clean', 'volume', 'abv']
+    combos = data[columns].astype(object).drop_duplicates()
+    keys = [f"{name} {volume}cl {abv}%" for name, volume, abv in combos.itertuples(index=False)]
+    combos = combos.assign(matching_key=keys)
+    data['matching_key'] = data[columns].astype(object).merge(
+        combos, on=columns, how='left')['matching_key'].to_numpy()
+    return data
+
+
+def blocking_keys(products, block_on=DEFAULT_BLOCK_ON):
+    """
+    Returns one block label per row of `products` (one row per matching key, with
+    name_clean / brand / volume / abv columns). Missing brands are taken from the start
+    of the name; missing volume, ABV or age simply form their own bucket.
+    """
+    parts = []
+    if 'brand' in block_on:
+        brand = clean_names(products['brand']) if 'brand' in products else pd.Series('', index=products.index)
+        parts.append(_fill_brands(brand, products['name_clean']))
+    if 'volume' in block_on:
+        parts.append((normalize_volume(products['volume']) * 100).round().fillna(-1).astype(int).astype(str))
+    if 'abv' in block_on:
+        parts.append(np.floor(normalize_price(products['abv'])).fillna(-1).astype(int).astype(str))
+    if 'age' in block_on:
+        parts.append(products['name_clean'].str.extract(AGE_STATEMENT)['age'].fillna(''))
+    if not parts:
+        return pd.Series('', index=products.index)
+    label = parts[0].astype(str)
+    for part in parts[1:]:
+        label = label + '|' + part.astype(str)
+    return label
+
+
+def _fill_brands(brands, names):
+    """Missing brands become the longest known brand the name starts with, else its first word."""
+    by_first_word = {}
+    for brand in sorted(set(brands[brands != '']), key=len, reverse=True):
+        by_first_word.setdefault(brand.split(' ', 1)[0], []).append(brand)
+
+    filled = brands.copy()
+    for index, name in names[brands == ''].items():
+        first_word = name.split(' ', 1)[0]
+        filled[index] = next((brand for brand in by_first_word.get(first_word, ())
+                              if name == brand or name.startswith(brand + ' ')), first_word)
+    return filled
+
+
+def match_products(products, threshold=90, block_on=DEFAULT_BLOCK_ON, workers=-1):
+    """
+    Groups the rows of `products` (one per matching key) whose keys score at least
+    `threshold` with token_sort_ratio, transitively. Returns a group id per row,
+    numbered in order of first appearance. `block_on=()` compares every pair.
+    """
+    keys = products['matching_key'].tolist()
+    union_find = UnionFind(len(keys))
+    blocks = blocking_keys(products, block_on)
+    for members in blocks.groupby(blocks, sort=False).indices.values():
+        if len(members) > 1:
+            _merge_block(union_find, [keys[i] for i in members], members, threshold, workers)
+
+    roots = np.fromiter((union_find.find(i) for i in range(len(keys))), np.int64, len(keys))
+    return pd.factorize(roots)[0]
+
+
+def _merge_block(union_find, keys, members, threshold, workers):
+    for start in range(0, len(keys), CHUNK):
+        scores = process.cdist(keys[start:start + CHUNK], keys, scorer=fuzz.token_sort_ratio,
+                               score_cutoff=threshold, dtype=np.uint8, workers=workers)
+        rows, columns = np.nonzero(scores)
+        # Each pair is scored twice; keep one direction and skip the diagonal
+        rows += start
+        keep = rows < columns
+        for row, column in zip(rows[keep], columns[keep]):
+            union_find.union(members[row], members[column])
+
+
+def assign_product_groups(data, threshold=90, block_on=DEFAULT_BLOCK_ON):
+    """Adds `name_clean`, `matching_key` and `product_group` columns to `data`."""
+    data = build_matching_keys(data)
+    columns = ['matching_key', 'name_clean', 'volume', 'abv'] + (['brand'] if 'brand' in data else [])
+    products = data[columns].drop_duplicates('matching_key').reset_index(drop=True)
+    groups = pd.Series(match_products(products, threshold, block_on), index=products['matching_key'])
+    data['product_group'] = data['matching_key'].map(groups)
+    return data
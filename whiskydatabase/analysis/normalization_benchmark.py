@@ -0,0 +1,73 @@
+# analysis/normalization_benchmark.py
+"""
+Compares row-wise and vectorized price/volume normalization on synthetic data.
+
+Run from the analysis directory:
+
+    python normalization_benchmark.py --rows 3000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils import normalize_price, normalize_volume, parse_price, parse_volume
+
+PRICE_FORMATS = ['€ {:.2f}', '€{:.2f}', '{:.2f} €', '£{:,.2f}', '$ {:,.2f}', 'EUR {:.2f}',
+                 'Vanaf € {:.2f}', '€ {:.2f} - € 999,00']
+VOLUME_FORMATS = ['70cl', '70 cl', '0,7 l', '700 ml', '1 liter', '0.5L', '6 x 5cl', '35 CL', '1,75 l', '70']
+
+
+def make_data(rows: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    amounts = rng.uniform(15, 2500, rows).round(2)
+    formats = rng.choice(PRICE_FORMATS, rows)
+    # European sites write decimal commas, so half of the prices swap the separators
+    european = rng.random(rows) < 0.5
+    prices = [fmt.format(amount) for fmt, amount in zip(formats, amounts)]
+    prices = [price.replace(',', '_').replace('.', ',').replace('_', '.') if swap else price
+              for price, swap in zip(prices, european)]
+    return pd.DataFrame({
+        'price': pd.Series(prices, dtype=object),
+        'volume': pd.Series(rng.choice(VOLUME_FORMATS, rows), dtype=object),
+    })
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, default=3_000_000)
+    arg_parser.add_argument('--skip-row-wise', action='store_true',
+                            help='Only time the vectorized functions')
+    args = arg_parser.parse_args()
+
+    data = make_data(args.rows)
+    print(f"{args.rows:,} rows, {data['price'].nunique():,} distinct prices, "
+          f"{data['volume'].nunique()} distinct volumes")
+    print(f"{'method':<12} {'price s':>9} {'volume s':>9} {'rows/s':>12}")
+
+    vectorized_price, price_s = timed(lambda: normalize_price(data['price']))
+    vectorized_volume, volume_s = timed(lambda: normalize_volume(data['volume']))
+    print(f"{'vectorized':<12} {price_s:>9.2f} {volume_s:>9.2f} {args.rows / (price_s + volume_s):>12,.0f}")
+
+    if args.skip_row_wise:
+        return
+    row_price, price_s = timed(lambda: data['price'].apply(parse_price))
+    row_volume, volume_s = timed(lambda: data['volume'].apply(parse_volume))
+    print(f"{'apply':<12} {price_s:>9.2f} {volume_s:>9.2f} {args.rows / (price_s + volume_s):>12,.0f}")
+
+    if not np.allclose(vectorized_price, row_price.astype('float64'), equal_nan=True):
+        print("WARNING: vectorized prices differ from parse_price")
+    if not np.allclose(vectorized_volume * 100, row_volume.astype('float64'), equal_nan=True):
+        print("WARNING: vectorized volumes differ from parse_volume")
+
+
+if __name__ == '__main__':
+    main()
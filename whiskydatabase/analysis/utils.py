@@ -2,6 +2,41 @@
 
 import re
 
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pc = None
+
+# Fast path for prices that read the same under the separator rule below: '12', '12.5',
+# '12.50'. A dot followed by three digits is left to that rule, so '1.234' is 1234.0
+# with or without a currency symbol
+PLAIN_NUMBER = r'^\s*(?P<number>\d+(?:\.\d{1,2})?)\s*$'
+# First number in a price string; a range like '€ 30 - € 45' yields its lower bound
+PRICE_NUMBER = r"(?P<number>\d[\d.,'\s]*)"
+# The last '.'/',' is the decimal separator when 1-2 digits follow it, every other
+# separator is a thousands separator: '1.234,50', '1,234.50', '12,50', '1.234'
+PRICE_PARTS = r'^(?P<integer>[\d.,]*?)(?:[.,](?P<decimal>\d{1,2}))?$'
+# '70cl', '0,7 l', '700 ml', '1 liter', '6 x 5cl'
+VOLUME_WITH_UNIT = (r'(?:(?P<count>\d+)\s*[x×]\s*)?(?P<amount>\d+(?:\.\d+)?)\s*'
+                    r'(?P<unit>ml|cl|dl|l|ltr|liters?|litres?)\b')
+BARE_NUMBER = r'^\s*(?P<amount>\d+(?:\.\d+)?)\s*$'
+# A volume without unit is read as liters up to MAX_BARE_LITERS ('0.7', '5': a 5 l
+# jug), as centiliters up to MAX_BARE_CENTILITERS ('70') and as milliliters above ('700')
+MAX_BARE_LITERS = 5
+MAX_BARE_CENTILITERS = 200
+UNIT_LITERS = {'ml': 0.001, 'cl': 0.01, 'dl': 0.1, 'l': 1.0, 'ltr': 1.0,
+               'liter': 1.0, 'liters': 1.0, 'litre': 1.0, 'litres': 1.0}
+
+_PLAIN_NUMBER = re.compile(PLAIN_NUMBER)
+_PRICE_NUMBER = re.compile(PRICE_NUMBER)
+_PRICE_PARTS = re.compile(PRICE_PARTS)
+_VOLUME_WITH_UNIT = re.compile(VOLUME_WITH_UNIT)
+_BARE_NUMBER = re.compile(BARE_NUMBER)
+
 
 def clean_text(text):
     """
@@ -16,37 +51,152 @@ def clean_text(text):
     return text.lower()
 
 
+def _bare_volume_liters(amount):
+    """A volume without unit in liters, see MAX_BARE_LITERS and MAX_BARE_CENTILITERS."""
+    return np.where(amount <= MAX_BARE_LITERS, amount,
+                    np.where(amount <= MAX_BARE_CENTILITERS, amount / 100, amount / 1000))
+
+
 def parse_volume(volume_str):
     """
     Parses volume string to get volume in centiliters.
+    Row-wise counterpart of `normalize_volume`.
     """
-    if isinstance(volume_str, str):
-        volume_str = volume_str.lower().replace('cl', '').replace('ml', '').strip()
-        try:
-            volume = float(volume_str)
-            return volume
-        except ValueError:
-            return None
-    elif isinstance(volume_str, (int, float)):
-        return float(volume_str)
-    else:
+    if isinstance(volume_str, (int, float)):
+        return None if np.isnan(volume_str) else float(_bare_volume_liters(float(volume_str))) * 100
+    if not isinstance(volume_str, str):
         return None
+    text = volume_str.lower().replace(',', '.')
+    match = _VOLUME_WITH_UNIT.search(text)
+    if match:
+        count = int(match['count']) if match['count'] else 1
+        return count * float(match['amount']) * UNIT_LITERS[match['unit']] * 100
+    match = _BARE_NUMBER.match(text)
+    if match:
+        return float(_bare_volume_liters(float(match['amount']))) * 100
+    return None
 
 
 def parse_price(price_str):
     """
     Parses price string to get price as float.
+    Row-wise counterpart of `normalize_price`.
     """
-    if isinstance(price_str, str):
-        price_str = price_str.replace(
-            '€', '').replace('$', '').replace('£', '')
-        price_str = price_str.replace(',', '.').strip()
-        try:
-            price = float(price_str)
-            return price
-        except ValueError:
-            return None
-    elif isinstance(price_str, (int, float)):
+    if isinstance(price_str, (int, float)):
         return float(price_str)
-    else:
+    if not isinstance(price_str, str):
+        return None
+    if _PLAIN_NUMBER.match(price_str):
+        return float(price_str)
+    number = _PRICE_NUMBER.search(price_str)
+    if not number:
         return None
+    parts = _PRICE_PARTS.match(re.sub(r"[\s']", '', number['number']))
+    if not parts:
+        return None
+    integer = re.sub(r'[.,]', '', parts['integer'])
+    if not integer and not parts['decimal']:
+        return None
+    return float(f"{integer or 0}.{parts['decimal'] or 0}")
+
+
+def _extract(strings, pattern):
+    """
+    `Series.str.extract` for a pattern with named groups, with empty groups as NaN.
+    Uses Arrow's regex kernels when pyarrow is installed.
+    """
+    if pc is None:
+        return strings.str.extract(pattern).replace('', np.nan)
+    matches = pc.extract_regex(pa.array(strings, pa.string()), pattern)
+    columns = {field.name: child.to_pandas() for field, child in zip(matches.type, matches.flatten())}
+    return pd.DataFrame(columns).set_axis(strings.index).replace('', np.nan)
+
+
+def _remove(strings, pattern):
+    if pc is None:
+        return strings.str.replace(pattern, '', regex=True)
+    removed = pc.replace_substring_regex(pa.array(strings, pa.string()), pattern, '')
+    return removed.to_pandas().set_axis(strings.index)
+
+
+def _split_text(values):
+    """Returns (numbers as float64, the string values) of an object Series."""
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if kind == 'string':
+        is_text = np.ones(len(values), bool)
+    elif kind in ('floating', 'integer', 'mixed-integer-float', 'empty'):
+        is_text = np.zeros(len(values), bool)
+    else:
+        is_text = np.fromiter((isinstance(value, str) for value in values), bool, len(values))
+    numbers = pd.to_numeric(values[~is_text], errors='coerce').astype('float64')
+    return numbers, values[is_text]
+
+
+def _per_unique(values, parse):
+    """Runs `parse` once per distinct value; scraped prices and volumes repeat a lot."""
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values)
+    parsed = parse(pd.Series(uniques, dtype=object)).to_numpy(dtype='float64')
+    result = np.full(len(values), np.nan)
+    found = codes >= 0
+    result[found] = parsed[codes[found]]
+    return pd.Series(result, index=values.index)
+
+
+def normalize_volume(volumes):
+    """
+    Vectorized `parse_volume`: returns the volumes of a Series in liters (float64, NaN
+    where no volume could be read). Understands ml/cl/dl/l/liter units, decimal commas
+    and multipacks ('6 x 5cl').
+    """
+    return _per_unique(volumes, _parse_volumes)
+
+
+def _parse_volumes(volumes):
+    liters = pd.Series(np.nan, index=volumes.index, dtype='float64')
+
+    # Plain numbers are bare volumes
+    numbers, text = _split_text(volumes)
+    numbers = numbers.dropna()
+    liters[numbers.index] = _bare_volume_liters(numbers.to_numpy())
+
+    text = text.str.lower().str.replace(',', '.', regex=False)
+    if text.empty:
+        return liters
+    with_unit = _extract(text, VOLUME_WITH_UNIT)
+    found = with_unit['amount'].notna()
+    count = pd.to_numeric(with_unit.loc[found, 'count'], errors='coerce').fillna(1)
+    amount = pd.to_numeric(with_unit.loc[found, 'amount'])
+    liters[found[found].index] = count * amount * with_unit.loc[found, 'unit'].map(UNIT_LITERS)
+
+    bare = _extract(text[~found], BARE_NUMBER)['amount'].dropna()
+    if not bare.empty:
+        liters[bare.index] = _bare_volume_liters(pd.to_numeric(bare).to_numpy(dtype='float64'))
+    return liters
+
+
+def normalize_price(prices):
+    """
+    Vectorized `parse_price`: returns the prices of a Series as float64 (NaN where no
+    price could be read). Strips currency symbols and codes, handles '.'/',' as either
+    thousands or decimal separator and takes the lower bound of a range.
+    """
+    return _per_unique(prices, _parse_prices)
+
+
+def _parse_prices(prices):
+    values = pd.Series(np.nan, index=prices.index, dtype='float64')
+    numbers, text = _split_text(prices)
+    values[numbers.index] = numbers
+    if text.empty:
+        return values
+
+    plain = _extract(text, PLAIN_NUMBER)['number'].dropna()
+    values[plain.index] = pd.to_numeric(plain)
+    number = _extract(text.drop(plain.index), PRICE_NUMBER)['number'].dropna()
+    parts = _extract(_remove(number, r"[\s']"), PRICE_PARTS).dropna(how='all')
+    integer = _remove(parts['integer'].fillna(''), r'[.,]')
+    valid = (integer != '') | parts['decimal'].notna()
+    joined = integer[valid].replace('', '0') + '.' + parts.loc[valid, 'decimal'].fillna('0')
+    values[joined.index] = pd.to_numeric(joined, errors='coerce')
+    return values
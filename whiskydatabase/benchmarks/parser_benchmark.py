@@ -0,0 +1,83 @@
+# benchmarks/parser_benchmark.py
+"""
+Compares the HTML parser backends on saved listing/detail pages.
+
+Run from the whiskydatabase directory:
+
+    python -m benchmarks.parser_benchmark \
+        --site configs/sites/beverages/DE_WEB_heinemann_shop.yaml \
+        --fixtures benchmarks/fixtures/heinemann
+
+Every `listing*.html` file in the fixtures directory is parsed as a listing page and
+every `detail*.html` file as a detail page.
+"""
+
+import argparse
+import glob
+import logging
+import os
+import time
+
+import yaml
+
+from utils.html_parser import LXML_AVAILABLE, SiteHtmlParser
+
+
+def load_fixtures(directory: str, prefix: str):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, f'{prefix}*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append(f.read())
+    return pages
+
+
+def time_backend(parser: SiteHtmlParser, listings, details, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in listings:
+            parser.parse_listing(page)
+    listing_ms = (time.perf_counter() - start) * 1000 / max(1, repeat * len(listings))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in details:
+            parser.parse_details(page)
+    detail_ms = (time.perf_counter() - start) * 1000 / max(1, repeat * len(details))
+    return listing_ms, detail_ms
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--site', required=True, help='Site YAML config')
+    arg_parser.add_argument('--fixtures', required=True, help='Directory with saved pages')
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    args = arg_parser.parse_args()
+
+    with open(args.site, 'r') as f:
+        site_config = yaml.safe_load(f)
+    listings = load_fixtures(args.fixtures, 'listing')
+    details = load_fixtures(args.fixtures, 'detail')
+
+    # Keep the per-page parse logging out of the timings
+    logger = logging.getLogger('parser_benchmark')
+    logger.setLevel(logging.WARNING)
+
+    backends = ['html.parser'] + (['lxml'] if LXML_AVAILABLE else [])
+    results = {}
+    print(f"{len(listings)} listing / {len(details)} detail pages, {args.repeat} rounds")
+    print(f"{'backend':<12} {'listing ms/page':>16} {'detail ms/page':>15}")
+    for backend in backends:
+        parser = SiteHtmlParser(site_config, logger, backend=backend)
+        results[backend] = ([parser.parse_listing(page) for page in listings],
+                            [parser.parse_details(page) for page in details])
+        listing_ms, detail_ms = time_backend(parser, listings, details, args.repeat)
+        print(f"{backend:<12} {listing_ms:>16.2f} {detail_ms:>15.2f}")
+
+    reference = results['html.parser']
+    for backend, output in results.items():
+        if output != reference:
+            print(f"WARNING: {backend} output differs from html.parser")
+
+
+if __name__ == '__main__':
+    main()
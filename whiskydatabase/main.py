@@ -1,5 +1,6 @@
 import asyncio
 import os
+from contextlib import AsyncExitStack
 import yaml
 from dotenv import load_dotenv
 from typing import Dict, Any
@@ -7,12 +8,31 @@ from scrapers.web_scraper import WebScraper
 from scrapers.network_scraper import NetworkScraper
 from scrapers.base_scraper import BaseScraper
 from scrapers.shopify_scraper import ShopifyScraper
+from scrapers.capture_scraper import CaptureScraper
+from utils.browser_pool import BrowserPool
+from utils.http_client import HttpClient
+from utils.parse_pool import ParsePool
+from utils.fx import FxService
+from utils.metrics import write_run_report
+from utils.price_store import PriceStore
 
 load_dotenv()
 
 CONFIG_DIR = 'configs'
 SITES_DIR = os.path.join(CONFIG_DIR, 'sites')
 MAX_CONCURRENT_SCRAPERS = int(os.getenv('MAX_CONCURRENT_SCRAPERS', 5))
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', 2))
+MAX_OPEN_PAGES = int(os.getenv('MAX_OPEN_PAGES', 20))
+PAGES_PER_CONTEXT = int(os.getenv('PAGES_PER_CONTEXT', 100))
+HTTP_CONNECTIONS_PER_HOST = int(os.getenv('HTTP_CONNECTIONS_PER_HOST', 8))
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', os.cpu_count() or 1))
+STORAGE_FORMAT = os.getenv('STORAGE_FORMAT', 'csv').lower()
+PRICE_DB = os.getenv('PRICE_DB', os.path.join('data', 'prices.db'))
+FX_RATES_FILE = os.getenv('FX_RATES_FILE', '')
+FX_TIMEOUT = float(os.getenv('FX_TIMEOUT', 10))
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join('data', 'metrics'))
+METRICS_PROMETHEUS = os.getenv('METRICS_PROMETHEUS', 'false').lower() == 'true'
+PRICE_ALERTS = os.getenv('PRICE_ALERTS', os.path.join('data', 'alerts', 'price_alerts.jsonl'))
 
 
 def load_yaml(file_path: str) -> Dict[str, Any]:
@@ -56,40 +76,79 @@ async def bound_scrape(scraper: BaseScraper, semaphore: asyncio.Semaphore):
         await scraper.scrape()
 
 
-def create_scraper(site_config: Dict[str, Any]) -> BaseScraper:
+def create_scraper(site_config: Dict[str, Any], **resources) -> BaseScraper:
+    """Builds the scraper for a site; `resources` are the run-wide shared pools/clients."""
     scraper_type = site_config.get('scraper_type', 'web').lower()
 
     if scraper_type == 'web':
-        return WebScraper(site_config)
+        return WebScraper(site_config, **resources)
     elif scraper_type == 'network':
-        return NetworkScraper(site_config)
+        return NetworkScraper(site_config, **resources)
     elif scraper_type == 'shopify':
-        return ShopifyScraper(site_config)
+        return ShopifyScraper(site_config, **resources)
+    elif scraper_type == 'capture':
+        return CaptureScraper(site_config, **resources)
 
     raise ValueError(f"Unknown scraper type: {scraper_type}")
 
 
 async def main():
+    scrapers = []
     scraper_tasks = []
     configs = load_all_configs()
     dev_mode = os.environ.get('SCRAPER_DEV_MODE', 'true').lower() == 'true'
     dev_page_limit = int(os.environ.get('DEV_PAGE_LIMIT', 1))
     semaphore = asyncio.Semaphore(MAX_CONCURRENT_SCRAPERS)
 
-    for site_name, site_config in configs.items():
-        if site_config.get('enabled', True):
+    enabled_configs = {site_name: site_config for site_name, site_config in configs.items()
+                       if site_config.get('enabled', True)}
+
+    # One set of long-lived browsers, one HTTP session, one parse pool and one price
+    # store shared by every scraper in the run
+    async with AsyncExitStack() as stack:
+        resources = {
+            'browser_pool': await stack.enter_async_context(
+                BrowserPool(size=BROWSER_POOL_SIZE,
+                            max_open_pages=MAX_OPEN_PAGES,
+                            pages_per_context=PAGES_PER_CONTEXT)),
+            'http_client': await stack.enter_async_context(
+                HttpClient(limit_per_host=HTTP_CONNECTIONS_PER_HOST)),
+        }
+        if PARSE_WORKERS > 0 and enabled_configs:
+            resources['parse_pool'] = await stack.enter_async_context(
+                ParsePool({site_config['name']: site_config for site_config in enabled_configs.values()},
+                          max_workers=PARSE_WORKERS))
+        # Today's exchange rates are fetched once for the whole run and cached for the analysis.
+        # The scrapers don't use them, so they are fetched alongside them in a single short
+        # attempt; a failure falls back to the most recent cached rates
+        fx_rates = FxService(rates_file=FX_RATES_FILE or None, retries=1,
+                             timeout=FX_TIMEOUT).get_rates(resources['http_client'])
+        if PRICE_DB:
+            resources['price_store'] = await stack.enter_async_context(PriceStore(PRICE_DB))
+
+        for site_name, site_config in enabled_configs.items():
             if dev_mode:
                 site_config['dev_mode'] = True
                 site_config['page_limit'] = dev_page_limit
+            site_config.setdefault('storage', {}).setdefault('format', STORAGE_FORMAT)
+            site_config.setdefault('price_alerts', {}).setdefault('path', PRICE_ALERTS)
 
             try:
-                scraper = create_scraper(site_config)
+                scraper = create_scraper(site_config, **resources)
+                scrapers.append(scraper)
                 scraper_tasks.append(bound_scrape(scraper, semaphore))
             except ValueError as e:
                 print(f"Error creating scraper for {site_name}: {str(e)}")
 
-    # Run all scrapers with concurrency limits
-    await asyncio.gather(*scraper_tasks)
+        # Run all scrapers with concurrency limits
+        await asyncio.gather(fx_rates, *scraper_tasks)
+
+        if METRICS_DIR and scrapers:
+            report = write_run_report([scraper.metrics for scraper in scrapers], METRICS_DIR,
+                                      prometheus=METRICS_PROMETHEUS,
+                                      peak_open_pages=resources['browser_pool'].peak_open_pages)
+            print(f"Run metrics written to {report}")
+
 
 if __name__ == '__main__':
     asyncio.run(main())
@@ -3,25 +3,48 @@
 from dataclasses import dataclass, field
 import logging
 import asyncio
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator, Callable, Optional, Tuple
 import os
 import uuid
-import gzip
-import csv
+from contextlib import asynccontextmanager, AsyncExitStack
 from datetime import datetime
 from abc import ABC, abstractmethod
 
-from utils.helpers import ensure_directory
+import aiohttp
+import jmespath
+from playwright.async_api import Page
+
+from utils.browser_pool import BrowserPool, PooledContext
+from utils.http_cache import HttpCache
+from utils.http_client import HttpClient, HttpResponse
 from utils.headers import HeaderGenerator
 from utils.logger import setup_logger
+from utils.metrics import ScraperMetrics
+from utils.parse_pool import ParsePool, SiteParsers
+from utils.price_alerts import PriceAlertSink
+from utils.price_store import PriceStore
+from utils.rate_limiter import RateLimiter, get_rate_limiter, parse_retry_after
+from utils.resource_filter import ResourceFilter
+from utils.storage import StorageSink, create_sink
+
+
+# Responses that usually mean bot protection rather than a real error
+BROWSER_FALLBACK_STATUSES = {401, 403, 406}
 
 
 @dataclass
 class BaseScraper(ABC):
     site_config: Dict[str, Any]
+    browser_pool: Optional[BrowserPool] = None
+    http_client: Optional[HttpClient] = None
+    parse_pool: Optional[ParsePool] = None
+    price_store: Optional[PriceStore] = None
     logger: logging.Logger = field(init=False)
     semaphore: asyncio.Semaphore = field(init=False)
     data_file: str = field(init=False)
+    data_writer: StorageSink = field(init=False)
+    sinks: List[StorageSink] = field(init=False)
+    metrics: ScraperMetrics = field(init=False)
     header_generator: HeaderGenerator = field(init=False)
     fieldnames: List[str] = field(init=False)
     page_limit: int = field(init=False)
@@ -31,6 +54,7 @@ class BaseScraper(ABC):
     def __post_init__(self):
         self.header_generator = HeaderGenerator()
         self.retailer = self.site_config['name']
+        self.retailer_slug = self.retailer.lower().replace(' ', '_')
         self.retailer_country = self.site_config['retailer_country']
         self.currency = self.site_config['currency']
         self.logger = setup_logger(self.retailer)
@@ -38,52 +62,301 @@ class BaseScraper(ABC):
         self.base_url = self.site_config['base_url']
         self.delay = self.site_config.get('delay', 1)
         self.retries = self.site_config.get('retries', 3)
-        self.data_directory = self._get_data_directory()
-        ensure_directory(self.data_directory)
-        self.data_file = self._get_data_filename()
-        self.semaphore = asyncio.Semaphore(5)
+        self.semaphore = asyncio.Semaphore(
+            self.site_config.get('max_concurrency', 5))
         self.max_timeout = self.site_config.get('max_timeout', 60000)
         self.fieldnames = self.site_config.get('fieldnames', [])
+        self.metrics = ScraperMetrics(self.retailer)
         self._init_data_file()
+        self.parsers = SiteParsers(self.site_config, self.logger)
+
+        # 'browser' renders every request in Playwright; 'http' goes through the
+        # shared aiohttp client and only falls back to the browser when needed
+        self.transport = self.site_config.get('transport', 'browser').lower()
+        self.http_fallback = self.site_config.get('http_fallback', True)
+        self._transport_stack = AsyncExitStack()
+        self._browser_page: Optional[Page] = None
+        self._private_http_client: Optional[HttpClient] = None
+
+        # Browser pages skip images, fonts, media and trackers, and navigation only waits
+        # for the DOM; scrapers then wait for their own selectors
+        self.resource_filter = ResourceFilter.from_config(self.site_config, self.metrics, self.logger)
+        self.wait_until = self.site_config.get('wait_until', 'domcontentloaded')
+        # Long-lived pages per browser context, reused across requests
+        self.page_pool_size = max(1, int(self.site_config.get(
+            'page_pool_size', self.site_config.get('max_concurrency', 5))))
+
+        # Validators and bodies are kept between runs so unchanged responses come
+        # back as 304s and can skip parsing
+        cache_config = self.site_config.get('http_cache', {})
+        self.http_cache: Optional[HttpCache] = None
+        if cache_config.get('enabled', True):
+            self.http_cache = HttpCache(
+                os.path.join('data', 'cache', 'http', self.retailer_slug),
+                max_bytes=int(cache_config.get('max_mb', 50) * 1024 * 1024),
+                logger=self.logger)
 
         # Initialize dev_mode and page_limit
         self.dev_mode = self.site_config.get('dev_mode', False)
         self.page_limit = self.site_config.get('page_limit', float('inf'))
 
+        # Every request goes through a per-host token bucket; without an explicit
+        # rate_limit the budget is one request per `delay` seconds
+        rate_limit = self.site_config.get('rate_limit', {})
+        self.requests_per_second = rate_limit.get(
+            'requests_per_second', 1 / self.delay if self.delay else 10)
+        self.burst = rate_limit.get('burst', 1)
+
+        # Paginated JSON endpoints can keep several page requests in flight
+        self.pagination = self.site_config.get('pagination', {})
+        self.prefetch_window = max(1, int(self.pagination.get('prefetch_window', 1)))
+
     @abstractmethod
     async def scrape(self) -> None:
         pass
 
+    @asynccontextmanager
+    async def _browser_context(self) -> AsyncIterator[PooledContext]:
+        context_options = {
+            'user_agent': self.header_generator.generate()['User-Agent'],
+            'max_pages': self.page_pool_size}
+        if self.resource_filter is not None:
+            context_options['route_handler'] = self.resource_filter.handle
+        if self.browser_pool is not None:
+            async with self.browser_pool.context(**context_options) as context:
+                yield context
+        else:
+            # Standalone use: spin up a private single-browser pool
+            async with BrowserPool(size=1, logger=self.logger) as pool:
+                async with pool.context(**context_options) as context:
+                    yield context
+
+    def _get_http_client(self) -> HttpClient:
+        if self.http_client is not None:
+            return self.http_client
+        if self._private_http_client is None:
+            # Standalone use: a private client, closed with the other transports
+            self._private_http_client = HttpClient(logger=self.logger)
+            self._transport_stack.push_async_callback(self._close_private_http_client)
+        return self._private_http_client
+
+    async def _close_private_http_client(self) -> None:
+        await self._private_http_client.close()
+        self._private_http_client = None
+
+    async def _http_get(self, url: str, headers: Dict[str, str]) -> HttpResponse:
+        if self.http_cache is None:
+            return await self._timed_get(url, headers)
+
+        response = await self._timed_get(url, {**headers, **self.http_cache.conditional_headers(url)})
+        self.http_cache.requests += 1
+        if response.status == 304:
+            cached = self.http_cache.not_modified(url)
+            if cached is not None:
+                return cached
+            # The cached body is gone; ask again without validators
+            response = await self._timed_get(url, headers)
+        self.http_cache.store(url, response)
+        return response
+
+    async def _timed_get(self, url: str, headers: Dict[str, str]) -> HttpResponse:
+        with self.metrics.time('fetch'):
+            response = await self._get_http_client().get(url, headers=headers, timeout=self.max_timeout / 1000)
+        self.metrics.count('requests')
+        self.metrics.count('bytes_received', len(response.body))
+        return response
+
+    async def _fetch_json(self, url: str) -> Optional[HttpResponse]:
+        if self.transport == 'http':
+            response = None
+            try:
+                response = await self._http_get(url, self._http_headers())
+                if response.status not in BROWSER_FALLBACK_STATUSES:
+                    return response
+                reason = f"status {response.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if not self.http_fallback:
+                    raise
+                reason = str(e) or type(e).__name__
+
+            if not self.http_fallback:
+                return response
+            self.logger.warning(f"HTTP transport failed for {
+                                url} ({reason}). Falling back to browser transport.")
+            self.transport = 'browser'
+
+        return await self._fetch_with_browser(url)
+
+    async def _parse(self, method: str, payload: Any) -> Any:
+        """Runs a SiteParsers method in the shared parse pool, or inline without one."""
+        with self.metrics.time('parse'):
+            if self.parse_pool is not None:
+                return await self.parse_pool.run(self.retailer, method, payload)
+            return getattr(self.parsers, method)(payload)
+
+    async def _parse_json_page(self, response: HttpResponse) -> List[Dict[str, Any]]:
+        if response.from_cache and self.http_cache is not None:
+            products = self.http_cache.get_parsed(response.url)
+            if products is not None:
+                self.logger.debug(f"Not modified, reusing parsed rows for {response.url}")
+                return products
+
+        self.logger.debug(f"Parsing {len(response.body)} byte JSON response from {response.url}")
+        products = await self._parse('parse_json', response.body)
+        if self.http_cache is not None:
+            self.http_cache.store_parsed(response.url, products)
+        return products
+
+    def _http_headers(self, accept: str = 'application/json, text/plain, */*') -> Dict[str, str]:
+        return {
+            'User-Agent': self.header_generator.generate()['User-Agent'],
+            'Accept': accept,
+            **self.headers,
+        }
+
+    async def _fetch_with_browser(self, url: str) -> Optional[HttpResponse]:
+        if self._browser_page is None:
+            context = await self._transport_stack.enter_async_context(self._browser_context())
+            self._browser_page = await self._transport_stack.enter_async_context(context.page())
+
+        with self.metrics.time('fetch'):
+            response = await self._browser_page.goto(url, wait_until=self.wait_until, timeout=self.max_timeout)
+            if response is None:
+                return None
+            response = HttpResponse(response.url, response.status, await response.all_headers(), await response.body())
+        self.metrics.count('requests')
+        self.metrics.count('bytes_received', len(response.body))
+        return response
+
+    def _rate_limiter(self, url: str) -> RateLimiter:
+        return get_rate_limiter(url, self.requests_per_second, self.burst)
+
+    def _record_response(self, limiter: RateLimiter, status: int, headers: Dict[str, str]) -> bool:
+        """Feeds a response back into the host's limiter. Returns True when it was throttled."""
+        if status == 429 or (status == 503 and 'retry-after' in headers):
+            self.metrics.count('throttled')
+            limiter.on_throttled(parse_retry_after(headers.get('retry-after')), self.logger)
+            return True
+        if 200 <= status < 400:
+            limiter.on_success(self.logger)
+        return False
+
+    async def _fetch_page(self, url: str) -> Optional[HttpResponse]:
+        for attempt in range(1, self.retries + 1):
+            limiter = self._rate_limiter(url)
+            with self.metrics.time('wait'):
+                await limiter.acquire()
+            response = await self._fetch_json(url)
+            if response is None:
+                return None
+            if self._record_response(limiter, response.status, response.headers) and attempt < self.retries:
+                self.metrics.count('retries')
+                self.logger.warning(f"Rate limited on {url}. Retrying (Attempt {
+                                    attempt + 1}/{self.retries})")
+                continue
+            return response
+        return None
+
+    async def _iter_json_pages(self, page_url: Callable[[int], str]) -> AsyncIterator[Tuple[int, Optional[HttpResponse]]]:
+        """
+        Yields (page, response) in page order while keeping up to `prefetch_window`
+        page requests in flight, each admitted by the host's rate limiter. Pending
+        requests are cancelled when the consumer stops early, so iterate inside
+        `contextlib.aclosing`.
+        """
+        last_page = self.page_limit
+        window = 1 if self.pagination.get('type') == 'cursor' else self.prefetch_window
+        pending: Dict[int, asyncio.Task] = {}
+        try:
+            self.logger.debug(f"Requesting URL for page 1: {page_url(1)}")
+            response = await self._fetch_page(page_url(1))
+            last_page = min(last_page, self._total_pages(response))
+            yield 1, response
+
+            page = next_page = 2
+            while page <= last_page:
+                while next_page <= last_page and next_page < page + window:
+                    url = page_url(next_page)
+                    self.logger.debug(f"Requesting URL for page {
+                                      next_page}: {url}")
+                    pending[next_page] = asyncio.create_task(self._fetch_page(url))
+                    next_page += 1
+                yield page, await pending.pop(page)
+                page += 1
+        finally:
+            for task in pending.values():
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending.values(), return_exceptions=True)
+
+    def _total_pages(self, response: Optional[HttpResponse]) -> float:
+        expression = self.pagination.get('total_pages')
+        if not expression or response is None or not response.ok:
+            return float('inf')
+        try:
+            total = jmespath.search(expression, response.json())
+            if total is None:
+                self.logger.warning(f"No total pages found with '{expression}', "
+                                    f"up to {self.prefetch_window - 1} requests may go past the last page")
+                return float('inf')
+            return int(total)
+        except (ValueError, TypeError, jmespath.exceptions.JMESPathError) as e:
+            self.logger.warning(f"Could not read total pages with '{
+                                expression}': {e}")
+            return float('inf')
+
+    async def _close_transports(self) -> None:
+        await self._transport_stack.aclose()
+        self._browser_page = None
+        if self.http_cache is not None:
+            if self.http_cache.requests:
+                self.logger.info(f"HTTP cache: {self.http_cache.hits}/{self.http_cache.requests} "
+                                 f"requests not modified (hit ratio {self.http_cache.hit_ratio:.0%})")
+            self.http_cache.save()
+
     def get_fieldnames(self) -> List[str]:
         return self.fieldnames
 
-    def _get_data_directory(self) -> str:
-        now = datetime.now()
-        return os.path.join('data', 'raw', str(now.year), f"{now.month:02d}", f"{now.day:02d}")
-
     def _get_data_filename(self) -> str:
-        return os.path.join(self.data_directory, f"{self.retailer.lower().replace(' ', '_')}-{uuid.uuid4()}.csv.gz")
+        return f"{self.retailer_slug}-{uuid.uuid4()}"
 
     def _init_data_file(self):
-        ensure_directory(os.path.dirname(self.data_file))
-        if not os.path.exists(self.data_file):
-            with gzip.open(self.data_file, 'wt', encoding='utf-8', newline='') as csvfile:
-                writer = csv.DictWriter(
-                    csvfile, fieldnames=self.get_fieldnames())
-                writer.writeheader()
-            self.logger.info(f"Created new data file: {self.data_file}")
-
-    def _save_products(self, products: List[Dict[str, Any]]):
+        # CSV under data/raw/YYYY/MM/DD or a partitioned Parquet dataset, per `storage.format`
+        self.data_writer = create_sink(self.site_config, 'data', self._get_data_filename(), self.logger)
+        self.data_file = self.data_writer.path
+        self.logger.info(f"Created new data file: {self.data_file}")
+        self.sinks = [self.data_writer]
+        # Prices are scored against each offer's history as they are saved
+        alerts = self.site_config.get('price_alerts', {})
+        if alerts.get('enabled', True) and alerts.get('path'):
+            self.sinks.append(PriceAlertSink(
+                self.retailer, alerts['path'],
+                alpha=alerts.get('alpha', 0.3),
+                z_threshold=alerts.get('z_threshold', 4.0),
+                min_change=alerts.get('min_change', 0.3),
+                min_history=alerts.get('min_history', 3),
+                logger=self.logger))
+        if self.price_store is not None:
+            self.sinks.append(self.price_store.sink(self.retailer, self.logger))
+
+    async def _save_products(self, products: List[Dict[str, Any]]):
         self.logger.info(f"Saving {len(products)} products to {
                          self.data_file}")
-        with gzip.open(self.data_file, 'at', encoding='utf-8', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=self.get_fieldnames())
-            for product in products:
-                product['retailer'] = self.retailer
-                product['retailer_country'] = self.retailer_country
-                product['currency'] = self.currency
-                product['scraped_at'] = datetime.now().strftime(
-                    '%Y-%m-%d %H:%M:%S')
-                writer.writerow(product)
-                self.logger.debug(f"Saved product: {product.get('name')}")
-        self.logger.info(f"Successfully saved {len(products)} products")
+        scraped_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for product in products:
+            product['retailer'] = self.retailer
+            product['retailer_country'] = self.retailer_country
+            product['currency'] = self.currency
+            product['scraped_at'] = scraped_at
+        with self.metrics.time('save'):
+            for sink in self.sinks:
+                await sink.write(products)
+        self.metrics.count('rows', len(products))
+
+    async def _close_data_file(self) -> None:
+        with self.metrics.time('save'):
+            for sink in self.sinks:
+                await sink.close()
+        self.metrics.stop()
+        self.logger.info(f"Saved {self.data_writer.rows_written} products to {
+                         self.data_file}")
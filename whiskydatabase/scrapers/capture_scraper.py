@@ -0,0 +1,146 @@
+import asyncio
+import fnmatch
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from playwright.async_api import Response
+from scrapers.base_scraper import BaseScraper
+from scrapers.network_scraper import NetworkScraper
+from utils.http_client import HttpResponse
+
+# Request headers worth replaying against a captured endpoint when the page sent them
+DEFAULT_FORWARD_HEADERS = ('authorization', 'x-api-key', 'x-requested-with', 'x-algolia-api-key',
+                           'x-algolia-application-id')
+
+
+@dataclass
+class CaptureScraper(NetworkScraper):
+    """
+    A web shop whose product grid is rendered from its own JSON API.
+
+    The listing page is loaded in the browser once, and the first GET response matching
+    `capture.url_pattern` whose JSON yields products through `response_mapping` is
+    recorded. It is page 1; the other pages are requested from that endpoint directly,
+    like a `network` site, by stepping its `pagination.page_param` query parameter.
+    """
+
+    def __post_init__(self):
+        BaseScraper.__post_init__(self)
+        # The endpoint and its query come from the captured request
+        self.request_url: Optional[str] = None
+        self.request_method = 'GET'
+        self.request_payload: Dict[str, Any] = {}
+        self.response_mapping = self.site_config['response_mapping']
+        self.response_mapper = self.parsers.response_mapper
+        # Only the capture needs the browser; the endpoint itself is paged over HTTP
+        self.transport = self.site_config.get('transport', 'http').lower()
+
+        self.capture = self.site_config['capture']
+        self.url_pattern = self.capture['url_pattern']
+        if 'pagination_url' in self.site_config:
+            self.capture_page_url = self.capture.get('page_url', self.site_config['pagination_url'].format(1))
+        else:
+            self.capture_page_url = self.capture.get('page_url', self.base_url)
+        self.capture_timeout = self.capture.get('timeout', self.max_timeout) / 1000
+        self.forward_headers = [name.lower() for name in self.capture.get('forward_headers', DEFAULT_FORWARD_HEADERS)]
+        self.page_param = self.pagination.get('page_param', 'page')
+        # e.g. 24 for offset parameters such as `start=0`, `start=24`, ...
+        self.page_step = self.pagination.get('page_step', 1)
+        self.first_page_value = 1
+        self._captured: Dict[str, HttpResponse] = {}
+
+    async def scrape(self) -> None:
+        self.metrics.start()
+        try:
+            captured = await self._capture_endpoint()
+        except Exception as e:
+            self.metrics.count('errors')
+            self.logger.error(f"Error capturing the product API of {self.retailer}: {e}", exc_info=True)
+            captured = False
+
+        if not captured:
+            await self._close_transports()
+            await self._close_data_file()
+            return
+        started_at = self.metrics.started_at
+        await super().scrape()
+        # Count the capture in the run's duration
+        self.metrics.started_at = started_at
+
+    async def _capture_endpoint(self) -> bool:
+        """Loads the listing page once and records the product API response it triggers."""
+        found: asyncio.Future = asyncio.get_running_loop().create_future()
+
+        async def on_response(response: Response) -> None:
+            if found.done() or not self._is_candidate(response):
+                return
+            try:
+                body = await response.body()
+                products = self.response_mapper.map(json.loads(body))
+                request_headers = await response.request.all_headers()
+            except Exception as e:
+                self.logger.debug(f"Ignoring captured response {response.url}: {e}")
+                return
+            if products and not found.done():
+                found.set_result((response, body, request_headers))
+
+        self.logger.info(f"Loading {self.capture_page_url} to capture requests matching {self.url_pattern}")
+        async with self._browser_context() as context:
+            async with context.page() as page:
+                page.on('response', on_response)
+                with self.metrics.time('fetch'):
+                    await page.goto(self.capture_page_url, wait_until=self.wait_until, timeout=self.max_timeout)
+                    self.metrics.count('requests')
+                    try:
+                        response, body, request_headers = await asyncio.wait_for(found, self.capture_timeout)
+                    except asyncio.TimeoutError:
+                        self.logger.error(f"No response matching {self.url_pattern} with products within {
+                                          self.capture_timeout:g}s on {self.capture_page_url}")
+                        return False
+                    finally:
+                        page.remove_listener('response', on_response)
+                headers = await response.all_headers()
+
+        self.metrics.count('bytes_received', len(body))
+        self._use_endpoint(response.url, request_headers)
+        # The captured body is page 1, so it is not requested again
+        self._captured[self._page_url(1)] = HttpResponse(response.url, response.status, headers, body)
+        self.logger.info(f"Captured product API: {self.request_url} (paging on '{self.page_param}')")
+        return True
+
+    def _is_candidate(self, response: Response) -> bool:
+        request = response.request
+        return (request.method == 'GET'
+                and request.resource_type in ('xhr', 'fetch')
+                and response.ok
+                and 'json' in (response.headers.get('content-type') or '')
+                and fnmatch.fnmatchcase(response.url, self.url_pattern))
+
+    def _use_endpoint(self, url: str, request_headers: Dict[str, str]) -> None:
+        parts = urlsplit(url)
+        self.request_url = urlunsplit((parts.scheme, parts.netloc, parts.path, '', ''))
+        self.request_payload = dict(parse_qsl(parts.query, keep_blank_values=True))
+        if self.page_param in self.request_payload:
+            try:
+                self.first_page_value = int(self.request_payload[self.page_param])
+            except ValueError:
+                self.logger.warning(f"Non-numeric page parameter {self.page_param}={
+                                    self.request_payload[self.page_param]}, starting at 1")
+        else:
+            self.first_page_value = 0 if self.page_step > 1 else 1
+        self.headers = {**{name: value for name, value in request_headers.items()
+                           if name.lower() in self.forward_headers}, **self.headers}
+
+    def _update_payload(self, page: int):
+        self.request_payload[self.page_param] = self.first_page_value + (page - 1) * self.page_step
+
+    def _construct_url(self) -> str:
+        return f"{self.request_url}?{urlencode(self.request_payload)}"
+
+    async def _fetch_page(self, url: str) -> Optional[HttpResponse]:
+        captured = self._captured.pop(url, None)
+        if captured is not None:
+            return captured
+        return await super()._fetch_page(url)
@@ -1,10 +1,7 @@
 from dataclasses import dataclass
 from typing import Dict, Any, List
 from scrapers.base_scraper import BaseScraper
-from playwright.async_api import async_playwright
-import json
-import asyncio
-from jmespath import search
+from contextlib import aclosing
 
 
 @dataclass
@@ -15,43 +12,31 @@ class NetworkScraper(BaseScraper):
         self.request_method = self.site_config.get('request_method', 'GET')
         self.request_payload = self.site_config.get('request_payload', {})
         self.response_mapping = self.site_config['response_mapping']
+        self.response_mapper = self.parsers.response_mapper
         self.dev_mode = self.site_config.get('dev_mode', False)
 
     async def scrape(self) -> None:
         self.logger.info(
             f"Starting network request scrape for {self.retailer}")
+        self.metrics.start()
         if self.dev_mode:
             self.logger.info(f"Running in dev mode. Page limit: {
                              self.page_limit}")
         total_products = 0
-        page = 1
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(user_agent=self.header_generator.generate()['User-Agent'])
-            page_context = await context.new_page()
-
-            try:
-                while page <= self.page_limit:
-                    self._update_payload(page)
-                    full_url = self._construct_url()
-                    self.logger.debug(f"Requesting URL for page {
-                                      page}: {full_url}")
-
-                    response = await page_context.goto(full_url, wait_until="networkidle")
-
-                    if response.ok:
-                        json_response = await response.json()
-                        self.logger.debug(f"Raw JSON response: {
-                                          json.dumps(json_response, indent=2)}")
-                        products = self.parse_response(json_response)
+        try:
+            async with aclosing(self._iter_json_pages(self._page_url)) as pages:
+                async for page, response in pages:
+                    if response and response.ok:
+                        self.metrics.count('pages')
+                        products = await self._parse_json_page(response)
 
                         if not products:
                             self.logger.info(f"No more products found on page {
                                              page}. Stopping pagination.")
                             break
 
-                        self._save_products(products)
+                        await self._save_products(products)
                         total_products += len(products)
                         self.logger.info(
                             f"Scraped {len(products)} products from page {page}")
@@ -60,25 +45,29 @@ class NetworkScraper(BaseScraper):
                             self.logger.info(f"Reached dev mode page limit ({
                                              self.page_limit}). Stopping scrape.")
                             break
-
-                        page += 1
-                        await asyncio.sleep(self.delay)
                     else:
+                        self.metrics.count('errors')
+                        status = response.status if response else 'No Response'
                         self.logger.error(f"Failed to fetch data for page {
-                                          page}: Status {response.status}")
+                                          page}: Status {status}")
                         break
 
-            except Exception as e:
-                self.logger.error(f"An error occurred during scraping: {
-                                  str(e)}", exc_info=True)
+        except Exception as e:
+            self.metrics.count('errors')
+            self.logger.error(f"An error occurred during scraping: {
+                              str(e)}", exc_info=True)
 
-            finally:
-                await context.close()
-                await browser.close()
+        finally:
+            await self._close_transports()
+            await self._close_data_file()
 
         self.logger.info(f"Network request scrape completed for {
                          self.retailer}. Total products scraped: {total_products}")
 
+    def _page_url(self, page: int) -> str:
+        self._update_payload(page)
+        return self._construct_url()
+
     def _update_payload(self, page: int):
         if 'page' in self.request_payload:
             self.request_payload['page'] = page
@@ -93,19 +82,4 @@ class NetworkScraper(BaseScraper):
         return self.request_url
 
     def parse_response(self, json_response: Dict[str, Any]) -> List[Dict[str, Any]]:
-        products = []
-        items = search(self.response_mapping['root'], json_response) or []
-
-        if not isinstance(items, list):
-            self.logger.error(f"Unexpected response structure: {type(items)}")
-            return products
-
-        for item in items:
-            product = {}
-            for field, mapping in self.response_mapping['fields'].items():
-                value = search(mapping, item)
-                product[field] = value
-            products.append(product)
-
-        self.logger.debug(f"Parsed {len(products)} products")
-        return products
+        return self.response_mapper.map(json_response)
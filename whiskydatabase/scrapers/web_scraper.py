@@ -1,11 +1,15 @@
 import asyncio
-import random
+import os
 from dataclasses import dataclass
-
-from bs4 import BeautifulSoup, Tag
-from playwright.async_api import async_playwright, Page, BrowserContext, TimeoutError as PlaywrightTimeoutError
-from typing import Dict, Any, List, Optional
-from utils.helpers import apply_parser
+from datetime import datetime, timedelta
+
+import aiohttp
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
+from typing import Dict, Any, List, Optional, Tuple
+from utils.browser_pool import PooledContext
+from utils.http_client import HttpResponse
+from utils.sitemap import SitemapEntry, SitemapReader, parse_lastmod
+from utils.state_store import ProductStateStore
 from scrapers.base_scraper import BaseScraper
 
 
@@ -17,95 +21,159 @@ class WebScraper(BaseScraper):
         self.product_item_selector = self.site_config['product_item_selector']
         self.fields = self.site_config['fields']
         self.detail_fields = self.site_config.get('detail_fields', {})
+        # Compile the selectors up front so config errors surface before scraping
+        self.html_parser = self.parsers.html_parser
+        # Detail pages are fetched as concurrently as the page pool allows
+        self.semaphore = asyncio.Semaphore(self.page_pool_size)
+
+        # Detail pages are only re-fetched when the listing changed or the cached
+        # details are older than the TTL
+        incremental = self.site_config.get('incremental', {})
+        self.incremental = incremental.get('enabled', True)
+        self.detail_ttl = timedelta(hours=incremental.get('detail_ttl_hours', 168))
+        self.state_store = ProductStateStore(
+            os.path.join('data', 'state', f"{self.retailer_slug}.json"), self.logger)
+        self.detail_cache_hits = 0
+        self.detail_fetches = 0
+
+        # With structured data on the listing, products that already carry these fields
+        # skip their detail page
+        structured = self.site_config.get('structured_data', {})
+        self.complete_fields = structured.get('complete_fields', ['volume', 'abv', 'brand', 'in_stock']) \
+            if structured.get('enabled', False) else []
+        self.detail_skips = 0
+
+        # Products can also be discovered from the sitemaps, re-fetching only the pages
+        # whose lastmod is newer than when we last scraped them
+        sitemap = self.site_config.get('sitemap', {})
+        self.sitemap = sitemap if sitemap.get('enabled', False) else None
+        self._listed_links = set()
 
     async def scrape(self) -> None:
         self.logger.info(f"Starting web scrape for {self.retailer}")
-        page_num = 1
+        self.metrics.start()
         total_products = 0
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(user_agent=self.header_generator.generate()['User-Agent'])
-
-            while True:
-                url = self._get_page_url(page_num)
-                self.logger.info(f"Scraping page {page_num}: {url}")
-                content = await self._make_request(url, context)
-
-                if not content:
-                    break
-
-                soup = BeautifulSoup(content, 'html.parser')
-                product_list = self._get_product_list(soup)
-
-                if not product_list:
-                    break
-
-                products = self._parse_products(product_list)
-
-                if not products:
-                    break
-
-                detailed_products = await self._fetch_product_details(products, context)
-                self._save_products(detailed_products)
-                total_products += len(detailed_products)
-
-                if not self._has_next_page(soup, page_num):
-                    break
-
-                page_num += 1
-                await asyncio.sleep(self.delay)
-
-            await context.close()
-            await browser.close()
+        try:
+            async with self._browser_context() as context:
+                if self.sitemap is None or self.sitemap.get('paginate', False):
+                    total_products += await self._scrape_listing(context)
+                if self.sitemap is not None:
+                    total_products += await self._scrape_sitemap(context)
+        finally:
+            self.state_store.save()
+            await self._close_transports()
+            await self._close_data_file()
+
+        if self.detail_cache_hits or self.detail_fetches or self.detail_skips:
+            self.logger.info(f"Detail pages: {self.detail_fetches} fetched, {
+                             self.detail_cache_hits} reused from product state, {
+                             self.detail_skips} not needed")
 
         self.logger.info(f"Web scrape completed for {
                          self.retailer}. Total products scraped: {total_products}")
 
-    def _get_product_list(self, soup: BeautifulSoup) -> Optional[Tag]:
-        return soup.select_one(self.product_list_selector)
+    async def _scrape_listing(self, context: PooledContext) -> int:
+        page_num = 1
+        total_products = 0
+        while True:
+            url = self._get_page_url(page_num)
+            self.logger.info(f"Scraping page {page_num}: {url}")
+            content = await self._make_request(url, context)
+
+            if not content:
+                break
+            self.metrics.count('pages')
+
+            products, has_next_page = await self._parse('parse_listing', content)
+
+            if not products:
+                break
+
+            detailed_products = await self._fetch_product_details(products, context)
+            await self._save_products(detailed_products)
+            total_products += len(detailed_products)
+            self._listed_links.update(product['link'] for product in detailed_products if product.get('link'))
+
+            if not has_next_page:
+                break
+
+            page_num += 1
+        return total_products
+
+    async def _scrape_sitemap(self, context: PooledContext) -> int:
+        """Scrapes the product pages in the sitemaps that changed since we last saw them."""
+        reader = SitemapReader(
+            self._get_http_client(), self.base_url,
+            self._http_headers(accept='application/xml,text/xml;q=0.9,*/*;q=0.8'), self._rate_limiter,
+            os.path.join('data', 'state', f"{self.retailer_slug}.sitemaps.json"),
+            urls=self.sitemap.get('urls'), include=self.sitemap.get('include'),
+            exclude=self.sitemap.get('exclude'), sitemap_include=self.sitemap.get('sitemap_include'),
+            max_sitemaps=self.sitemap.get('max_sitemaps', 1000), timeout=self.max_timeout / 1000,
+            metrics=self.metrics, logger=self.logger)
+
+        # The walk only collects URLs, so no sitemap download stays open while pages load
+        listed = 0
+        changed: List[SitemapEntry] = []
+        async for entry in reader.entries():
+            listed += 1
+            if entry.url not in self._listed_links and self._sitemap_entry_changed(entry):
+                changed.append(entry)
+        max_urls = self.sitemap.get('max_urls')
+        if max_urls is not None:
+            changed = changed[:max_urls]
+        self.logger.info(f"Sitemaps: {listed} product URLs in {reader.sitemaps_fetched} sitemaps "
+                         f"({reader.sitemaps_unchanged} unchanged sitemaps skipped), {len(changed)} changed")
 
-    def _parse_products(self, product_list: Tag) -> List[Dict[str, Any]]:
-        products = []
-        product_items = product_list.select(self.product_item_selector)
-        self.logger.debug(f'Found {len(product_items)} product items.')
-        for item in product_items:
-            try:
-                product = self._parse_product(item)
-                if product:
-                    products.append(product)
-            except Exception as e:
-                self.logger.error(f"Error parsing product: {e}")
-        self.logger.info(f'Parsed {len(products)} products.')
-        return products
-
-    def _parse_product(self, item: Tag) -> Optional[Dict[str, Any]]:
-        product = {}
-        for field, config in self.fields.items():
-            selector = config['selector']
-            parser = config.get('parser', 'str')
-            pattern = config.get('pattern', None)
-            attribute = config.get('attribute', None)
-            required = config.get('required', False)
-
-            element = item.select_one(selector)
-            if element:
-                if attribute:
-                    raw_value = element.get(attribute, '').strip()
-                else:
-                    raw_value = element.get_text(strip=True) if isinstance(
-                        element, Tag) else element
-                parsed_value = apply_parser(
-                    raw_value, parser, field, pattern, self.base_url)
-                product[field] = parsed_value
-            elif required:
-                self.logger.warning(f"Required field '{
-                                    field}' not found for {self.retailer}")
-                return None
-            else:
-                product[field] = None
-
-        return product if product.get('name') and product.get('price') else None
+        total_products = 0
+        failures = 0
+        batch_size = self.sitemap.get('batch_size', 50)
+        for start in range(0, len(changed), batch_size):
+            results = await asyncio.gather(*[self._scrape_product_page(entry, context)
+                                             for entry in changed[start:start + batch_size]])
+            failures += sum(1 for fetched, _ in results if not fetched)
+            rows = [row for _, row in results if row]
+            if rows:
+                await self._save_products(rows)
+                total_products += len(rows)
+            self.state_store.save()
+
+        # Unchanged sitemaps are only skipped next time if all their pages were fetched
+        if failures:
+            self.logger.warning(f"{failures} sitemap product pages could not be fetched")
+        elif max_urls is None or len(changed) < max_urls:
+            reader.save()
+        return total_products
+
+    def _sitemap_entry_changed(self, entry: SitemapEntry) -> bool:
+        state = self.state_store.get(entry.url)
+        if state is None:
+            return True
+        if entry.lastmod is None:
+            # Without a lastmod, a page is refreshed once its details are older than the TTL
+            detailed_at = state.get('detailed_at')
+            return not detailed_at or datetime.now() - datetime.fromisoformat(detailed_at) > self.detail_ttl
+        seen = parse_lastmod(state.get('lastmod'))
+        return seen is None or entry.lastmod > seen
+
+    async def _scrape_product_page(self, entry: SitemapEntry, context: PooledContext) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Returns (fetched, row); the row is None for pages without a name and price."""
+        with self.metrics.time('detail'):
+            async with self.semaphore:
+                content, _ = await self._navigate(entry.url, context, is_detail_page=True)
+        self.detail_fetches += 1
+        if not content:
+            return False, None
+
+        row = await self._parse('parse_product_page', content)
+        row['link'] = entry.url
+        details = {field: row.get(field) for field in self.detail_fields}
+        self.state_store.update(entry.url, ProductStateStore.listing_hash(row), details,
+                                lastmod=entry.lastmod.isoformat() if entry.lastmod else None)
+        if not row.get('name') or row.get('price') is None:
+            self.logger.debug(f"No product name or price on {entry.url}")
+            return True, None
+        return True, row
 
     async def _fetch_product_details(self, products: List[Dict[str, Any]], context) -> List[Dict[str, Any]]:
         tasks = [self._fetch_and_parse_product(
@@ -113,81 +181,139 @@ class WebScraper(BaseScraper):
         return await asyncio.gather(*tasks)
 
     async def _fetch_and_parse_product(self, product: Dict[str, Any], context) -> Dict[str, Any]:
-        async with self.semaphore:
-            if self.site_config.get('fetch_details', True):
-                details = await self._fetch_single_product_details(product['link'], context)
-                if details:
-                    product.update(details)
+        if not self.site_config.get('fetch_details', True):
+            return product
+        if self.complete_fields and all(product.get(field) is not None for field in self.complete_fields):
+            self.detail_skips += 1
             return product
 
+        key = product.get('link') or product.get('product_id')
+        listing_hash = ProductStateStore.listing_hash(product)
+        details = None
+        if self.incremental and key:
+            details = self.state_store.cached_details(key, listing_hash, self.detail_ttl)
+
+        if details is not None:
+            self.detail_cache_hits += 1
+        else:
+            with self.metrics.time('detail'):
+                async with self.semaphore:
+                    details = await self._fetch_single_product_details(product['link'], context)
+            self.detail_fetches += 1
+            if details and key:
+                self.state_store.update(key, listing_hash, details)
+
+        if details:
+            product.update(details)
+        return product
+
     async def _fetch_single_product_details(self, url: str, context) -> Optional[Dict[str, str]]:
-        content = await self._make_request(url, context, is_detail_page=True)
-        if content:
-            return self._parse_product_details(content)
-        return None
-
-    def _parse_product_details(self, content: str) -> Dict[str, str]:
-        soup = BeautifulSoup(content, 'html.parser')
-        details = {}
-        for field, config in self.detail_fields.items():
-            selector = config['selector']
-            parser = config.get('parser', 'str')
-            pattern = config.get('pattern', None)
-            required = config.get('required', False)
-            element = soup.select_one(selector)
-            if element:
-                raw_value = element.get_text(strip=True) if isinstance(
-                    element, Tag) else element
-                parsed_value = apply_parser(
-                    raw_value, parser, field, pattern, self.base_url)
-                details[field] = parsed_value
-            elif required:
-                self.logger.warning(f"Required detail field '{
-                                    field}' not found for {self.retailer}")
-            else:
-                details[field] = None
+        if self.http_cache is not None and self.http_cache.has_validators(url):
+            details = await self._revalidate_product_details(url)
+            if details is not None:
+                return details
+
+        content, headers = await self._navigate(url, context, is_detail_page=True)
+        if not content:
+            return None
+        details = await self._parse_product_details(content)
+        if self.http_cache is not None:
+            self.http_cache.store(url, HttpResponse(url, 200, headers, content.encode('utf-8')))
+            self.http_cache.store_parsed(url, [details])
+        return details
+
+    async def _revalidate_product_details(self, url: str) -> Optional[Dict[str, str]]:
+        """
+        Sends a conditional request and returns the cached details if the page is unchanged,
+        or the details parsed from the new body if it changed. Returns None, so the page is
+        loaded in the browser, only when that body has none of the detail fields, i.e. the
+        site renders them with scripts.
+        """
+        limiter = self._rate_limiter(url)
+        with self.metrics.time('wait'):
+            await limiter.acquire()
+        try:
+            response = await self._http_get(url, self._http_headers(accept='text/html,*/*'))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.logger.debug(f"Conditional request for {url} failed: {e}")
+            return None
+        self._record_response(limiter, response.status, response.headers)
+        if response.from_cache:
+            parsed = self.http_cache.get_parsed(url)
+            return parsed[0] if parsed else None
+        if response.status != 200:
+            return None
+        # The page changed: parse the body already downloaded instead of loading it again
+        details = await self._parse_product_details(response.body.decode('utf-8', 'replace'))
+        if all(value is None for value in details.values()):
+            self.logger.debug(f"No details in the HTML of {url}, loading it in the browser")
+            return None
+        self.http_cache.store_parsed(url, [details])
         return details
 
+    async def _parse_product_details(self, content: str) -> Dict[str, Any]:
+        return await self._parse('parse_details', content)
+
     def _get_page_url(self, page_num: int) -> str:
         return self.site_config['pagination_url'].format(page_num)
 
-    def _has_next_page(self, soup: BeautifulSoup, page_num: int) -> bool:
-        next_page_selector = self.site_config.get('next_page_selector')
-        if not next_page_selector:
-            return False
-        next_page = soup.select_one(next_page_selector)
-        return next_page is not None
+    async def _make_request(self, url: str, context: PooledContext, is_detail_page: bool = False) -> Optional[str]:
+        content, _ = await self._navigate(url, context, is_detail_page)
+        return content
 
-    async def _make_request(self, url: str, context: BrowserContext, is_detail_page: bool = False) -> Optional[str]:
+    async def _navigate(self, url: str, context: PooledContext,
+                        is_detail_page: bool = False) -> Tuple[Optional[str], Dict[str, str]]:
+        limiter = self._rate_limiter(url)
         for attempt in range(1, self.retries + 1):
+            throttled = False
+            headers: Dict[str, str] = {}
             try:
                 self.logger.debug(f"Attempting to fetch URL: {
                                   url} (Attempt {attempt}/{self.retries})")
-                page = await context.new_page()
-                await page.goto(url, wait_until="networkidle", timeout=self.max_timeout)
-                self.logger.info(f"Navigated to: {page.url}")
-
-                await self._wait_for_content(page, is_detail_page)
-
-                content = await page.content()
-                await page.close()
-                await asyncio.sleep(self.delay + random.uniform(0, 1))
-                self.logger.debug(f"Successfully fetched URL: {url}")
-                return content
+                async with context.page() as page:
+                    self.metrics.page_opened()
+                    try:
+                        # Tokens are only taken once a page is free to use them
+                        with self.metrics.time('wait'):
+                            await limiter.acquire()
+                        with self.metrics.time('fetch'):
+                            response = await page.goto(url, wait_until=self.wait_until, timeout=self.max_timeout)
+                        self.metrics.count('requests')
+                        if response is not None:
+                            headers = await response.all_headers()
+                            throttled = self._record_response(
+                                limiter, response.status, headers)
+                        if not throttled:
+                            self.logger.info(f"Navigated to: {page.url}")
+                            with self.metrics.time('render'):
+                                await self._wait_for_content(page, is_detail_page)
+                                content = await page.content()
+                            self.metrics.count('bytes_received', len(content.encode('utf-8')))
+                    finally:
+                        self.metrics.page_closed()
+                if not throttled:
+                    self.logger.debug(f"Successfully fetched URL: {url}")
+                    return content, headers
+                self.logger.warning(f"Rate limited when fetching {url}")
             except PlaywrightTimeoutError as e:
+                self.metrics.count('errors')
                 self.logger.warning(f"Timeout when fetching {url}: {e}")
             except Exception as e:
+                self.metrics.count('errors')
                 self.logger.error(f"Error fetching {url}: {e}", exc_info=True)
 
             if attempt == self.retries:
                 self.logger.error(f"Failed to fetch {url} after {
                                   self.retries} attempts.")
-                return None
-            else:
+                return None, {}
+            self.metrics.count('retries')
+            if not throttled:
+                # Throttled retries wait on the rate limiter instead
                 backoff_time = self.delay * (2 ** attempt)
                 self.logger.info(f"Retrying in {backoff_time} seconds...")
-                await asyncio.sleep(backoff_time)
-        return None
+                with self.metrics.time('wait'):
+                    await asyncio.sleep(backoff_time)
+        return None, {}
 
     async def _wait_for_content(self, page: Page, is_detail_page: bool):
         if not is_detail_page:
@@ -196,3 +322,7 @@ class WebScraper(BaseScraper):
             detail_selector = self.site_config.get('detail_info_selector')
             if detail_selector:
                 await page.wait_for_selector(detail_selector, timeout=self.max_timeout)
+            elif self.wait_until != 'networkidle':
+                # Without a selector to wait for, let scripts run; with images and
+                # trackers blocked the load event comes soon after the DOM
+                await page.wait_for_load_state('load', timeout=self.max_timeout)
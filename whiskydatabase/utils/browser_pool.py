@@ -0,0 +1,290 @@
+# utils/browser_pool.py
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright, Route
+
+RouteHandler = Callable[[Route], Awaitable[None]]
+# How long a returned page may take to load about:blank before it is discarded
+RESET_TIMEOUT_MS = 5000
+
+
+class PooledContext:
+    """
+    An isolated BrowserContext leased from a BrowserPool.
+
+    Pages must be opened through `new_page()` / `page()` so the pool can enforce
+    its global limit on open pages and recycle the underlying context once it
+    has served `pages_per_context` pages. A `route_handler` is installed on
+    every context for all requests, e.g. to block resources.
+
+    `page()` checks out one of at most `max_pages` long-lived pages, opening
+    one only when none is idle. A page is reset to `about:blank` when it is
+    returned and goes back to the pool only if that succeeds; pages whose user
+    raised, or that crashed or closed, are closed instead. Idle pages keep
+    their slot in the pool's global limit on open pages, so a checkout that
+    finds no free slot waits for either a slot or a page returned to this
+    context, and meanwhile closes idle pages of other contexts.
+    """
+
+    def __init__(self, pool: 'BrowserPool', slot: int, context_options: Dict[str, Any],
+                 route_handler: Optional[RouteHandler] = None, max_pages: int = 5):
+        self._pool = pool
+        self._slot = slot
+        self._context_options = context_options
+        self._route_handler = route_handler
+        self.max_pages = max(1, max_pages)
+        self._context: Optional[BrowserContext] = None
+        self._pages_served = 0
+        self._open_pages = 0
+        self._idle: List[Page] = []
+        self._checkouts = asyncio.Semaphore(self.max_pages)
+        self._checked_out = 0
+        self._page_returned = asyncio.Event()
+        self.pages_reused = 0
+        self._lock = asyncio.Lock()
+
+    async def _ensure_context(self) -> BrowserContext:
+        async with self._lock:
+            if self._context is None:
+                self._context = await self._pool._new_context(self._slot, self._context_options)
+                if self._route_handler is not None:
+                    await self._context.route('**/*', self._route_handler)
+                self._pages_served = 0
+            return self._context
+
+    async def new_page(self) -> Page:
+        await self._pool._page_slots.acquire()
+        return await self._open_page()
+
+    async def _open_page(self) -> Page:
+        """Opens a page on a global slot the caller already holds."""
+        try:
+            context = await self._ensure_context()
+            page = await context.new_page()
+        except BaseException:
+            self._pool._page_slots.release()
+            raise
+        self._pages_served += 1
+        self._open_pages += 1
+        self._pool._page_opened()
+        return page
+
+    async def close_page(self, page: Page) -> None:
+        try:
+            if not page.is_closed():
+                await page.close()
+        finally:
+            self._open_pages -= 1
+            self._pool._page_closed()
+            self._pool._page_slots.release()
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        async with self._checkouts:
+            page = await self._checkout()
+            healthy = False
+            try:
+                yield page
+                healthy = True
+            finally:
+                await self._checkin(page, healthy)
+
+    async def _checkout(self) -> Page:
+        self._checked_out += 1
+        try:
+            while True:
+                while self._idle:
+                    page = self._idle.pop()
+                    if not page.is_closed():
+                        self._pages_served += 1
+                        self.pages_reused += 1
+                        return page
+                    await self.close_page(page)
+                if await self._acquire_slot():
+                    return await self._open_page()
+        except BaseException:
+            self._checked_out -= 1
+            raise
+
+    async def _acquire_slot(self) -> bool:
+        """
+        Takes a global page slot, or returns False once a page came back to this
+        context's idle pages first. Idle pages hold on to their slots, so waiting
+        for a slot alone could wait forever.
+        """
+        slots = self._pool._page_slots
+        if slots.locked() and await self._pool._reclaim_idle_page(self):
+            # A slot was freed, but a page may also have come back meanwhile
+            return False
+        # Nothing was awaited since the idle pages were checked, so no check-in is missed
+        self._page_returned.clear()
+        acquire = asyncio.ensure_future(slots.acquire())
+        returned = asyncio.ensure_future(self._page_returned.wait())
+        try:
+            await asyncio.wait((acquire, returned), return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            returned.cancel()
+            if await self._cancel_acquire(acquire):
+                slots.release()
+            raise
+        returned.cancel()
+        return await self._cancel_acquire(acquire)
+
+    @staticmethod
+    async def _cancel_acquire(acquire: asyncio.Future) -> bool:
+        """Cancels a pending slot acquisition; True if the slot was taken anyway."""
+        if not acquire.done():
+            acquire.cancel()
+            try:
+                await acquire
+            except asyncio.CancelledError:
+                pass
+        return not acquire.cancelled()
+
+    async def _checkin(self, page: Page, healthy: bool) -> None:
+        try:
+            if healthy and await self._reset(page):
+                self._idle.append(page)
+                self._page_returned.set()
+            else:
+                await self.close_page(page)
+        finally:
+            self._checked_out -= 1
+        if self._checked_out == 0 and self._pages_served >= self._pool.pages_per_context:
+            async with self._lock:
+                # Re-checked: another page may have been checked out while waiting
+                if self._checked_out == 0 and self._context is not None:
+                    self._pool.logger.debug(
+                        f"Recycling browser context after {self._pages_served} pages")
+                    await self._close_idle_pages()
+                    await self._close_context()
+
+    async def _reset(self, page: Page) -> bool:
+        """Health check on return: a page that cannot load about:blank is not reused."""
+        if page.is_closed():
+            return False
+        try:
+            await page.goto('about:blank', timeout=RESET_TIMEOUT_MS)
+            return True
+        except Exception as e:
+            self._pool.logger.debug(f"Discarding unhealthy browser page: {e}")
+            return False
+
+    async def close_idle_page(self) -> bool:
+        """Closes one idle page to give its global slot back; False when none is idle."""
+        if not self._idle:
+            return False
+        await self.close_page(self._idle.pop())
+        return True
+
+    async def _close_idle_pages(self) -> None:
+        idle, self._idle = self._idle, []
+        for page in idle:
+            await self.close_page(page)
+
+    async def _close_context(self) -> None:
+        if self._context is not None:
+            try:
+                await self._context.close()
+            except Exception as e:
+                self._pool.logger.warning(f"Error closing browser context: {e}")
+            self._context = None
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._close_idle_pages()
+            await self._close_context()
+        if self.pages_reused:
+            self._pool.logger.debug(f"Browser pages were reused {self.pages_reused} times")
+
+
+class BrowserPool:
+    """
+    A process-wide pool of long-lived Chromium browsers.
+
+    Browsers are launched lazily on first use and shared by every scraper; each
+    scraper leases its own isolated BrowserContext through `context()`.
+    """
+
+    def __init__(self, size: int = 2, max_open_pages: int = 20, pages_per_context: int = 100,
+                 headless: bool = True, logger: Optional[logging.Logger] = None):
+        self.size = max(1, size)
+        self.max_open_pages = max(1, max_open_pages)
+        self.pages_per_context = max(1, pages_per_context)
+        self.headless = headless
+        self.logger = logger or logging.getLogger(__name__)
+        self.open_pages = 0
+        self.peak_open_pages = 0
+        self._playwright: Optional[Playwright] = None
+        self._browsers: List[Optional[Browser]] = [None] * self.size
+        self._leases: List[int] = [0] * self.size
+        self._contexts: List[PooledContext] = []
+        self._page_slots = asyncio.Semaphore(self.max_open_pages)
+        self._launch_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> 'BrowserPool':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    @asynccontextmanager
+    async def context(self, route_handler: Optional[RouteHandler] = None, max_pages: int = 5,
+                      **context_options) -> AsyncIterator[PooledContext]:
+        slot = min(range(self.size), key=lambda i: self._leases[i])
+        self._leases[slot] += 1
+        # More pages than the global limit could never be open at once
+        pooled = PooledContext(self, slot, context_options, route_handler,
+                               min(max_pages, self.max_open_pages))
+        self._contexts.append(pooled)
+        try:
+            yield pooled
+        finally:
+            self._contexts.remove(pooled)
+            self._leases[slot] -= 1
+            await pooled.close()
+
+    async def _get_browser(self, slot: int) -> Browser:
+        async with self._launch_lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            browser = self._browsers[slot]
+            if browser is None or not browser.is_connected():
+                self.logger.info(f"Launching pooled browser {slot + 1}/{self.size}")
+                browser = await self._playwright.chromium.launch(headless=self.headless)
+                self._browsers[slot] = browser
+            return browser
+
+    async def _new_context(self, slot: int, context_options: Dict[str, Any]) -> BrowserContext:
+        browser = await self._get_browser(slot)
+        return await browser.new_context(**context_options)
+
+    async def _reclaim_idle_page(self, requester: PooledContext) -> bool:
+        """Closes an idle page of another context so `requester` can open one."""
+        for pooled in self._contexts:
+            if pooled is not requester and await pooled.close_idle_page():
+                return True
+        return False
+
+    def _page_opened(self) -> None:
+        self.open_pages += 1
+        self.peak_open_pages = max(self.peak_open_pages, self.open_pages)
+
+    def _page_closed(self) -> None:
+        self.open_pages -= 1
+
+    async def close(self) -> None:
+        for slot, browser in enumerate(self._browsers):
+            if browser is not None:
+                try:
+                    await browser.close()
+                except Exception as e:
+                    self.logger.warning(f"Error closing pooled browser: {e}")
+                self._browsers[slot] = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
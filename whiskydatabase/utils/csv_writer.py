@@ -0,0 +1,65 @@
+# utils/csv_writer.py
+
+import asyncio
+import csv
+import gzip
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from utils.helpers import ensure_directory
+
+
+class AsyncCsvWriter:
+    """
+    A gzipped CSV file that stays open for the whole run.
+
+    Rows are buffered and written in batches from a worker thread, so compression and
+    disk I/O never block the event loop and the file is a single gzip stream.
+    `close()` must be awaited to flush the last batch.
+    """
+
+    def __init__(self, path: str, fieldnames: List[str], batch_size: int = 500,
+                 logger: Optional[logging.Logger] = None):
+        self.path = path
+        self.fieldnames = fieldnames
+        self.batch_size = max(1, batch_size)
+        self.logger = logger or logging.getLogger(__name__)
+        self.rows_written = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self._closed = False
+
+        ensure_directory(os.path.dirname(path))
+        self._file = gzip.open(path, 'wt', encoding='utf-8', newline='', compresslevel=6)
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        self._writer.writeheader()
+
+    async def write(self, rows: List[Dict[str, Any]]) -> None:
+        if self._closed:
+            raise ValueError(f"Writing to closed data file {self.path}")
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._buffer:
+                return
+            rows, self._buffer = self._buffer, []
+            await asyncio.to_thread(self._write_rows, rows)
+            self.rows_written += len(rows)
+            self.logger.debug(f"Wrote {len(rows)} rows to {self.path}")
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        try:
+            await self.flush()
+        finally:
+            self._closed = True
+            await asyncio.to_thread(self._file.close)
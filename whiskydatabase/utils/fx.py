@@ -0,0 +1,139 @@
+# utils/fx.py
+
+import asyncio
+import glob
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from utils.helpers import ensure_directory
+from utils.http_client import HttpClient
+
+FX_URL = 'https://api.exchangerate-api.com/v4/latest/EUR'
+# Last resort when no rates were ever fetched
+FALLBACK_RATES = {'EUR': 1.0, 'GBP': 0.87}
+
+
+@dataclass
+class FxRates:
+    """Exchange rates for one day, as units of each currency per 1 EUR."""
+    date: str
+    rates: Dict[str, float]
+    source: str
+
+    def to_eur(self, amount: Optional[float], currency: str) -> Optional[float]:
+        rate = self.rates.get((currency or '').upper())
+        if amount is None or not rate:
+            return None
+        return amount / rate
+
+
+class FxService:
+    """
+    Daily exchange rates for every currency, fetched at most once per `ttl_hours`.
+
+    Each day's rates are kept in `data/fx/rates-YYYY-MM-DD.json`, which is also what the
+    analysis code converts prices with. When the API cannot be reached the most recent
+    cached day is used. `rates_file` (a JSON file with a `rates` mapping based on EUR)
+    replaces the API and the cache entirely, e.g. for tests or offline runs. Each
+    attempt is limited to `timeout` seconds.
+    """
+
+    def __init__(self, directory: str = os.path.join('data', 'fx'), ttl_hours: float = 24,
+                 url: str = FX_URL, rates_file: Optional[str] = None, retries: int = 3,
+                 timeout: float = 10, logger: Optional[logging.Logger] = None):
+        self.directory = directory
+        self.ttl = timedelta(hours=ttl_hours)
+        self.url = url
+        self.rates_file = rates_file
+        self.retries = max(1, retries)
+        self.timeout = timeout
+        self.logger = logger or logging.getLogger(__name__)
+
+    async def get_rates(self, http_client: Optional[HttpClient] = None) -> FxRates:
+        if self.rates_file:
+            payload = _read_json(self.rates_file)
+            return FxRates(payload.get('date', datetime.now().strftime('%Y-%m-%d')),
+                           _upper(payload['rates']), self.rates_file)
+
+        today_path = self._path(datetime.now().strftime('%Y-%m-%d'))
+        cached = self._read_cache(today_path)
+        if cached and datetime.now() - datetime.fromisoformat(cached['fetched_at']) < self.ttl:
+            return FxRates(cached['date'], cached['rates'], today_path)
+
+        try:
+            rates = await self._fetch(http_client)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError) as e:
+            return self._fallback(e)
+        self._write_cache(today_path, rates)
+        self.logger.info(f"Fetched exchange rates for {len(rates)} currencies")
+        return FxRates(datetime.now().strftime('%Y-%m-%d'), rates, self.url)
+
+    async def _fetch(self, http_client: Optional[HttpClient]) -> Dict[str, float]:
+        client = http_client or HttpClient(logger=self.logger)
+        try:
+            for attempt in range(self.retries):
+                try:
+                    response = await client.get(self.url, timeout=self.timeout)
+                    if response.status != 200:
+                        raise ValueError(f"HTTP error: {response.status}")
+                    return _upper(response.json()['rates'])
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    if attempt == self.retries - 1:
+                        raise
+                    self.logger.warning(f"Error fetching exchange rates (attempt {
+                                        attempt + 1}/{self.retries}): {e}")
+                    await asyncio.sleep(2 ** attempt)
+        finally:
+            if http_client is None:
+                await client.close()
+
+    def _fallback(self, error: Exception) -> FxRates:
+        paths = sorted(glob.glob(os.path.join(self.directory, 'rates-*.json')))
+        for path in reversed(paths):
+            cached = self._read_cache(path)
+            if cached:
+                self.logger.warning(f"Could not fetch exchange rates ({error}), using {cached['date']} rates")
+                return FxRates(cached['date'], cached['rates'], path)
+        self.logger.error(f"Could not fetch exchange rates ({error}) and none are cached, using fallback rates")
+        return FxRates(datetime.now().strftime('%Y-%m-%d'), dict(FALLBACK_RATES), 'fallback')
+
+    def _path(self, day: str) -> str:
+        return os.path.join(self.directory, f"rates-{day}.json")
+
+    def _read_cache(self, path: str) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(path):
+            return None
+        try:
+            return _read_json(path)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not read cached exchange rates from {path}: {e}")
+            return None
+
+    def _write_cache(self, path: str, rates: Dict[str, float]) -> None:
+        ensure_directory(self.directory)
+        payload = {
+            'date': datetime.now().strftime('%Y-%m-%d'),
+            'fetched_at': datetime.now().isoformat(timespec='seconds'),
+            'base': 'EUR',
+            'source': self.url,
+            'rates': rates,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _upper(rates: Dict[str, Any]) -> Dict[str, float]:
+    return {currency.upper(): float(rate) for currency, rate in rates.items()}
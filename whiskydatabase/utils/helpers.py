@@ -1,8 +1,6 @@
 # utils/helpers.py
 
 import logging
-import asyncio
-import aiohttp
 import yaml
 import os
 import datetime
@@ -30,41 +28,6 @@ def get_date_string():
     return datetime.datetime.now().strftime('%Y%m%d')
 
 
-async def fetch_exchange_rate_GBP_EUR(logger: logging.Logger) -> float:
-    """Fetches the GBP to EUR exchange rate asynchronously."""
-    exchange_rate = None
-    max_retries = 3
-    retry_delay = 5  # seconds
-    API_URL = 'https://api.exchangerate-api.com/v4/latest/GBP'
-    for attempt in range(max_retries):
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(API_URL) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        exchange_rate = data['rates']['EUR']
-                        logger.info(f"Fetched exchange rate: 1 GBP = {
-                                    exchange_rate} EUR")
-                        return exchange_rate
-                    else:
-                        raise Exception(f"HTTP error: {resp.status}")
-        except Exception as e:
-            logger.warning(f"Error fetching exchange rate (attempt {
-                           attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                logger.info(f"Retrying in {retry_delay} seconds...")
-                await asyncio.sleep(retry_delay)
-            else:
-                logger.error(
-                    "Max retries reached. Using fallback exchange rate.")
-                exchange_rate = 1.15  # Fallback to a reasonable fixed rate
-                return exchange_rate
-
-    # In case all retries failed
-    logger.info(f"Using exchange rate: 1 GBP = {exchange_rate} EUR")
-    return exchange_rate
-
-
 def apply_parser(value: str, parser: str, field: str, pattern: Optional[str] = None, base_url: Optional[str] = None) -> Any:
     logger = logging.getLogger(__name__)
     try:
@@ -0,0 +1,338 @@
+# utils/html_parser.py
+
+import logging
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+import soupsieve
+
+from utils.helpers import apply_parser
+from utils.response_mapper import ResponseMapper
+from utils.structured_data import (DEFAULT_PROPERTIES, dedupe_rows, fill_missing, find_products, merge_rows,
+                                   normalize_row, parse_inline_state, parse_json_ld, product_to_row)
+
+try:
+    import lxml.html
+    from lxml import etree
+    from cssselect import HTMLTranslator
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+DEFAULT_BACKEND = 'lxml' if LXML_AVAILABLE else 'html.parser'
+
+# Row fields the scraper sets itself rather than parsing them from the page
+SCRAPER_FIELDS = ('retailer', 'retailer_country', 'currency', 'scraped_at')
+# Attributes holding a microdata property's value, before falling back to the text
+MICRODATA_ATTRIBUTES = ('content', 'href', 'src', 'value', 'datetime')
+
+# Configs use both soupsieve's ':-soup-contains()' and the older ':contains()' spelling
+_SOUP_CONTAINS = re.compile(r':-soup-contains\(')
+_PLAIN_CONTAINS = re.compile(r'(?<![\w-]):contains\(')
+
+
+class HtmlBackend(ABC):
+    """Parses documents and compiles CSS selectors for one HTML parsing library."""
+
+    name = ''
+
+    @abstractmethod
+    def parse(self, content: str) -> Any:
+        pass
+
+    @abstractmethod
+    def compile(self, selector: str) -> Tuple[Callable[[Any], Optional[Any]], Callable[[Any], List[Any]]]:
+        """Returns (select_one, select) functions for a CSS selector."""
+        pass
+
+    @abstractmethod
+    def text(self, element: Any) -> str:
+        pass
+
+    @abstractmethod
+    def raw_text(self, element: Any) -> str:
+        """The unstripped text of an element, including script contents."""
+        pass
+
+    @abstractmethod
+    def children(self, element: Any) -> List[Any]:
+        pass
+
+    def attribute(self, element: Any, name: str) -> str:
+        return (element.get(name) or '').strip()
+
+    def has_attribute(self, element: Any, name: str) -> bool:
+        return element.get(name) is not None
+
+
+class SoupBackend(HtmlBackend):
+    name = 'html.parser'
+
+    def parse(self, content: str) -> Any:
+        return BeautifulSoup(content, 'html.parser')
+
+    def compile(self, selector: str):
+        compiled = soupsieve.compile(_PLAIN_CONTAINS.sub(':-soup-contains(', selector))
+        return compiled.select_one, compiled.select
+
+    def text(self, element: Any) -> str:
+        return element.get_text(strip=True)
+
+    def raw_text(self, element: Any) -> str:
+        return element.get_text()
+
+    def children(self, element: Any) -> List[Any]:
+        return element.find_all(True, recursive=False)
+
+
+class LxmlBackend(HtmlBackend):
+    name = 'lxml'
+
+    _translator = HTMLTranslator() if LXML_AVAILABLE else None
+    _text_nodes = etree.XPath('.//text()[not(parent::script) and not(parent::style)]') if LXML_AVAILABLE else None
+
+    def parse(self, content: str) -> Any:
+        return lxml.html.fromstring(content)
+
+    def compile(self, selector: str):
+        css = _SOUP_CONTAINS.sub(':contains(', selector)
+        xpath = etree.XPath(self._translator.css_to_xpath(css, prefix='descendant::'))
+
+        def select_one(node: Any) -> Optional[Any]:
+            matches = xpath(node)
+            return matches[0] if matches else None
+
+        return select_one, xpath
+
+    def text(self, element: Any) -> str:
+        # Same result as BeautifulSoup's get_text(strip=True)
+        return ''.join(part.strip() for part in self._text_nodes(element))
+
+    def raw_text(self, element: Any) -> str:
+        return ''.join(element.itertext())
+
+    def children(self, element: Any) -> List[Any]:
+        # Skips comments and processing instructions
+        return [child for child in element if isinstance(child.tag, str)]
+
+
+def get_backend(name: Optional[str] = None, logger: Optional[logging.Logger] = None) -> HtmlBackend:
+    name = (name or DEFAULT_BACKEND).lower()
+    if name == 'lxml':
+        if LXML_AVAILABLE:
+            return LxmlBackend()
+        (logger or logging.getLogger(__name__)).warning(
+            "lxml/cssselect not installed, falling back to html.parser")
+        return SoupBackend()
+    if name in ('html.parser', 'bs4', 'beautifulsoup'):
+        return SoupBackend()
+    raise ValueError(f"Unknown HTML parser backend: {name}")
+
+
+class SiteHtmlParser:
+    """
+    Listing and detail page parsing for one site config.
+
+    All CSS selectors from `fields` / `detail_fields` are compiled once up front,
+    so parsing a page only walks the tree.
+
+    With `structured_data.enabled`, products are also read from the page's JSON-LD,
+    schema.org microdata and, if configured, inline hydration state. On listing pages
+    they fill the fields the selectors left empty (`listing: merge`) or replace the
+    selector rows (`listing: replace`); on detail pages they fill empty detail fields.
+    """
+
+    def __init__(self, site_config: Dict[str, Any], logger: Optional[logging.Logger] = None,
+                 backend: Optional[str] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.retailer = site_config['name']
+        self.base_url = site_config['base_url']
+        self.backend = get_backend(backend or site_config.get('html_parser'), self.logger)
+
+        self._product_list = self.backend.compile(site_config['product_list_selector'])[0]
+        self._product_items = self.backend.compile(site_config['product_item_selector'])[1]
+        next_page_selector = site_config.get('next_page_selector')
+        self._next_page = self.backend.compile(next_page_selector)[0] if next_page_selector else None
+        self._fields = self._compile_fields(site_config['fields'])
+        self._detail_fields = self._compile_fields(site_config.get('detail_fields', {}))
+        self._product_page_fields = self._compile_fields(site_config.get('product_page_fields', {}))
+        self._init_structured_data(site_config)
+
+    def _init_structured_data(self, site_config: Dict[str, Any]) -> None:
+        config = site_config.get('structured_data', {})
+        self.structured = config.get('enabled', False)
+        self.structured_listing = config.get('listing', 'merge')
+        if self.structured_listing not in ('merge', 'replace'):
+            raise ValueError(f"Unknown structured_data.listing mode: {self.structured_listing}")
+        self.structured_details = config.get('details', True)
+        self._json_ld = self.backend.compile('script[type="application/ld+json"]')[1] \
+            if config.get('json_ld', True) else None
+        self._microdata = self.backend.compile('[itemscope][itemtype*="schema.org/Product"]')[1] \
+            if config.get('microdata', True) else None
+
+        inline_state = config.get('inline_state')
+        self._inline_state = None
+        if inline_state:
+            self._inline_state = self.backend.compile(inline_state['selector'])[0]
+            self._inline_pattern = inline_state.get('pattern')
+            self._state_mapper = ResponseMapper(inline_state, self.logger)
+
+        self._properties = {field: tuple(names) for field, names in DEFAULT_PROPERTIES.items()}
+        for field, names in config.get('properties', {}).items():
+            self._properties[field] = tuple(name.lower() for name in names) + self._properties.get(field, ())
+
+        fieldnames = site_config.get('fieldnames') or []
+        listing_fields = list(site_config['fields'])
+        # Rows may only carry columns the sinks know; detail pages never override listing fields
+        self._structured_fields = set(fieldnames or listing_fields) - set(SCRAPER_FIELDS)
+        self._structured_detail_fields = self._structured_fields - set(listing_fields)
+        self._empty_listing_row = dict.fromkeys(listing_fields)
+
+    def _compile_fields(self, fields: Dict[str, Dict[str, Any]]) -> List[Tuple[str, Callable, Dict[str, Any]]]:
+        return [(field, self.backend.compile(config['selector'])[0], config)
+                for field, config in fields.items()]
+
+    def parse_listing(self, content: str) -> Tuple[Optional[List[Dict[str, Any]]], bool]:
+        """
+        Parses a listing page into (products, has_next_page). `products` is None when
+        the page has no product list at all.
+        """
+        root = self.backend.parse(content)
+        product_list = self._product_list(root)
+        if product_list is None:
+            return None, False
+
+        products = []
+        if not (self.structured and self.structured_listing == 'replace'):
+            product_items = self._product_items(product_list)
+            self.logger.debug(f'Found {len(product_items)} product items.')
+            for item in product_items:
+                try:
+                    product = self._parse_product(item)
+                    if product:
+                        products.append(product)
+                except Exception as e:
+                    self.logger.error(f"Error parsing product: {e}")
+
+        if self.structured:
+            rows = self.structured_rows(root)
+            if self.structured_listing == 'replace':
+                products = [{**self._empty_listing_row, **row} for row in rows
+                            if row.get('name') and row.get('price') is not None]
+            else:
+                merge_rows(products, rows)
+            self.logger.debug(f'Found {len(rows)} structured products.')
+        self.logger.info(f'Parsed {len(products)} products.')
+
+        has_next_page = self._next_page is not None and self._next_page(root) is not None
+        return products, has_next_page
+
+    def _parse_product(self, item: Any) -> Optional[Dict[str, Any]]:
+        product = {}
+        for field, select_one, config in self._fields:
+            element = select_one(item)
+            if element is not None:
+                attribute = config.get('attribute')
+                if attribute:
+                    raw_value = self.backend.attribute(element, attribute)
+                else:
+                    raw_value = self.backend.text(element)
+                product[field] = apply_parser(
+                    raw_value, config.get('parser', 'str'), field, config.get('pattern'), self.base_url)
+            elif config.get('required', False):
+                self.logger.warning(f"Required field '{
+                                    field}' not found for {self.retailer}")
+                return None
+            else:
+                product[field] = None
+
+        return product if product.get('name') and product.get('price') else None
+
+    def parse_details(self, content: str) -> Dict[str, Any]:
+        return self._parse_details(self.backend.parse(content))
+
+    def parse_product_page(self, content: str) -> Dict[str, Any]:
+        """
+        A whole row from a product page alone, for products found without a listing
+        (e.g. in a sitemap): `product_page_fields`, then the detail fields, then the
+        page's structured data for anything still missing.
+        """
+        root = self.backend.parse(content)
+        row = dict(self._empty_listing_row)
+        for field, select_one, config in self._product_page_fields:
+            element = select_one(root)
+            if element is not None:
+                attribute = config.get('attribute')
+                raw_value = self.backend.attribute(element, attribute) if attribute else self.backend.text(element)
+                row[field] = apply_parser(
+                    raw_value, config.get('parser', 'str'), field, config.get('pattern'), self.base_url)
+        fill_missing(row, self._parse_details(root, structured=False))
+        rows = self.structured_rows(root)
+        if rows:
+            fill_missing(row, rows[0])
+        return row
+
+    def _parse_details(self, root: Any, structured: bool = True) -> Dict[str, Any]:
+        details = {}
+        for field, select_one, config in self._detail_fields:
+            element = select_one(root)
+            if element is not None:
+                details[field] = apply_parser(
+                    self.backend.text(element), config.get('parser', 'str'), field,
+                    config.get('pattern'), self.base_url)
+            elif config.get('required', False):
+                self.logger.warning(f"Required detail field '{
+                                    field}' not found for {self.retailer}")
+            else:
+                details[field] = None
+
+        if structured and self.structured and self.structured_details:
+            rows = self.structured_rows(root)
+            # The page's own product comes first; later ones are usually related products
+            if rows:
+                fill_missing(details, {field: value for field, value in rows[0].items()
+                                       if field in self._structured_detail_fields})
+        return details
+
+    def structured_rows(self, root: Any) -> List[Dict[str, Any]]:
+        """All products described by the page's structured data, mapped to our fields."""
+        rows = []
+        if self._json_ld is not None:
+            objects = []
+            for script in self._json_ld(root):
+                objects.extend(parse_json_ld(self.backend.raw_text(script), self.logger))
+            rows.extend(product_to_row(product, self.base_url, self._properties)
+                        for product in find_products(objects))
+        if self._microdata is not None:
+            rows.extend(product_to_row(self._microdata_item(element), self.base_url, self._properties)
+                        for element in self._microdata(root))
+        if self._inline_state is not None:
+            script = self._inline_state(root)
+            state = parse_inline_state(self.backend.raw_text(script), self._inline_pattern) \
+                if script is not None else None
+            if state is not None:
+                rows.extend(normalize_row(row, self.base_url) for row in self._state_mapper.map(state))
+        return [{field: value for field, value in row.items() if field in self._structured_fields}
+                for row in dedupe_rows(rows)]
+
+    def _microdata_item(self, scope: Any) -> Dict[str, Any]:
+        """Reads an `itemscope` element into the same shape as a JSON-LD object."""
+        item: Dict[str, Any] = {'@type': self.backend.attribute(scope, 'itemtype')}
+        stack = self.backend.children(scope)[::-1]
+        while stack:
+            element = stack.pop()
+            prop = self.backend.attribute(element, 'itemprop')
+            nested = self.backend.has_attribute(element, 'itemscope')
+            if prop and prop not in item:
+                item[prop] = self._microdata_item(element) if nested else self._microdata_value(element)
+            if not nested:
+                stack.extend(self.backend.children(element)[::-1])
+        return item
+
+    def _microdata_value(self, element: Any) -> str:
+        for attribute in MICRODATA_ATTRIBUTES:
+            if self.backend.has_attribute(element, attribute):
+                return self.backend.attribute(element, attribute)
+        return self.backend.text(element)
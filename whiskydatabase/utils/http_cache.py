@@ -0,0 +1,170 @@
+# utils/http_cache.py
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.helpers import ensure_directory
+from utils.http_client import HttpResponse
+
+
+class HttpCache:
+    """
+    On-disk response cache keyed by URL.
+
+    Stores validators (ETag / Last-Modified) and the gzipped body of every cacheable
+    response, plus optionally the rows parsed from it, so the next run can send a
+    conditional request and skip both the download and the parsing on a 304.
+    Entries are evicted least-recently-used once the cache exceeds `max_bytes`.
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, directory: str, max_bytes: int = 50 * 1024 * 1024,
+                 logger: Optional[logging.Logger] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.logger = logger or logging.getLogger(__name__)
+        self.index: Dict[str, Dict[str, Any]] = {}
+        self.requests = 0
+        self.hits = 0
+        self._dirty = False
+        self._load_index()
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.hits / self.requests if self.requests else 0.0
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{key}{suffix}")
+
+    def _load_index(self) -> None:
+        index_path = os.path.join(self.directory, self.INDEX_FILE)
+        if not os.path.exists(index_path):
+            return
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Discarding unreadable HTTP cache index {index_path}: {e}")
+            self.index = {}
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Returns If-None-Match / If-Modified-Since headers for a cached URL."""
+        entry = self.index.get(self._key(url))
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def has_validators(self, url: str) -> bool:
+        entry = self.index.get(self._key(url))
+        return bool(entry and (entry.get('etag') or entry.get('last_modified')))
+
+    def not_modified(self, url: str) -> Optional[HttpResponse]:
+        """Handles a 304 for `url`: returns the cached response, or None if the body is gone."""
+        key = self._key(url)
+        entry = self.index.get(key)
+        if not entry:
+            return None
+        try:
+            with gzip.open(self._path(key, '.body.gz'), 'rb') as f:
+                body = f.read()
+        except OSError:
+            self._drop(key)
+            return None
+        self.hits += 1
+        entry['last_used'] = time.time()
+        self._dirty = True
+        return HttpResponse(url, 200, entry.get('headers', {}), body, from_cache=True)
+
+    def store(self, url: str, response: HttpResponse) -> None:
+        """Caches a 200 response if it carries validators."""
+        etag = response.headers.get('etag')
+        last_modified = response.headers.get('last-modified')
+        if response.status != 200 or not (etag or last_modified):
+            return
+        key = self._key(url)
+        ensure_directory(self.directory)
+        body_path = self._path(key, '.body.gz')
+        with gzip.open(body_path, 'wb', compresslevel=5) as f:
+            f.write(response.body)
+        self._remove_file(self._path(key, '.parsed.json.gz'))
+        self.index[key] = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'headers': {k: v for k, v in response.headers.items() if k == 'content-type'},
+            'size': os.path.getsize(body_path),
+            'last_used': time.time(),
+        }
+        self._dirty = True
+
+    def get_parsed(self, url: str) -> Optional[List[Dict[str, Any]]]:
+        key = self._key(url)
+        if not self.index.get(key, {}).get('parsed'):
+            return None
+        try:
+            with gzip.open(self._path(key, '.parsed.json.gz'), 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store_parsed(self, url: str, rows: List[Dict[str, Any]]) -> None:
+        """Stores the rows parsed from a cached body so a 304 can skip parsing."""
+        key = self._key(url)
+        entry = self.index.get(key)
+        if not entry:
+            return
+        parsed_path = self._path(key, '.parsed.json.gz')
+        with gzip.open(parsed_path, 'wt', encoding='utf-8', compresslevel=5) as f:
+            json.dump(rows, f, default=str)
+        entry['parsed'] = True
+        entry['size'] = os.path.getsize(self._path(key, '.body.gz')) + os.path.getsize(parsed_path)
+        self._dirty = True
+
+    def _remove_file(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _drop(self, key: str) -> None:
+        self.index.pop(key, None)
+        self._remove_file(self._path(key, '.body.gz'))
+        self._remove_file(self._path(key, '.parsed.json.gz'))
+        self._dirty = True
+
+    def _evict(self) -> None:
+        total = sum(entry.get('size', 0) for entry in self.index.values())
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1].get('last_used', 0)):
+            if total <= self.max_bytes:
+                break
+            total -= entry.get('size', 0)
+            self._drop(key)
+        self.logger.debug(f"Evicted HTTP cache entries down to {total} bytes")
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self._evict()
+        ensure_directory(self.directory)
+        index_path = os.path.join(self.directory, self.INDEX_FILE)
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, index_path)
+        self._dirty = False
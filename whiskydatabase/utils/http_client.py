@@ -0,0 +1,100 @@
+# utils/http_client.py
+
+import json
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiohttp
+
+try:
+    import brotli  # noqa: F401  (enables aiohttp's 'br' content decoding)
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+
+@dataclass
+class HttpResponse:
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    from_cache: bool = False
+
+    def __post_init__(self):
+        # Header names are case-insensitive; normalise them like Playwright does
+        self.headers = {k.lower(): v for k, v in self.headers.items()}
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 400
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class HttpClient:
+    """
+    A pooled aiohttp session shared by all scrapers for browserless requests.
+
+    Connections are kept alive and reused per host; responses are transparently
+    decompressed (gzip/deflate, and brotli when the `brotli` package is installed).
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 8, timeout: float = 60,
+                 keepalive_timeout: float = 30, logger: Optional[logging.Logger] = None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.logger = logger or logging.getLogger(__name__)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> 'HttpClient':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Accept-Encoding': ACCEPT_ENCODING},
+            )
+        return self._session
+
+    def _request_timeout(self, timeout: Optional[float]) -> aiohttp.ClientTimeout:
+        # An explicit timeout=None would switch off aiohttp's session-wide limit
+        return aiohttp.ClientTimeout(total=timeout or self.timeout)
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+                  timeout: Optional[float] = None) -> HttpResponse:
+        session = self._get_session()
+        request_timeout = self._request_timeout(timeout)
+        async with session.get(url, headers=headers, timeout=request_timeout) as resp:
+            body = await resp.read()
+            return HttpResponse(url, resp.status, dict(resp.headers), body)
+
+    @asynccontextmanager
+    async def stream(self, url: str, headers: Optional[Dict[str, str]] = None,
+                     timeout: Optional[float] = None) -> AsyncIterator[aiohttp.ClientResponse]:
+        """A GET whose body is read incrementally, e.g. with `response.content.iter_chunked()`."""
+        session = self._get_session()
+        request_timeout = self._request_timeout(timeout)
+        async with session.get(url, headers=headers, timeout=request_timeout) as resp:
+            yield resp
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -0,0 +1,200 @@
+# utils/metrics.py
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from utils.helpers import ensure_directory
+
+# Upper bounds in seconds, as in Prometheus' default histogram buckets plus a few long ones
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf'))
+# fetch: HTTP request or page navigation; wait: rate limiter and retry back-off;
+# render: waiting for selectors and reading the DOM; parse: HTML/JSON to rows;
+# detail: one product's detail page, end to end; save: writing a batch to the sinks
+PHASES = ('fetch', 'wait', 'render', 'parse', 'detail', 'save')
+# blocked: browser sub-requests aborted by the site's resource filter
+COUNTERS = ('requests', 'bytes_received', 'blocked', 'retries', 'throttled', 'errors', 'pages', 'rows')
+
+
+class Histogram:
+    """Cumulative-bucket timing histogram with sum, count and max."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimated like Prometheus' histogram_quantile: linear within the bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, (bound, count) in enumerate(zip(self.buckets, self.counts)):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = min(bound, self.max)
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum_s': round(self.sum, 4),
+            'mean_s': round(self.sum / self.count, 4) if self.count else 0.0,
+            'p50_s': round(self.quantile(0.5), 4),
+            'p95_s': round(self.quantile(0.95), 4),
+            'max_s': round(self.max, 4),
+            'buckets': {('+Inf' if bound == float('inf') else str(bound)): count
+                        for bound, count in zip(self.buckets, self.counts)},
+        }
+
+
+class ScraperMetrics:
+    """
+    Timings and counters for one scraper run. Phases are timed with `time(phase)`;
+    `summary()` gives the JSON-ready view used by the run report.
+    """
+
+    def __init__(self, retailer: str):
+        self.retailer = retailer
+        self.phases: Dict[str, Histogram] = {phase: Histogram() for phase in PHASES}
+        self.counters: Dict[str, int] = {counter: 0 for counter in COUNTERS}
+        self.open_pages = 0
+        self.peak_open_pages = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def start(self) -> None:
+        self.started_at = time.time()
+        self.finished_at = None
+
+    def stop(self) -> None:
+        self.finished_at = time.time()
+
+    @contextmanager
+    def time(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[phase].observe(time.perf_counter() - start)
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        self.counters[counter] += amount
+
+    def page_opened(self) -> None:
+        self.open_pages += 1
+        self.peak_open_pages = max(self.peak_open_pages, self.open_pages)
+
+    def page_closed(self) -> None:
+        self.open_pages -= 1
+
+    @property
+    def duration(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        duration = self.duration
+        return self.counters['rows'] / duration if duration else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'retailer': self.retailer,
+            'started_at': _isoformat(self.started_at),
+            'finished_at': _isoformat(self.finished_at),
+            'duration_s': round(self.duration, 3),
+            'rows_per_second': round(self.rows_per_second, 2),
+            'peak_open_pages': self.peak_open_pages,
+            **self.counters,
+            'phases': {phase: histogram.to_dict() for phase, histogram in self.phases.items()
+                       if histogram.count},
+        }
+
+
+def write_run_report(metrics: List[ScraperMetrics], directory: str = os.path.join('data', 'metrics'),
+                     prometheus: bool = False, **extra: Any) -> str:
+    """
+    Writes `run-YYYYmmdd-HHMMSS.json` with one summary per scraper, plus `extra` run-wide
+    values, and with `prometheus` also `scrapers.prom` in the Prometheus text format
+    (overwritten each run, e.g. for node_exporter's textfile collector). Returns the JSON path.
+    """
+    ensure_directory(directory)
+    now = datetime.now()
+    report = {
+        'finished_at': now.isoformat(timespec='seconds'),
+        **extra,
+        'scrapers': [scraper.summary() for scraper in metrics],
+    }
+    path = os.path.join(directory, f"run-{now:%Y%m%d-%H%M%S}.json")
+    _write_atomic(path, json.dumps(report, indent=2))
+    if prometheus:
+        _write_atomic(os.path.join(directory, 'scrapers.prom'), prometheus_text(metrics, **extra))
+    return path
+
+
+def prometheus_text(metrics: List[ScraperMetrics], **extra: Any) -> str:
+    lines = [
+        '# HELP scraper_phase_seconds Time spent per scraper phase.',
+        '# TYPE scraper_phase_seconds histogram',
+    ]
+    for scraper in metrics:
+        for phase, histogram in scraper.phases.items():
+            if not histogram.count:
+                continue
+            labels = f'retailer="{_escape(scraper.retailer)}",phase="{phase}"'
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'scraper_phase_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'scraper_phase_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+            lines.append(f'scraper_phase_seconds_count{{{labels}}} {histogram.count}')
+
+    for counter in COUNTERS:
+        lines.append(f'# TYPE scraper_{counter}_total counter')
+        lines += [f'scraper_{counter}_total{{retailer="{_escape(scraper.retailer)}"}} {scraper.counters[counter]}'
+                  for scraper in metrics]
+    for gauge in ('duration', 'rows_per_second', 'peak_open_pages'):
+        name = 'duration_seconds' if gauge == 'duration' else gauge
+        lines.append(f'# TYPE scraper_{name} gauge')
+        lines += [f'scraper_{name}{{retailer="{_escape(scraper.retailer)}"}} {getattr(scraper, gauge):g}'
+                  for scraper in metrics]
+    for name, value in extra.items():
+        if isinstance(value, (int, float)):
+            lines.append(f'# TYPE scraper_run_{name} gauge')
+            lines.append(f'scraper_run_{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -0,0 +1,118 @@
+# utils/parse_pool.py
+
+import asyncio
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.html_parser import SiteHtmlParser
+from utils.response_mapper import ResponseMapper
+
+
+class SiteParsers:
+    """
+    All CPU-bound parsing for one site config. Used inline by a scraper, or built
+    lazily inside each ParsePool worker.
+    """
+
+    def __init__(self, site_config: Dict[str, Any], logger: Optional[logging.Logger] = None):
+        self.site_config = site_config
+        self.logger = logger or logging.getLogger(site_config['name'])
+        self._html_parser: Optional[SiteHtmlParser] = None
+        self._response_mapper: Optional[ResponseMapper] = None
+
+    @property
+    def html_parser(self) -> SiteHtmlParser:
+        if self._html_parser is None:
+            self._html_parser = SiteHtmlParser(self.site_config, self.logger)
+        return self._html_parser
+
+    @property
+    def response_mapper(self) -> ResponseMapper:
+        if self._response_mapper is None:
+            self._response_mapper = ResponseMapper(self.site_config['response_mapping'], self.logger)
+        return self._response_mapper
+
+    def parse_listing(self, content: str) -> Tuple[Optional[List[Dict[str, Any]]], bool]:
+        return self.html_parser.parse_listing(content)
+
+    def parse_details(self, content: str) -> Dict[str, Any]:
+        return self.html_parser.parse_details(content)
+
+    def parse_product_page(self, content: str) -> Dict[str, Any]:
+        return self.html_parser.parse_product_page(content)
+
+    def parse_json(self, body: bytes) -> List[Dict[str, Any]]:
+        return self.response_mapper.map(json.loads(body))
+
+
+# Worker-process state: the site configs arrive once through the pool initializer
+_worker_configs: Dict[str, Dict[str, Any]] = {}
+_worker_parsers: Dict[str, SiteParsers] = {}
+
+
+def _init_worker(site_configs: Dict[str, Dict[str, Any]], log_queue: multiprocessing.Queue) -> None:
+    global _worker_configs
+    _worker_configs = site_configs
+    # A spawned worker has no handlers; its records are sent to the main process instead
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(logging.DEBUG)
+
+
+def _run_task(site_key: str, method: str, payload: Any) -> Any:
+    parsers = _worker_parsers.get(site_key)
+    if parsers is None:
+        parsers = _worker_parsers[site_key] = SiteParsers(_worker_configs[site_key])
+    return getattr(parsers, method)(payload)
+
+
+class _ForwardToLogger(logging.Handler):
+    """Hands a worker's log record to the main-process logger of the same name."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logger = logging.getLogger(record.name)
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+
+
+class ParsePool:
+    """
+    A process pool shared by all scrapers so HTML/JSON parsing never blocks the event loop.
+
+    Only the raw page and plain dicts cross the process boundary; site configs are sent
+    to each worker once when it starts. Workers log through a queue, so their messages
+    end up in the scraper's own log handlers.
+    """
+
+    def __init__(self, site_configs: Dict[str, Dict[str, Any]], max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        mp_context = multiprocessing.get_context('spawn')
+        self._log_queue = mp_context.Queue()
+        self._log_listener = logging.handlers.QueueListener(self._log_queue, _ForwardToLogger())
+        self._log_listener.start()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(site_configs, self._log_queue),
+        )
+
+    async def __aenter__(self) -> 'ParsePool':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    async def run(self, site_key: str, method: str, payload: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _run_task, site_key, method, payload)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        # Handles the records the workers sent before they exited
+        self._log_listener.stop()
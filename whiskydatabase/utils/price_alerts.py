@@ -0,0 +1,151 @@
+# utils/price_alerts.py
+
+import asyncio
+import json
+import logging
+import math
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from utils.helpers import ensure_directory
+from utils.storage import StorageSink, coerce_value
+
+DEFAULT_ALERTS_PATH = os.path.join('data', 'alerts', 'price_alerts.jsonl')
+
+
+class PriceAlertSink(StorageSink):
+    """
+    Scores every scraped price against the history of its offer as it is saved, and
+    appends the prices that look like errors to a JSONL file shared by all scrapers.
+
+    Per offer (product_id, else link) only a few numbers are kept: an EWMA of the price
+    and its variance, and a streaming estimate of the median with its mean absolute
+    deviation. Scoring and updating a row is O(1); the statistics are stored in
+    `data/state/price_stats/<retailer>.json` between runs.
+
+    A price alerts when the offer has at least `min_history` earlier prices, it is
+    `z_threshold` deviations from the EWMA and at least `min_change` (a fraction) away
+    from the median.
+    """
+
+    def __init__(self, retailer: str, alerts_path: str = DEFAULT_ALERTS_PATH,
+                 state_path: Optional[str] = None, alpha: float = 0.3, z_threshold: float = 4.0,
+                 min_change: float = 0.3, min_history: int = 3, logger: Optional[logging.Logger] = None):
+        self.retailer = retailer
+        self.path = alerts_path
+        self.state_path = state_path or os.path.join(
+            'data', 'state', 'price_stats', f"{retailer.lower().replace(' ', '_')}.json")
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_change = min_change
+        self.min_history = min_history
+        self.logger = logger or logging.getLogger(__name__)
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self.alerts = 0
+        self._rows_written = 0
+        self._load()
+
+    @property
+    def rows_written(self) -> int:
+        return self._rows_written
+
+    def _load(self) -> None:
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.stats = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not load price statistics from {self.state_path}: {e}")
+            self.stats = {}
+
+    async def write(self, rows: List[Dict[str, Any]]) -> None:
+        alerts = [alert for alert in map(self.observe, rows) if alert]
+        self._rows_written += len(rows)
+        if not alerts:
+            return
+        self.alerts += len(alerts)
+        for alert in alerts:
+            self.logger.warning(f"Price alert: {alert['name']} at {alert['price']} {
+                                alert['currency']}, expected around {alert['expected_price']} ({alert['link']})")
+        await asyncio.to_thread(self._append, alerts)
+
+    def observe(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Scores `row` against its offer's statistics, then adds it to them. Returns an alert or None."""
+        key = row.get('product_id') or row.get('link')
+        try:
+            price = coerce_value('float', row.get('price'))
+        except (TypeError, ValueError):
+            return None
+        if not key or price is None or not math.isfinite(price) or price <= 0:
+            return None
+
+        key = str(key)
+        stats = self.stats.get(key)
+        if stats is None:
+            self.stats[key] = {'count': 1, 'mean': price, 'var': 0.0, 'median': price, 'mad': 0.0,
+                               'last_price': price}
+            return None
+
+        alert = None
+        if stats['count'] >= self.min_history:
+            # Unchanged prices leave no variance, so deviations are at least 2% of the median
+            scale = max(math.sqrt(stats['var']), stats['mad'], 0.02 * stats['median'])
+            zscore = (price - stats['mean']) / scale
+            change = price / stats['median'] - 1
+            if abs(zscore) >= self.z_threshold and abs(change) >= self.min_change:
+                alert = self._alert(row, price, stats, zscore, change)
+        self._update(stats, price)
+        return alert
+
+    def _update(self, stats: Dict[str, float], price: float) -> None:
+        alpha = self.alpha
+        diff = price - stats['mean']
+        increment = alpha * diff
+        stats['mean'] += increment
+        stats['var'] = (1 - alpha) * (stats['var'] + diff * increment)
+        # Frugal median: a step towards the price, sized by the typical deviation
+        deviation = price - stats['median']
+        step = alpha * max(stats['mad'], 0.01 * stats['median'])
+        stats['median'] += min(abs(deviation), step) * (1 if deviation > 0 else -1 if deviation < 0 else 0)
+        stats['mad'] += alpha * (abs(deviation) - stats['mad'])
+        stats['count'] += 1
+        stats['last_price'] = price
+
+    def _alert(self, row: Dict[str, Any], price: float, stats: Dict[str, float],
+               zscore: float, change: float) -> Dict[str, Any]:
+        return {
+            'detected_at': datetime.now().isoformat(timespec='seconds'),
+            'scraped_at': row.get('scraped_at'),
+            'retailer': self.retailer,
+            'product_id': row.get('product_id'),
+            'name': row.get('name'),
+            'link': row.get('link'),
+            'currency': row.get('currency'),
+            'price': price,
+            'previous_price': stats['last_price'],
+            'expected_price': round(stats['median'], 2),
+            'change': round(change, 3),
+            'zscore': round(zscore, 1),
+        }
+
+    def _append(self, alerts: List[Dict[str, Any]]) -> None:
+        ensure_directory(os.path.dirname(self.path))
+        # One write per batch keeps lines from concurrent scrapers intact
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(alert, default=str) + '\n' for alert in alerts))
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._save)
+        if self.alerts:
+            self.logger.info(f"{self.alerts} price alerts written to {self.path}")
+
+    def _save(self) -> None:
+        if not self._rows_written:
+            return
+        ensure_directory(os.path.dirname(self.state_path))
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.stats, f)
+        os.replace(tmp_path, self.state_path)
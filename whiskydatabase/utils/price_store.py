@@ -0,0 +1,233 @@
+# utils/price_store.py
+
+import asyncio
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.helpers import ensure_directory
+from utils.storage import StorageSink, coerce_value
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    product_group INTEGER,
+    name TEXT,
+    brand TEXT,
+    volume TEXT,
+    abv TEXT,
+    category TEXT,
+    country TEXT,
+    region TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS offers (
+    id INTEGER PRIMARY KEY,
+    product_id INTEGER NOT NULL REFERENCES products(id),
+    retailer TEXT NOT NULL,
+    offer_key TEXT NOT NULL,
+    retailer_product_id TEXT,
+    link TEXT,
+    currency TEXT,
+    price REAL,
+    original_price REAL,
+    in_stock INTEGER,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    UNIQUE (retailer, offer_key)
+);
+CREATE TABLE IF NOT EXISTS price_observations (
+    offer_id INTEGER NOT NULL REFERENCES offers(id),
+    observed_at TEXT NOT NULL,
+    price REAL,
+    original_price REAL,
+    in_stock INTEGER,
+    PRIMARY KEY (offer_id, observed_at)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_products_group ON products(product_group);
+CREATE INDEX IF NOT EXISTS idx_offers_product ON offers(product_id);
+CREATE INDEX IF NOT EXISTS idx_observations_time ON price_observations(observed_at);
+"""
+
+PRODUCT_FIELDS = ('name', 'brand', 'volume', 'abv', 'category', 'country', 'region')
+
+# SQLite's default limit on bound parameters is 999 on older builds
+LOOKUP_CHUNK = 500
+
+
+class PriceStore:
+    """
+    Embedded SQLite price history shared by all scrapers in a run.
+
+    `offers` holds one row per (retailer, product_id or link) with its current price
+    and stock; `price_observations` only gets a row when either changes, so the
+    database grows with the number of price changes rather than catalogue size x runs.
+    Each offer has its own `products` row; `product_group` ties the rows of the same
+    product across retailers and is set from the product catalogue's stable ids (see
+    `analysis/catalogue.py`, `ProductCatalogue.link_price_store`).
+    All statements run on one dedicated thread, off the event loop.
+    """
+
+    def __init__(self, path: str = os.path.join('data', 'prices.db'),
+                 logger: Optional[logging.Logger] = None):
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='price-store')
+        self._conn: Optional[sqlite3.Connection] = None
+
+    async def __aenter__(self) -> 'PriceStore':
+        await self._run(self._open)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _open(self) -> None:
+        ensure_directory(os.path.dirname(self.path) or '.')
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA foreign_keys=ON')
+        self._conn.executescript(SCHEMA)
+
+    def sink(self, retailer: str, logger: Optional[logging.Logger] = None) -> 'PriceStoreSink':
+        return PriceStoreSink(self, retailer, logger or self.logger)
+
+    async def record(self, retailer: str, rows: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """Upserts the offers in `rows`; returns (new offers, observations added)."""
+        return await self._run(self._record, retailer, rows)
+
+    def _record(self, retailer: str, rows: List[Dict[str, Any]]) -> Tuple[int, int]:
+        offers = {}
+        for row in rows:
+            offer_key = row.get('product_id') or row.get('link')
+            if offer_key:
+                offers[str(offer_key)] = row
+        if not offers:
+            return 0, 0
+
+        new_offers = observations = 0
+        with self._conn:
+            existing = self._existing_offers(retailer, list(offers))
+            for offer_key, row in offers.items():
+                seen_at = str(row.get('scraped_at') or datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                state = (_number(row.get('price')), _number(row.get('original_price')),
+                         _flag(row.get('in_stock')))
+                current = existing.get(offer_key)
+
+                if current is None:
+                    offer_id = self._insert_offer(retailer, offer_key, row, state, seen_at)
+                    new_offers += 1
+                    changed = True
+                else:
+                    offer_id, product_id, previous = current
+                    self._update_offer(offer_id, product_id, row, state, seen_at)
+                    changed = state != previous
+
+                if changed:
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO price_observations (offer_id, observed_at, price, original_price, in_stock) '
+                        'VALUES (?, ?, ?, ?, ?)', (offer_id, seen_at, *state))
+                    observations += 1
+        return new_offers, observations
+
+    def _existing_offers(self, retailer: str, offer_keys: List[str]) -> Dict[str, Tuple[int, int, Tuple]]:
+        existing = {}
+        for start in range(0, len(offer_keys), LOOKUP_CHUNK):
+            chunk = offer_keys[start:start + LOOKUP_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            cursor = self._conn.execute(
+                f'SELECT offer_key, id, product_id, price, original_price, in_stock FROM offers '
+                f'WHERE retailer = ? AND offer_key IN ({placeholders})', (retailer, *chunk))
+            for offer_key, offer_id, product_id, price, original_price, in_stock in cursor:
+                existing[offer_key] = (offer_id, product_id, (price, original_price, in_stock))
+        return existing
+
+    def _insert_offer(self, retailer: str, offer_key: str, row: Dict[str, Any],
+                      state: Tuple, seen_at: str) -> int:
+        product_id = self._conn.execute(
+            f'INSERT INTO products ({", ".join(PRODUCT_FIELDS)}, first_seen, last_seen) '
+            f'VALUES ({", ".join("?" * (len(PRODUCT_FIELDS) + 2))})',
+            (*_product_values(row), seen_at, seen_at)).lastrowid
+        return self._conn.execute(
+            'INSERT INTO offers (product_id, retailer, offer_key, retailer_product_id, link, currency, '
+            'price, original_price, in_stock, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (product_id, retailer, offer_key, _text(row.get('product_id')), _text(row.get('link')),
+             _text(row.get('currency')), *state, seen_at, seen_at)).lastrowid
+
+    def _update_offer(self, offer_id: int, product_id: int, row: Dict[str, Any],
+                      state: Tuple, seen_at: str) -> None:
+        self._conn.execute(
+            'UPDATE offers SET link = COALESCE(?, link), currency = COALESCE(?, currency), '
+            'price = ?, original_price = ?, in_stock = ?, last_seen = ? WHERE id = ?',
+            (_text(row.get('link')), _text(row.get('currency')), *state, seen_at, offer_id))
+        assignments = ', '.join(f'{field} = COALESCE(?, {field})' for field in PRODUCT_FIELDS)
+        self._conn.execute(
+            f'UPDATE products SET {assignments}, last_seen = ? WHERE id = ?',
+            (*_product_values(row), seen_at, product_id))
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
+
+
+class PriceStoreSink(StorageSink):
+    """Feeds one scraper's rows into the shared PriceStore."""
+
+    def __init__(self, store: PriceStore, retailer: str, logger: logging.Logger):
+        self.store = store
+        self.retailer = retailer
+        self.path = store.path
+        self.logger = logger
+        self.new_offers = 0
+        self.observations = 0
+        self._rows_written = 0
+
+    @property
+    def rows_written(self) -> int:
+        return self._rows_written
+
+    async def write(self, rows: List[Dict[str, Any]]) -> None:
+        new_offers, observations = await self.store.record(self.retailer, rows)
+        self.new_offers += new_offers
+        self.observations += observations
+        self._rows_written += len(rows)
+
+    async def close(self) -> None:
+        # The store itself is owned and closed by main
+        if self._rows_written:
+            self.logger.info(f"Price store: {self.new_offers} new offers, {
+                             self.observations} price/stock observations recorded")
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return coerce_value('float', value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _flag(value: Any) -> Optional[int]:
+    try:
+        flag = coerce_value('bool', value)
+    except (TypeError, ValueError):
+        return None
+    return None if flag is None else int(flag)
+
+
+def _text(value: Any) -> Optional[str]:
+    return None if value is None or value == '' else str(value)
+
+
+def _product_values(row: Dict[str, Any]) -> List[Optional[str]]:
+    return [_text(row.get(field)) for field in PRODUCT_FIELDS]
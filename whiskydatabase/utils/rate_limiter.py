@@ -0,0 +1,106 @@
+# utils/rate_limiter.py
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+class RateLimiter:
+    """
+    An adaptive token bucket shared by every request to one host.
+
+    Tokens refill at `rate` per second up to `burst`. A throttling response
+    (429 / Retry-After) halves the rate and pauses the host; after
+    `recovery_after` consecutive successes the rate climbs back towards the
+    configured maximum. Several scrapers can share a host, so rate changes are
+    logged to the logger of the caller that reported the response.
+    """
+
+    def __init__(self, host: str, rate: float, burst: float = 1, min_rate: Optional[float] = None,
+                 recovery_after: int = 10, logger: Optional[logging.Logger] = None):
+        self.host = host
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.recovery_after = recovery_after
+        self.logger = logger or logging.getLogger(__name__)
+        self._tokens = self.burst
+        self._updated_at: Optional[float] = None
+        self._paused_until = 0.0
+        self._successes = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        if self._updated_at is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def on_success(self, logger: Optional[logging.Logger] = None) -> None:
+        self._successes += 1
+        if self._successes >= self.recovery_after and self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate * 1.5)
+            self._successes = 0
+            (logger or self.logger).debug(f"Raised request rate for {self.host} to {self.rate:.2f}/s")
+
+    def on_throttled(self, retry_after: Optional[float] = None,
+                     logger: Optional[logging.Logger] = None) -> None:
+        loop = asyncio.get_running_loop()
+        self._successes = 0
+        self.rate = max(self.min_rate, self.rate / 2)
+        pause = retry_after if retry_after is not None else 1 / self.rate
+        self._paused_until = max(self._paused_until, loop.time() + pause)
+        self._tokens = 0
+        (logger or self.logger).warning(f"Throttled by {self.host}: pausing {pause:.1f}s, "
+                            f"rate lowered to {self.rate:.2f}/s")
+
+
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(url: str, rate: float, burst: float = 1) -> RateLimiter:
+    """
+    Returns the process-wide limiter for the host of `url`. The first caller for a host
+    sets its budget; later callers asking for a tighter one lower it.
+    """
+    host = urlparse(url).netloc.lower()
+    limiter = _limiters.get(host)
+    if limiter is None:
+        limiter = _limiters[host] = RateLimiter(host, rate, burst)
+    elif rate < limiter.max_rate:
+        limiter.max_rate = limiter.rate = rate
+    return limiter
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
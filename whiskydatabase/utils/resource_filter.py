@@ -0,0 +1,139 @@
+# utils/resource_filter.py
+
+import fnmatch
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from playwright.async_api import Route
+
+from utils.metrics import ScraperMetrics
+
+# Resource types the scrapers never read: prices and specs are all in the document
+DEFAULT_BLOCKED_TYPES = ('image', 'media', 'font')
+# Analytics, tag managers, ads and session recorders seen on the retailer sites
+DEFAULT_DENY = (
+    'google-analytics.com', 'googletagmanager.com', 'googleadservices.com', 'googlesyndication.com',
+    'doubleclick.net', 'connect.facebook.net', 'facebook.com/tr', 'bat.bing.com', 'clarity.ms',
+    'hotjar.com', 'hotjar.io', 'adservice.google.com', 'criteo.com', 'criteo.net', 'analytics.tiktok.com',
+    'snap.licdn.com', 'pinterest.com/ct', 'klaviyo.com', 'newrelic.com', 'nr-data.net', 'sentry.io',
+    'mouseflow.com', 'optimizely.com', 'segment.io', 'segment.com',
+)
+# Opt-in per site with `deny_groups`: some shops only render listings after consent, or
+# take their ratings from a review widget
+DENY_GROUPS = {
+    'consent': ('cookiebot.com', 'onetrust.com', 'cookielaw.org'),
+    'reviews': ('trustpilot.com',),
+}
+
+# Second-level labels under country TLDs, as in `co.uk` or `com.au`
+SECOND_LEVEL_LABELS = frozenset({'co', 'com', 'org', 'net', 'ac', 'gov'})
+
+
+class ResourceFilter:
+    """
+    Decides for each request a browser page makes whether it is fetched or aborted.
+
+    Installed as a Playwright route on every browser context of a scraper. Patterns in
+    `allow` and `deny` are either domains (`hotjar.com` also matches its subdomains, and
+    `facebook.com/tr` a path prefix) or URL globs such as `*://*.example.com/*.js`.
+    Allowed requests are never blocked; otherwise denied requests, the `block_types`
+    resource types and, with `block_third_party`, every sub-resource from another site
+    are aborted. Navigations themselves always go through.
+    """
+
+    def __init__(self, base_url: str, block_types: Iterable[str] = DEFAULT_BLOCKED_TYPES,
+                 allow: Iterable[str] = (), deny: Iterable[str] = DEFAULT_DENY,
+                 block_third_party: bool = False, metrics: Optional[ScraperMetrics] = None,
+                 logger: Optional[logging.Logger] = None):
+        self.site = _site(urlparse(base_url).hostname or '')
+        self.block_types = frozenset(block_types)
+        self.allow = _compile(allow)
+        self.deny = _compile(deny)
+        self.block_third_party = block_third_party
+        self.metrics = metrics
+        self.logger = logger or logging.getLogger(__name__)
+        self.blocked = 0
+
+    @classmethod
+    def from_config(cls, site_config: Dict[str, Any], metrics: Optional[ScraperMetrics] = None,
+                    logger: Optional[logging.Logger] = None) -> Optional['ResourceFilter']:
+        """
+        Builds the filter from a site's `resource_blocking` section, or returns None when
+        blocking is disabled. `allow`/`deny` extend the defaults, `block_types`
+        and `replace_default_deny: true` replace them. `deny_groups` adds named
+        groups from `DENY_GROUPS`, such as `consent`.
+        """
+        config = site_config.get('resource_blocking', {})
+        if not config.get('enabled', True):
+            return None
+        deny = list(config.get('deny', []))
+        if not config.get('replace_default_deny', False):
+            deny += DEFAULT_DENY
+        for group in config.get('deny_groups', []):
+            if group not in DENY_GROUPS:
+                raise ValueError(f"Unknown resource_blocking deny group '{group}', expected one of {
+                                 ', '.join(DENY_GROUPS)}")
+            deny += DENY_GROUPS[group]
+        return cls(site_config['base_url'],
+                   block_types=config.get('block_types', DEFAULT_BLOCKED_TYPES),
+                   allow=config.get('allow', []),
+                   deny=deny,
+                   block_third_party=config.get('block_third_party', False),
+                   metrics=metrics, logger=logger)
+
+    def should_block(self, url: str, resource_type: str, is_navigation: bool = False) -> bool:
+        if is_navigation or url.startswith('data:'):
+            return False
+        parsed = urlparse(url)
+        host = (parsed.hostname or '').lower()
+        if _matches(self.allow, url, host, parsed.path):
+            return False
+        if resource_type in self.block_types or _matches(self.deny, url, host, parsed.path):
+            return True
+        return self.block_third_party and _site(host) != self.site
+
+    async def handle(self, route: Route) -> None:
+        request = route.request
+        if self.should_block(request.url, request.resource_type, request.is_navigation_request()):
+            self.blocked += 1
+            if self.metrics is not None:
+                self.metrics.count('blocked')
+            self.logger.debug(f"Blocked {request.resource_type} request: {request.url}")
+            await route.abort('blockedbyclient')
+        else:
+            await route.continue_()
+
+
+class _Pattern:
+    __slots__ = ('glob', 'host', 'path')
+
+    def __init__(self, pattern: str):
+        pattern = pattern.strip().lower()
+        if '*' in pattern or '?' in pattern or '://' in pattern:
+            self.glob, self.host, self.path = pattern, None, None
+        else:
+            host, _, path = pattern.partition('/')
+            self.glob, self.host, self.path = None, host.lstrip('.'), f"/{path}" if path else ''
+
+
+def _compile(patterns: Iterable[str]) -> List[_Pattern]:
+    return [_Pattern(pattern) for pattern in patterns if pattern and pattern.strip()]
+
+
+def _matches(patterns: List[_Pattern], url: str, host: str, path: str) -> bool:
+    for pattern in patterns:
+        if pattern.glob is not None:
+            if fnmatch.fnmatchcase(url.lower(), pattern.glob):
+                return True
+        elif (host == pattern.host or host.endswith('.' + pattern.host)) and path.startswith(pattern.path):
+            return True
+    return False
+
+
+def _site(host: str) -> str:
+    """Approximates the registrable domain: the last two labels, three for e.g. `co.uk`."""
+    labels = host.lower().rstrip('.').split('.')
+    if len(labels) > 2 and labels[-2] in SECOND_LEVEL_LABELS and len(labels[-1]) == 2:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
@@ -0,0 +1,112 @@
+# utils/response_mapper.py
+
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import jmespath
+
+# "features[?alias=='inhoud'].value.description | [0]": the first non-null value of a
+# list element selected by a key. These are resolved through a per-item index instead
+# of a filter projection per field.
+KEYED_LOOKUP = re.compile(
+    r"^\s*(?P<list>\w+)\[\?\s*(?P<key>\w+)\s*==\s*'(?P<value>[^']*)'\s*\]"
+    r"\.(?P<path>\w+(?:\.\w+)*)\s*\|\s*\[0\]\s*$")
+
+
+class ResponseMapper:
+    """
+    Maps a JSON API response to product rows using the site's `response_mapping`
+    (a `root` JMESPath expression selecting the item list and one expression per field).
+
+    Every expression is compiled once. Keyed lookups into the same list (DrankDozijn's
+    `features[?alias==...]`) share one alias index per item, built in a single pass.
+    """
+
+    def __init__(self, response_mapping: Dict[str, Any], logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self._root = jmespath.compile(response_mapping.get('root', 'products'))
+        # field -> ('expression', compiled, default) or ('keyed', (list, key), value, path)
+        self._fields: List[Tuple[str, Tuple]] = []
+        self._indexes: List[Tuple[str, str]] = []
+
+        for field, mapping in response_mapping.get('fields', {}).items():
+            keyed = KEYED_LOOKUP.match(mapping)
+            if keyed:
+                index = (keyed['list'], keyed['key'])
+                if index not in self._indexes:
+                    self._indexes.append(index)
+                self._fields.append(
+                    (field, ('keyed', index, keyed['value'], keyed['path'].split('.'))))
+                continue
+            try:
+                compiled = jmespath.compile(mapping)
+            except jmespath.exceptions.JMESPathError as e:
+                self.logger.error(f"Error compiling field '{
+                                  field}' with mapping '{mapping}': {str(e)}")
+                compiled = None
+            default = _handle_default(mapping) if '||' in mapping else None
+            self._fields.append((field, ('expression', compiled, default)))
+
+    def map(self, json_response: Any) -> List[Dict[str, Any]]:
+        items = self._root.search(json_response) or []
+
+        if not isinstance(items, list):
+            self.logger.error(f"Unexpected response structure: {type(items)}")
+            return []
+
+        products = [self._map_item(item) for item in items]
+        self.logger.debug(f"Parsed {len(products)} products")
+        return products
+
+    def _map_item(self, item: Any) -> Dict[str, Any]:
+        indexes = {index: _build_index(item, *index) for index in self._indexes}
+        product = {}
+        for field, spec in self._fields:
+            if spec[0] == 'keyed':
+                _, index, value, path = spec
+                product[field] = _first_value(indexes[index].get(value), path)
+                continue
+
+            _, compiled, default = spec
+            if compiled is None:
+                product[field] = None
+                continue
+            try:
+                value = compiled.search(item)
+            except jmespath.exceptions.JMESPathError as e:
+                self.logger.error(f"Error parsing field '{field}': {str(e)}")
+                value = None
+            product[field] = default if value is None else value
+        return product
+
+
+def _build_index(item: Any, list_name: str, key: str) -> Dict[str, List[Any]]:
+    index: Dict[str, List[Any]] = {}
+    elements = item.get(list_name) if isinstance(item, dict) else None
+    if isinstance(elements, list):
+        for element in elements:
+            if isinstance(element, dict) and isinstance(element.get(key), str):
+                index.setdefault(element[key], []).append(element)
+    return index
+
+
+def _first_value(elements: Optional[List[Any]], path: List[str]) -> Any:
+    # A JMESPath projection drops nulls, so '| [0]' is the first non-null value
+    for element in elements or ():
+        value = element
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+            if value is None:
+                break
+        if value is not None:
+            return value
+    return None
+
+
+def _handle_default(mapping: str) -> Any:
+    parts = mapping.split('||')
+    if len(parts) > 1:
+        default = parts[1].strip().strip('`').strip("'").strip('"')
+        return default if default.lower() != 'null' else None
+    return None
@@ -0,0 +1,235 @@
+# utils/sitemap.py
+
+import json
+import logging
+import os
+import re
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+from urllib.parse import urljoin
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+import aiohttp
+
+from utils.helpers import ensure_directory
+from utils.http_client import HttpClient
+from utils.metrics import ScraperMetrics
+from utils.rate_limiter import RateLimiter
+
+CHUNK_SIZE = 64 * 1024
+GZIP_MAGIC = b'\x1f\x8b'
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+@dataclass
+class SitemapEntry:
+    url: str
+    lastmod: Optional[datetime] = None
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """W3C datetimes (`2024-05-01`, `2024-05-01T10:00:00+02:00`, `...Z`) as aware UTC datetimes."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+class SitemapParser:
+    """
+    Incremental parser for `urlset` and `sitemapindex` documents. Bytes are fed as they
+    arrive (gzip is detected and inflated on the fly) and finished entries are handed
+    out right away, so memory stays flat however large the sitemap is.
+    """
+
+    def __init__(self):
+        self._parser = XMLPullParser(events=('start', 'end'))
+        self._inflate = None
+        self._started = False
+        self._root = None
+        self._depth = 0
+        self._loc: Optional[str] = None
+        self._lastmod: Optional[str] = None
+        self.kind: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> Iterator[SitemapEntry]:
+        if not self._started:
+            self._started = True
+            if chunk.startswith(GZIP_MAGIC):
+                self._inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._inflate is not None:
+            chunk = self._inflate.decompress(chunk)
+        self._parser.feed(chunk)
+        return self._entries()
+
+    def close(self) -> Iterator[SitemapEntry]:
+        if self._inflate is not None:
+            self._parser.feed(self._inflate.flush())
+        self._parser.close()
+        return self._entries()
+
+    def _entries(self) -> Iterator[SitemapEntry]:
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                self._depth += 1
+                if self._root is None:
+                    self._root = element
+                    self.kind = _sitemap_tag(element.tag)
+                continue
+            depth = self._depth
+            self._depth -= 1
+            # Only the entries' own children: extensions such as <image:image><image:loc>
+            # sit deeper and in another namespace
+            tag = _sitemap_tag(element.tag)
+            if depth == 3 and tag == 'loc':
+                self._loc = (element.text or '').strip()
+            elif depth == 3 and tag == 'lastmod':
+                self._lastmod = element.text
+            elif depth == 2 and tag in ('url', 'sitemap'):
+                if self._loc:
+                    yield SitemapEntry(self._loc, parse_lastmod(self._lastmod))
+                self._loc = self._lastmod = None
+                # Drop finished entries so the tree never grows
+                self._root.clear()
+
+
+def _sitemap_tag(tag: str) -> Optional[str]:
+    """The local name of a sitemap protocol tag (also without a namespace), else None."""
+    if tag.startswith('{'):
+        namespace, _, name = tag[1:].partition('}')
+        return name if namespace == SITEMAP_NS else None
+    return tag
+
+
+class SitemapReader:
+    """
+    Walks a site's sitemaps (from robots.txt, or `/sitemap.xml`) through nested
+    sitemap indexes and yields the page entries whose URL matches `include`.
+
+    A child sitemap whose `lastmod` in its index has not changed since the last run is
+    not downloaded again; those lastmods are kept in `state_path`. Sitemaps in an index
+    can be narrowed down with `sitemap_include` (e.g. only the product sitemaps).
+    """
+
+    def __init__(self, http_client: HttpClient, base_url: str, headers: Dict[str, str],
+                 rate_limiter: Callable[[str], RateLimiter], state_path: str,
+                 urls: Optional[List[str]] = None, include: Optional[str] = None,
+                 exclude: Optional[str] = None, sitemap_include: Optional[str] = None,
+                 max_sitemaps: int = 1000, timeout: float = 60,
+                 metrics: Optional[ScraperMetrics] = None, logger: Optional[logging.Logger] = None):
+        self.http_client = http_client
+        self.base_url = base_url
+        self.headers = headers
+        self.rate_limiter = rate_limiter
+        self.state_path = state_path
+        self.urls = list(urls or [])
+        self.include = re.compile(include) if include else None
+        self.exclude = re.compile(exclude) if exclude else None
+        self.sitemap_include = re.compile(sitemap_include) if sitemap_include else None
+        self.max_sitemaps = max_sitemaps
+        self.timeout = timeout
+        self.metrics = metrics
+        self.logger = logger or logging.getLogger(__name__)
+        self.sitemaps_fetched = 0
+        self.sitemaps_unchanged = 0
+        self._lastmods: Dict[str, str] = self._load_state()
+        self._seen_lastmods: Dict[str, str] = {}
+
+    async def entries(self) -> AsyncIterator[SitemapEntry]:
+        queue = self.urls or await self._robots_sitemaps()
+        seen = set()
+        while queue and self.sitemaps_fetched < self.max_sitemaps:
+            url = queue.pop(0)
+            if url in seen:
+                continue
+            seen.add(url)
+            parser = SitemapParser()
+            try:
+                async for entry in self._stream(url, parser):
+                    if parser.kind == 'sitemapindex':
+                        if self._wanted_sitemap(entry):
+                            queue.append(entry.url)
+                    elif self._wanted_page(entry.url):
+                        yield entry
+            except (aiohttp.ClientError, TimeoutError, ParseError, zlib.error, ValueError) as e:
+                if self.metrics is not None:
+                    self.metrics.count('errors')
+                self.logger.warning(f"Could not read sitemap {url}: {e}")
+                # Read again next time
+                self._seen_lastmods.pop(url, None)
+        if queue:
+            self.logger.warning(f"Stopped after {self.max_sitemaps} sitemaps, {len(queue)} not read")
+
+    def _wanted_sitemap(self, entry: SitemapEntry) -> bool:
+        if self.sitemap_include is not None and not self.sitemap_include.search(entry.url):
+            return False
+        if entry.lastmod is not None:
+            lastmod = entry.lastmod.isoformat()
+            self._seen_lastmods[entry.url] = lastmod
+            if self._lastmods.get(entry.url) == lastmod:
+                self.sitemaps_unchanged += 1
+                return False
+        return True
+
+    def _wanted_page(self, url: str) -> bool:
+        if self.include is not None and not self.include.search(url):
+            return False
+        return self.exclude is None or not self.exclude.search(url)
+
+    async def _stream(self, url: str, parser: SitemapParser) -> AsyncIterator[SitemapEntry]:
+        await self.rate_limiter(url).acquire()
+        self.logger.debug(f"Reading sitemap {url}")
+        async with self.http_client.stream(url, self.headers, self.timeout) as response:
+            if response.status != 200:
+                raise ValueError(f"HTTP status {response.status}")
+            self.sitemaps_fetched += 1
+            if self.metrics is not None:
+                self.metrics.count('requests')
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                if self.metrics is not None:
+                    self.metrics.count('bytes_received', len(chunk))
+                for entry in parser.feed(chunk):
+                    yield entry
+        for entry in parser.close():
+            yield entry
+
+    async def _robots_sitemaps(self) -> List[str]:
+        robots_url = urljoin(self.base_url, '/robots.txt')
+        try:
+            await self.rate_limiter(robots_url).acquire()
+            response = await self.http_client.get(robots_url, self.headers, self.timeout)
+            if response.ok:
+                urls = [line.split(':', 1)[1].strip() for line in response.body.decode('utf-8', 'replace').splitlines()
+                        if line.lower().startswith('sitemap:')]
+                if urls:
+                    return urls
+        except (aiohttp.ClientError, TimeoutError) as e:
+            self.logger.debug(f"Could not read {robots_url}: {e}")
+        return [urljoin(self.base_url, '/sitemap.xml')]
+
+    def _load_state(self) -> Dict[str, str]:
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not load sitemap state from {self.state_path}: {e}")
+            return {}
+
+    def save(self) -> None:
+        """Records the child sitemap lastmods seen in this walk. Call after its pages were handled."""
+        if not self._seen_lastmods:
+            return
+        ensure_directory(os.path.dirname(self.state_path))
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({**self._lastmods, **self._seen_lastmods}, f)
+        os.replace(tmp_path, self.state_path)
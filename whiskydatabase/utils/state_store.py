@@ -0,0 +1,80 @@
+# utils/state_store.py
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from utils.helpers import ensure_directory
+
+
+class ProductStateStore:
+    """
+    Persistent per-retailer record of every product we have seen, keyed by link/product_id.
+
+    Each entry keeps a hash of the listing fields and the detail fields from the last
+    detail-page fetch, so unchanged products can reuse their details instead of
+    opening the detail page again.
+    """
+
+    def __init__(self, path: str, logger: Optional[logging.Logger] = None):
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+            self.logger.debug(f"Loaded {len(self.entries)} product states from {self.path}")
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not load product state from {self.path}: {e}")
+            self.entries = {}
+
+    @staticmethod
+    def listing_hash(product: Dict[str, Any]) -> str:
+        payload = json.dumps(product, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(key)
+
+    def cached_details(self, key: str, listing_hash: str, max_age: timedelta) -> Optional[Dict[str, Any]]:
+        """Returns the stored detail fields if the listing is unchanged and the details are fresh enough."""
+        entry = self.entries.get(key)
+        if not entry or entry.get('listing_hash') != listing_hash or entry.get('details') is None:
+            return None
+        detailed_at = datetime.fromisoformat(entry['detailed_at'])
+        if datetime.now() - detailed_at > max_age:
+            return None
+        entry['seen_at'] = datetime.now().isoformat(timespec='seconds')
+        self._dirty = True
+        return dict(entry['details'])
+
+    def update(self, key: str, listing_hash: str, details: Optional[Dict[str, Any]] = None, **extra: Any) -> None:
+        now = datetime.now().isoformat(timespec='seconds')
+        entry = self.entries.setdefault(key, {})
+        entry['listing_hash'] = listing_hash
+        entry['seen_at'] = now
+        if details is not None:
+            entry['details'] = details
+            entry['detailed_at'] = now
+        entry.update(extra)
+        self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        ensure_directory(os.path.dirname(self.path))
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self.logger.debug(f"Saved {len(self.entries)} product states to {self.path}")
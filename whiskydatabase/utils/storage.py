@@ -0,0 +1,217 @@
+# utils/storage.py
+
+import asyncio
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from utils.csv_writer import AsyncCsvWriter
+from utils.helpers import ensure_directory
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+STORAGE_FORMATS = ('csv', 'parquet')
+
+# Columns with a fixed meaning regardless of how a site extracts them
+DEFAULT_FIELD_TYPES = {
+    'price': 'float',
+    'original_price': 'float',
+    'rating': 'float',
+    'num_reviews': 'int',
+    'in_stock': 'bool',
+    'scraped_at': 'timestamp',
+}
+PARSER_TYPES = {'float': 'float', 'int': 'int', 'bool': 'bool'}
+
+
+def field_types(site_config: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Column types for a site's `fieldnames`: the `parser` of its `fields` / `detail_fields`
+    where one is configured, the well-known price/stock columns otherwise, else 'str'.
+    """
+    types = dict(DEFAULT_FIELD_TYPES)
+    for fields in (site_config.get('fields', {}), site_config.get('detail_fields', {})):
+        for field, config in fields.items():
+            parser = config.get('parser') if isinstance(config, dict) else None
+            if parser in PARSER_TYPES:
+                types[field] = PARSER_TYPES[parser]
+            elif parser:
+                types[field] = 'str'
+    return {field: types.get(field, 'str') for field in site_config.get('fieldnames', [])}
+
+
+def coerce_value(kind: str, value: Any) -> Any:
+    """Converts a scraped value to a `field_types` kind; raises ValueError/TypeError if it does not fit."""
+    if value is None or value == '':
+        return None
+    if kind == 'float':
+        return float(value)
+    if kind == 'int':
+        return int(value)
+    if kind == 'bool':
+        if isinstance(value, str):
+            flag = value.strip().lower()
+            if flag in ('true', '1', 'yes'):
+                return True
+            if flag in ('false', '0', 'no'):
+                return False
+            raise ValueError(f"Not a boolean: {value}")
+        return bool(value)
+    if kind == 'timestamp':
+        return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    return value if isinstance(value, str) else str(value)
+
+
+class StorageSink(ABC):
+    """Destination for scraped rows. Rows are written in batches; `close()` must be awaited."""
+
+    path = ''
+
+    @abstractmethod
+    async def write(self, rows: List[Dict[str, Any]]) -> None:
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
+
+    @property
+    @abstractmethod
+    def rows_written(self) -> int:
+        pass
+
+
+class CsvSink(StorageSink):
+    """`data/raw/YYYY/MM/DD/<retailer>-<uuid>.csv.gz`, one gzip stream per run."""
+
+    def __init__(self, path: str, fieldnames: List[str], batch_size: int = 500,
+                 logger: Optional[logging.Logger] = None):
+        self.path = path
+        self._writer = AsyncCsvWriter(path, fieldnames, batch_size=batch_size, logger=logger)
+
+    async def write(self, rows: List[Dict[str, Any]]) -> None:
+        await self._writer.write(rows)
+
+    async def close(self) -> None:
+        await self._writer.close()
+
+    @property
+    def rows_written(self) -> int:
+        return self._writer.rows_written
+
+
+class ParquetSink(StorageSink):
+    """
+    `data/parquet/date=YYYY-MM-DD/retailer_slug=<retailer>/<uuid>.parquet`, a hive-partitioned
+    dataset with one typed, zstd-compressed file per run.
+
+    Each batch becomes a row group. The file is written under a hidden name and renamed
+    when closed, so readers never see a file without its footer.
+    """
+
+    ARROW_TYPES = {
+        'float': lambda: pa.float64(),
+        'int': lambda: pa.int64(),
+        'bool': lambda: pa.bool_(),
+        'timestamp': lambda: pa.timestamp('s'),
+        'str': lambda: pa.string(),
+    }
+
+    def __init__(self, path: str, types: Dict[str, str], batch_size: int = 5000,
+                 logger: Optional[logging.Logger] = None):
+        self.path = path
+        self.types = types
+        self.batch_size = max(1, batch_size)
+        self.logger = logger or logging.getLogger(__name__)
+        self.schema = pa.schema([(field, self.ARROW_TYPES[kind]()) for field, kind in types.items()])
+        self._rows_written = 0
+        self._coercion_failures: Dict[str, int] = {}
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+        ensure_directory(os.path.dirname(path))
+
+    @property
+    def rows_written(self) -> int:
+        return self._rows_written
+
+    async def write(self, rows: List[Dict[str, Any]]) -> None:
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._buffer:
+                return
+            rows, self._buffer = self._buffer, []
+            await asyncio.to_thread(self._write_rows, rows)
+            self._rows_written += len(rows)
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        columns = {field: pa.array([self._coerce(field, kind, row.get(field)) for row in rows],
+                                   type=self.schema.field(field).type)
+                   for field, kind in self.types.items()}
+        table = pa.Table.from_pydict(columns, schema=self.schema)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(
+                self._tmp_path, self.schema, compression='zstd', use_dictionary=True)
+        self._writer.write_table(table)
+
+    def _coerce(self, field: str, kind: str, value: Any) -> Any:
+        try:
+            return coerce_value(kind, value)
+        except (TypeError, ValueError):
+            self._coercion_failures[field] = self._coercion_failures.get(field, 0) + 1
+            return None
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._writer is None:
+            await asyncio.to_thread(self._write_rows, [])
+        await asyncio.to_thread(self._finish)
+        for field, count in self._coercion_failures.items():
+            self.logger.warning(f"Stored {count} '{field}' values as null: not a valid {
+                                self.types[field]}")
+
+    def _finish(self) -> None:
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+
+
+def create_sink(site_config: Dict[str, Any], directory: str, filename: str,
+                logger: Optional[logging.Logger] = None) -> StorageSink:
+    """
+    Builds the sink for `storage.format` ('csv' or 'parquet'). `directory` is the
+    dataset root and `filename` the per-run file name without extension.
+    """
+    logger = logger or logging.getLogger(__name__)
+    storage = site_config.get('storage', {})
+    storage_format = storage.get('format', 'csv').lower()
+    if storage_format not in STORAGE_FORMATS:
+        raise ValueError(f"Unknown storage format: {storage_format}")
+    if storage_format == 'parquet' and not PYARROW_AVAILABLE:
+        logger.warning("pyarrow not installed, falling back to CSV storage")
+        storage_format = 'csv'
+
+    now = datetime.now()
+    slug = site_config['name'].lower().replace(' ', '_')
+    if storage_format == 'parquet':
+        path = os.path.join(directory, 'parquet', f"date={now:%Y-%m-%d}", f"retailer_slug={slug}",
+                            f"{filename}.parquet")
+        return ParquetSink(path, field_types(site_config),
+                           batch_size=storage.get('batch_size', 5000), logger=logger)
+
+    path = os.path.join(directory, 'raw', str(now.year), f"{now.month:02d}", f"{now.day:02d}",
+                        f"{filename}.csv.gz")
+    return CsvSink(path, site_config.get('fieldnames', []),
+                   batch_size=storage.get('batch_size', site_config.get('write_batch_size', 500)),
+                   logger=logger)
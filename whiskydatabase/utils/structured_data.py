@@ -0,0 +1,251 @@
+# utils/structured_data.py
+
+import json
+import logging
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from utils.helpers import apply_parser
+
+# schema.org `additionalProperty` names (lower case) that carry our fields, as used by
+# the Dutch, German, French and English shops
+DEFAULT_PROPERTIES = {
+    'volume': ('volume', 'inhoud', 'flesinhoud', 'content', 'contents', 'inhalt', 'füllmenge',
+               'contenance', 'size', 'bottle size'),
+    'abv': ('abv', 'alcohol', 'alcoholpercentage', 'alcohol percentage', 'alcoholgehalte',
+            'alkoholgehalt', 'alkohol', 'alcool', 'degré', 'degré d\'alcool', 'strength'),
+    'category': ('type', 'soort', 'category', 'categorie', 'kategorie', 'catégorie'),
+    'country': ('country', 'land', 'herkunftsland', 'pays', 'country of origin', 'origin'),
+    'region': ('region', 'regio', 'région'),
+}
+FLOAT_FIELDS = ('price', 'original_price', 'abv', 'rating')
+IN_STOCK = ('instock', 'limitedavailability', 'onlineonly', 'instoreonly', 'preorder', 'presale')
+LIST_PRICE_TYPES = ('strikethroughprice', 'listprice', 'msrp')
+
+
+def parse_json_ld(text: str, logger: Optional[logging.Logger] = None) -> List[Any]:
+    """Parses one `application/ld+json` block; invalid JSON is logged and skipped."""
+    text = text.strip()
+    if not text:
+        return []
+    try:
+        data = json.loads(text)
+    except ValueError:
+        # Some shops leave raw newlines inside strings or wrap the block in HTML comments
+        try:
+            data = json.loads(re.sub(r'^\s*<!--|-->\s*$', '', text).replace('\n', ' '))
+        except ValueError as e:
+            (logger or logging.getLogger(__name__)).debug(f"Skipping invalid JSON-LD block: {e}")
+            return []
+    return data if isinstance(data, list) else [data]
+
+
+def parse_inline_state(text: str, pattern: Optional[str] = None) -> Any:
+    """
+    Parses hydration state from a script: the whole text as JSON, or with `pattern` the
+    JSON value that starts right after its match (e.g. `window.__INITIAL_STATE__\\s*=\\s*`).
+    """
+    start = 0
+    if pattern:
+        match = re.search(pattern, text)
+        if match is None:
+            return None
+        start = match.end()
+    try:
+        return json.JSONDecoder().raw_decode(text, start)[0]
+    except ValueError:
+        return None
+
+
+def find_products(objects: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Yields every schema.org Product in `objects`, wherever it is nested: in `@graph`,
+    an `ItemList`'s `itemListElement`, a page's `mainEntity` and so on.
+    """
+    stack = list(objects)[::-1]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            if _is_type(node, 'Product'):
+                yield node
+            else:
+                stack.extend(reversed([value for value in node.values() if isinstance(value, (dict, list))]))
+
+
+def product_to_row(product: Dict[str, Any], base_url: str,
+                   properties: Optional[Dict[str, Tuple[str, ...]]] = None) -> Dict[str, Any]:
+    """Maps a schema.org Product to our field names. Fields it has no value for are left out."""
+    properties = properties or DEFAULT_PROPERTIES
+    offer = _main_offer(product.get('offers'))
+    rating = _first(product.get('aggregateRating'))
+    rating = rating if isinstance(rating, dict) else {}
+    row = {
+        'name': _text(product.get('name')),
+        'price': offer.get('lowPrice') if offer.get('price') in (None, '') else offer['price'],
+        'original_price': _list_price(offer),
+        'link': _url(product.get('url') or offer.get('url'), base_url),
+        'image_url': _url(_image(product.get('image')), base_url),
+        'brand': _text(_name(product.get('brand'))),
+        'description': _text(product.get('description')),
+        'category': _text(product.get('category')),
+        'in_stock': _in_stock(offer.get('availability')),
+        'rating': rating.get('ratingValue'),
+        'num_reviews': rating.get('reviewCount', rating.get('ratingCount')),
+        'product_id': _text(product.get('sku') or product.get('productID')),
+    }
+    if 'alcoholContent' in product:
+        row['abv'] = product['alcoholContent']
+
+    wanted = {name: field for field, names in properties.items() for name in names}
+    for prop in _as_list(product.get('additionalProperty')):
+        if not isinstance(prop, dict):
+            continue
+        field = wanted.get(str(prop.get('name', '')).strip().rstrip(':').lower())
+        value = prop.get('value')
+        if field and row.get(field) is None and value not in (None, ''):
+            unit = prop.get('unitText')
+            row[field] = f"{value} {unit}" if unit and field == 'volume' else value
+
+    for field in ('volume', 'category', 'country', 'region'):
+        if row.get(field) is not None:
+            row[field] = str(row[field]).strip()
+    return normalize_row(row, base_url)
+
+
+def normalize_row(row: Dict[str, Any], base_url: str) -> Dict[str, Any]:
+    """Numbers to floats/ints, links to absolute URLs; empty fields are left out."""
+    row = dict(row)
+    for field in FLOAT_FIELDS:
+        if field in row:
+            row[field] = _to_number(row[field], 'float', field)
+    if 'num_reviews' in row:
+        row['num_reviews'] = _to_number(row['num_reviews'], 'int', 'num_reviews')
+    for field in ('link', 'image_url'):
+        if field in row:
+            row[field] = _url(row[field], base_url)
+    return {field: value for field, value in row.items() if value not in (None, '')}
+
+
+def dedupe_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Combines rows for the same product (e.g. from both JSON-LD and microdata), first value wins."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        key = link_key(row['link']) if row.get('link') else str(row.get('name', '')).casefold()
+        if key in merged:
+            fill_missing(merged[key], row)
+        else:
+            merged[key] = row
+    return list(merged.values())
+
+
+def merge_rows(products: List[Dict[str, Any]], rows: List[Dict[str, Any]]) -> None:
+    """
+    Fills the missing fields of `products` in place from the structured `rows` that
+    describe the same product, matched on the link and otherwise on the name.
+    """
+    by_link = {link_key(row['link']): row for row in rows if row.get('link')}
+    by_name = {row['name'].casefold(): row for row in rows if row.get('name')}
+    for product in products:
+        row = None
+        if product.get('link'):
+            row = by_link.get(link_key(product['link']))
+        if row is None and product.get('name'):
+            row = by_name.get(str(product['name']).casefold())
+        if row is not None:
+            fill_missing(product, row)
+
+
+def fill_missing(product: Dict[str, Any], row: Dict[str, Any]) -> None:
+    for field, value in row.items():
+        if product.get(field) is None:
+            product[field] = value
+
+
+def link_key(url: str) -> str:
+    parts = urlsplit(str(url).strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), parts.query, ''))
+
+
+def _is_type(node: Dict[str, Any], name: str) -> bool:
+    types = node.get('@type', ())
+    return any(str(t).rsplit('/', 1)[-1] == name for t in _as_list(types))
+
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _first(value: Any) -> Any:
+    values = _as_list(value)
+    return values[0] if values else None
+
+
+def _main_offer(offers: Any) -> Dict[str, Any]:
+    candidates = [offer for offer in _as_list(offers) if isinstance(offer, dict)]
+    # An AggregateOffer may list the individual offers; the first priced one wins
+    expanded = []
+    for offer in candidates:
+        expanded.append(offer)
+        expanded.extend(o for o in _as_list(offer.get('offers')) if isinstance(o, dict))
+    for offer in expanded:
+        if offer.get('price') not in (None, '') or offer.get('lowPrice') not in (None, ''):
+            return offer
+    return expanded[0] if expanded else {}
+
+
+def _list_price(offer: Dict[str, Any]) -> Any:
+    for spec in _as_list(offer.get('priceSpecification')):
+        if not isinstance(spec, dict):
+            continue
+        price_type = str(spec.get('priceType', '')).rsplit('/', 1)[-1].lower()
+        if price_type in LIST_PRICE_TYPES:
+            return spec.get('price')
+    return None
+
+
+def _in_stock(availability: Any) -> Optional[bool]:
+    if availability in (None, ''):
+        return None
+    return str(_first(availability)).rsplit('/', 1)[-1].lower() in IN_STOCK
+
+
+def _name(value: Any) -> Any:
+    value = _first(value)
+    return value.get('name') if isinstance(value, dict) else value
+
+
+def _image(value: Any) -> Optional[str]:
+    value = _first(value)
+    if isinstance(value, dict):
+        value = value.get('url') or value.get('contentUrl')
+    return value if isinstance(value, str) else None
+
+
+def _text(value: Any) -> Optional[str]:
+    value = _first(value)
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    return str(value).strip() or None
+
+
+def _url(value: Any, base_url: str) -> Optional[str]:
+    value = _text(value)
+    return urljoin(base_url, value) if value else None
+
+
+def _to_number(value: Any, parser: str, field: str) -> Any:
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if parser == 'float' else int(value)
+    value = str(value).strip()
+    try:
+        # JSON-LD prices are plain numbers such as "1234.50"
+        return float(value) if parser == 'float' else int(value)
+    except ValueError:
+        return apply_parser(value, parser, field)